@@ -0,0 +1,173 @@
+"""
+Agent Battle Simulator - Admission Control
+Per-client rate limits, a concurrency limit and queue-time shedding that
+turn overload into fast 429/503 responses instead of timeouts.
+
+Every request passes three checks before it reaches a route:
+
+1. Rate limit: a token bucket per address and one per session; a request is
+   charged to both, so dropping the session cookie does not earn a fresh
+   bucket. Buckets live in two
+   fixed-size arrays indexed by a hash of the address, so memory does not
+   grow with the number of clients and nothing has to expire. Clients that
+   hash to the same slot share a bucket, which can only make them stricter.
+2. Queue time: when a proxy stamps X-Request-Start and the request already
+   waited longer than max_queue_time, normal-priority requests are shed, as
+   the client has likely given up (this is where sync workers queue).
+3. Concurrency: at most `limit` requests in flight, `reserve` of them only
+   for high-priority requests; up to queue_depth more wait up to `timeout`.
+
+High-priority requests (cheap reads served from precomputed data) skip the
+rate limit and the queue-time check and may use the reserved slots. Health checks and metrics
+are exempt from everything (see app.py).
+"""
+
+import threading
+import time
+from array import array
+from typing import Callable, Optional, Sequence, Tuple
+
+# (status, error message, Retry-After seconds)
+Rejection = Tuple[int, str, float]
+
+
+class TokenBucketTable:
+    """Token buckets for any number of clients in two fixed-size arrays."""
+
+    def __init__(self, rate: float, burst: float, slots: int = 16384,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = array('d', [burst]) * slots
+        # Last refill time per slot; 0 with a full bucket reads as "unused"
+        self._updated = array('d', [0.0]) * slots
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens from key's bucket; returns 0 if admitted, else seconds until it would be"""
+        slot = hash(key) % len(self._tokens)
+        now = self.clock()
+        with self._lock:
+            tokens = min(self.burst, self._tokens[slot] + (now - self._updated[slot]) * self.rate)
+            self._updated[slot] = now
+            if tokens >= cost:
+                self._tokens[slot] = tokens - cost
+                return 0.0
+            self._tokens[slot] = tokens
+        return (cost - tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests in flight, with a bounded, priority-aware wait queue."""
+
+    def __init__(self, limit: int, reserve: int = 0, queue_depth: int = 0, timeout: float = 0.5):
+        if not 0 <= reserve < limit:
+            raise ValueError("reserve must be at least 0 and below limit")
+        self.limit = limit
+        self.reserve = reserve
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._waiting_high = 0
+        self._cond = threading.Condition()
+
+    def _free(self, high_priority: bool) -> bool:
+        if high_priority:
+            return self.in_flight < self.limit
+        # Normal requests leave the reserve free and let waiting high-priority requests go first
+        return self.in_flight < self.limit - self.reserve and not self._waiting_high
+
+    def acquire(self, high_priority: bool = False) -> bool:
+        """Take a slot, waiting up to `timeout` in the queue; False when the request should be shed"""
+        with self._cond:
+            if self._free(high_priority):
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.queue_depth:
+                return False
+            self.waiting += 1
+            self._waiting_high += high_priority
+            deadline = time.monotonic() + self.timeout
+            try:
+                while not self._free(high_priority):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+                self._waiting_high -= high_priority
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+
+def queue_time(header: Optional[str], now: float) -> Optional[float]:
+    """Seconds since a proxy's X-Request-Start stamp ("t=<epoch>" in s, ms or µs), None if absent"""
+    if not header:
+        return None
+    try:
+        stamp = float(header[2:] if header.startswith('t=') else header)
+    except ValueError:
+        return None
+    if stamp > 1e14:
+        stamp /= 1e6
+    elif stamp > 1e11:
+        stamp /= 1e3
+    return max(0.0, now - stamp)
+
+
+class Admission:
+    """The three checks for one app; any part is disabled when its setting is 0."""
+
+    def __init__(self, rate: float = 0, burst: float = 0, max_concurrent: int = 0, reserve: int = 0,
+                 queue_depth: int = 0, queue_timeout: float = 0.5, max_queue_time: float = 0):
+        self.buckets = TokenBucketTable(rate, max(burst, 1)) if rate > 0 else None
+        self.limiter = (ConcurrencyLimiter(max_concurrent, min(reserve, max_concurrent - 1), queue_depth,
+                                           queue_timeout) if max_concurrent > 0 else None)
+        self.max_queue_time = max_queue_time
+
+    @classmethod
+    def from_config(cls, config) -> "Admission":
+        return cls(
+            rate=config['RATE_LIMIT_PER_SECOND'],
+            burst=config['RATE_LIMIT_BURST'],
+            max_concurrent=config['MAX_CONCURRENT_REQUESTS'],
+            reserve=config['PRIORITY_RESERVED_REQUESTS'],
+            queue_depth=config['REQUEST_QUEUE_DEPTH'],
+            queue_timeout=config['REQUEST_QUEUE_TIMEOUT_MS'] / 1000,
+            max_queue_time=config['MAX_QUEUE_TIME_MS'] / 1000,
+        )
+
+    def admit(self, clients: Sequence[str], high_priority: bool = False, request_start: Optional[str] = None,
+              limit_concurrency: bool = True) -> Tuple[bool, Optional[Rejection]]:
+        """Returns (holds a concurrency slot, rejection or None); call release() when holding a slot.
+
+        `clients` are the rate-limit keys the request is charged to, in order;
+        the first empty bucket rejects it. Pass limit_concurrency=False for
+        requests that mostly sleep (long-polls), which would otherwise hold a
+        slot while waiting.
+        """
+        if self.buckets is not None and not high_priority:
+            for client in clients:
+                wait = self.buckets.acquire(client)
+                if wait:
+                    return False, (429, 'Too many requests', wait)
+        if self.max_queue_time and not high_priority:
+            waited = queue_time(request_start, time.time())
+            if waited is not None and waited > self.max_queue_time:
+                return False, (503, 'Server busy', 1)
+        if self.limiter is None or not limit_concurrency:
+            return False, None
+        if not self.limiter.acquire(high_priority):
+            return False, (503, 'Server busy', 1)
+        return True, None
+
+    def release(self) -> None:
+        self.limiter.release()
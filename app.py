@@ -3,224 +3,902 @@ Agent Battle Simulator - Flask WebApp
 Main application file
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Blueprint, Flask, Response, current_app, render_template, request, jsonify, session, g, redirect, url_for
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import gc
+import json
+import math
 import secrets
 import os
-import random
-from typing import Dict, List, Optional
+import threading
+import time
+from functools import wraps
+from typing import TYPE_CHECKING, Dict, List, Optional
+import assets
+from admission import Admission
+from compression import accepts_gzip, compress_response, precompressed, stream_json
 from battle_storage import BattleStorage
-from game import Agent, get_all_actions, Battle, get_all_battle_bots, get_battle_bot, get_bot_skins, get_unlocked_skins
-
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
-CORS(app)
-
-# Battle storage with TTL + cleanup
-battle_storage = BattleStorage()
-
-
-def _get_ai_profile(agent: Agent) -> str:
-    """Return deterministic AI profile (aggressive/defensive) based on bot ID."""
-    profile_hash = sum(ord(char) for char in agent.agent_type)
-    return 'aggressive' if profile_hash % 2 else 'defensive'
-
-
-def _get_action_category(action: Dict) -> str:
-    """Classify an action into offensive/debuff/defensive categories."""
-    debuff_effects = {'burn', 'slow', 'sticky', 'debuff_attack', 'debuff_defense'}
-    defensive_effects = {'heal', 'buff_defense'}
-
-    action_effects = set(action.get('effects', []))
-    if action_effects & defensive_effects:
-        return 'defensive'
-    if action_effects & debuff_effects:
-        return 'debuff'
-    return 'offensive'
-
-
-def _has_named_effect(effects: List[Dict], name: str) -> bool:
-    """Check if a list of buffs/debuffs contains an entry by name."""
-    return any(effect.get('name') == name for effect in effects)
-
-
-def select_ai_action(agent: Agent, opponent: Agent, rng: Optional[random.Random] = None,
-                     actions: Optional[List[Dict]] = None) -> Dict:
-    """Choose an AI action with weighted randomness and awareness of current effects."""
-
-    rng = rng or random
-    actions = actions or get_all_actions()
-
-    # Filter actions by stamina
-    available_actions = [a for a in actions if a['stamina_cost'] <= agent.stamina]
-
-    if not available_actions:
-        return sorted(actions, key=lambda x: x['stamina_cost'])[0]
-
-    profile = _get_ai_profile(agent)
-    base_profile_weights = {
-        'aggressive': {'offensive': 1.2, 'debuff': 1.0, 'defensive': 0.85},
-        'defensive': {'offensive': 0.9, 'debuff': 1.0, 'defensive': 1.25},
-    }
-
-    profile_weights = base_profile_weights.get(profile, base_profile_weights['aggressive'])
-    type_randomness = {category: profile_weights[category] * rng.uniform(0.85, 1.15)
-                       for category in ['offensive', 'debuff', 'defensive']}
-
-    opponent_burning = _has_named_effect(opponent.debuffs, 'Brennend')
-    agent_sticky = _has_named_effect(agent.debuffs, 'Klebrig')
-    low_hp = agent.hp < agent.max_hp * 0.4
-
-    defensive_options = [a for a in available_actions if _get_action_category(a) == 'defensive']
-    if profile == 'defensive' and low_hp and defensive_options:
-        available_actions = defensive_options
-
-    if agent_sticky:
-        min_cost = min(action['stamina_cost'] for action in available_actions)
-        cheap_cap = min_cost + 5
-        available_actions = [a for a in available_actions if a['stamina_cost'] <= cheap_cap]
-
-    action_weights = []
-    for action in available_actions:
-        category = _get_action_category(action)
-        weight = type_randomness[category]
-
-        if profile == 'aggressive' and category == 'offensive':
-            weight *= 1.1
-
-        if profile == 'defensive' and category == 'defensive':
-            weight *= 1.2
-
-        if low_hp and category == 'defensive':
-            weight *= 1.35
-
-        if opponent_burning and category == 'debuff':
-            weight *= 1.25
-
-        if agent_sticky:
-            weight *= 1 / (1 + (action['stamina_cost'] / 12))
-
-        weight *= 1 + (action['damage_range'][1] / 60)
-        weight *= 1 + max(0, (40 - action['stamina_cost'])) / 220
-
-        action_weights.append(weight)
-
-    return rng.choices(available_actions, weights=action_weights, k=1)[0]
-
-@app.route('/')
+from metrics import REGISTRY, CONTENT_TYPE
+from game import Agent, Battle, get_bot_skins, get_unlocked_skins
+from game.ai import select_ai_action
+from game.catalog import Catalog, CatalogWatcher, get_catalog as current_catalog, get_catalog_bundle, install_catalog, load_catalog_file
+
+# Subsystems below are imported where they are first used, so importing the app stays cheap
+if TYPE_CHECKING:
+    from game.tournament import TournamentManager
+    from journal import TurnJournal
+    from matchmaking import MatchmakingQueue, Ticket
+
+bp = Blueprint('main', __name__)
+
+# Admission control (see admission.py): never limited, so load balancers and scrapers see a live worker
+ADMISSION_EXEMPT = frozenset({'main.health', 'main.metrics', 'static'})
+# Cheap reads of precomputed data: may use the reserved slots and are not shed for queue time
+ADMISSION_PRIORITY = frozenset({'main.index', 'main.get_actions', 'main.get_bots', 'main.get_skins',
+                                'main.get_unlocked', 'main.get_current_catalog', 'main.get_catalog'})
+# Long-polls sleep most of the time and do not count against the concurrency limit
+ADMISSION_LONG_POLL = frozenset({'main.poll_match'})
+
+MAX_TOURNAMENT_ENTRANTS = 64
+MAX_LEVEL = 100
+# Reported latencies above this are matched as this (any window that wide is unplayable anyway)
+MAX_LATENCY_MS = 60_000
+
+
+def _valid_level(level) -> bool:
+    return isinstance(level, int) and not isinstance(level, bool) and 1 <= level <= MAX_LEVEL
+
+# Process-wide subsystems, created on first use (see get_battle_storage)
+_battle_storage: Optional[BattleStorage] = None
+_memory_monitor = None
+_tournaments: Optional['TournamentManager'] = None
+_matchmaking: Optional['MatchmakingQueue'] = None
+_catalog_watcher: Optional[CatalogWatcher] = None
+_journal: Optional['TurnJournal'] = None
+_init_lock = threading.Lock()
+
+
+def get_battle_storage() -> BattleStorage:
+    """Battle storage with TTL + cleanup; the cleanup thread starts on first use"""
+    global _battle_storage
+    if _battle_storage is None:
+        with _init_lock:
+            if _battle_storage is None:
+                _battle_storage = BattleStorage()
+    return _battle_storage
+
+
+def get_memory_monitor():
+    """Footprint monitor for the battle storage, created on first use"""
+    global _memory_monitor
+    if _memory_monitor is None:
+        from memory_report import MemoryMonitor, budget_from_env
+        with _init_lock:
+            if _memory_monitor is None:
+                _memory_monitor = MemoryMonitor(get_battle_storage(), budget_from_env())
+    return _memory_monitor
+
+
+def get_tournaments() -> 'TournamentManager':
+    """Running and recent tournaments; TOURNAMENT_WORKERS > 0 plays matches on a process pool,
+    at most TOURNAMENT_MAX_RUNNING run at once"""
+    global _tournaments
+    if _tournaments is None:
+        from game.tournament import TournamentManager
+        with _init_lock:
+            if _tournaments is None:
+                _tournaments = TournamentManager(int(os.environ.get('TOURNAMENT_WORKERS', 0)),
+                                                 max_running=int(os.environ.get('TOURNAMENT_MAX_RUNNING', 4)))
+    return _tournaments
+
+
+def get_journal() -> Optional['TurnJournal']:
+    """Turn journal in JOURNAL_DIR (see journal.py); None when journaling is off"""
+    global _journal
+    if _journal is None and os.environ.get('JOURNAL_DIR'):
+        from journal import TurnJournal
+        with _init_lock:
+            if _journal is None:
+                _journal = TurnJournal(os.environ['JOURNAL_DIR'],
+                                       segment_bytes=int(float(os.environ.get('JOURNAL_SEGMENT_MB', 64)) * (1 << 20)),
+                                       commit_interval=float(os.environ.get('JOURNAL_COMMIT_MS', 5)) / 1000,
+                                       sync=os.environ.get('JOURNAL_SYNC', '1') != '0')
+    return _journal
+
+
+def _new_battle(agent1: Agent, agent2: Agent, catalog: Catalog) -> Battle:
+    # Journaled battles get their own generator, whose state every turn record carries
+    if get_journal() is None:
+        return Battle(agent1, agent2, catalog=catalog)
+    from journal import JournalRandom
+    return Battle(agent1, agent2, catalog=catalog, rng=JournalRandom())
+
+
+def _journal_start(battle_id: str, battle: Battle) -> None:
+    journal = get_journal()
+    if journal is not None and battle.rng is not None:
+        from journal import start_record
+        journal.append(start_record(battle_id, battle))
+
+
+def _journal_sync() -> None:
+    """With JOURNAL_SYNC on, wait until journaled turns are on disk (call outside battle locks)"""
+    journal = get_journal()
+    if journal is not None and journal.sync_commit:
+        journal.sync()
+
+
+def _create_matched_battle(first: 'Ticket', second: 'Ticket') -> str:
+    catalog = current_catalog()
+    agents = [Agent(ticket.name, agent_type=ticket.bot, level=ticket.level,
+                    agent_type_data=catalog.find_bot(ticket.bot)) for ticket in (first, second)]
+    battle_id = secrets.token_urlsafe(16)
+    battle = _new_battle(*agents, catalog)
+    get_battle_storage().set(battle_id, battle)
+    _journal_start(battle_id, battle)
+    return battle_id
+
+
+def get_matchmaking() -> 'MatchmakingQueue':
+    """Matchmaking queue; matched pairs get a stored battle (see matchmaking.py)"""
+    global _matchmaking
+    if _matchmaking is None:
+        from matchmaking import MatchmakingQueue
+        with _init_lock:
+            if _matchmaking is None:
+                _matchmaking = MatchmakingQueue(_create_matched_battle, autostart=False)
+    return _matchmaking
+
+
+# Metrics
+REQUEST_COUNT = REGISTRY.counter('http_requests_total', 'HTTP requests by route, method and status',
+                                 ('route', 'method', 'status'))
+REQUEST_LATENCY = REGISTRY.histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                                     ('route', 'method'))
+TURNS_EXECUTED = REGISTRY.counter('battle_turns_total', 'Battle turns executed')
+COMPRESSION_BYTES = REGISTRY.counter('http_response_compression_bytes_total',
+                                     'Body bytes of responses gzipped per request, before (in) and after (out)',
+                                     ('stage',))
+REQUESTS_REJECTED = REGISTRY.counter('http_requests_rejected_total', 'Requests shed by admission control',
+                                     ('status',))
+EXECUTE_TURN_TIME = REGISTRY.histogram('battle_execute_turn_seconds', 'Time spent in Battle.execute_turn')
+AI_ACTION_TIME = REGISTRY.histogram('battle_ai_action_seconds', 'Time spent in select_ai_action')
+REGISTRY.gauge('battle_storage_size', 'Battles currently stored', lambda: len(get_battle_storage()))
+REGISTRY.counter_func('battle_storage_hits_total', 'Battle lookups that found a live battle',
+                      lambda: get_battle_storage().hits)
+REGISTRY.counter_func('battle_storage_misses_total', 'Battle lookups that found nothing',
+                      lambda: get_battle_storage().misses)
+REGISTRY.counter_func('battle_storage_expired_total', 'Battles dropped after their TTL',
+                      lambda: get_battle_storage().expired)
+REGISTRY.gauge('matchmaking_waiting', 'Players waiting for an opponent', lambda: get_matchmaking().waiting())
+REGISTRY.counter_func('matchmaking_matches_total', 'Pairs matched by the matchmaking queue',
+                      lambda: get_matchmaking().matched)
+REGISTRY.gauge('battle_storage_bytes', 'Estimated bytes held by stored battles (refreshed every 30s)',
+               lambda: get_memory_monitor().total_bytes())
+REGISTRY.gauge('battle_storage_memory_budget_bytes', 'Configured BATTLE_MEMORY_BUDGET_MB in bytes (0 = unset)',
+               lambda: get_memory_monitor().budget_bytes or 0)
+REGISTRY.gauge('battle_storage_over_budget', '1 if stored battles exceed the memory budget',
+               lambda: int(get_memory_monitor().over_budget()))
+
+
+def create_app(config: Optional[Dict] = None) -> Flask:
+    """Application factory"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+    # Admin endpoints are disabled unless a token is configured
+    app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+    # AI opponent: 'heuristic' (select_ai_action) or 'table' (compiled policy file, see game.policy_table)
+    app.config['AI_POLICY'] = os.environ.get('AI_POLICY', 'heuristic')
+    app.config['AI_POLICY_TABLE'] = os.environ.get('AI_POLICY_TABLE')
+    # Upper bounds for /api/battle/preview (requests may ask for less)
+    app.config['PREVIEW_BUDGET_MS'] = int(os.environ.get('PREVIEW_BUDGET_MS', 150))
+    app.config['PREVIEW_MAX_ROLLOUTS'] = int(os.environ.get('PREVIEW_MAX_ROLLOUTS', 200))
+    # Time budget for /api/battle/win-chance (exact solve, then sampling)
+    app.config['WIN_CHANCE_BUDGET_MS'] = int(os.environ.get('WIN_CHANCE_BUDGET_MS', 150))
+    # Largest list accepted by the /api/battles/batch/* endpoints
+    app.config['BATCH_MAX_ITEMS'] = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+    # Longest a matchmaking long-poll may block
+    app.config['MATCHMAKING_MAX_WAIT'] = float(os.environ.get('MATCHMAKING_MAX_WAIT', 30))
+    # Number of reverse proxies whose X-Forwarded-For is trusted for the client address
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+    # Admission control (see admission.py); 0 disables a check. Without TRUSTED_PROXIES every
+    # client may appear with the proxy's address, so rate limiting is off unless it is set.
+    app.config['RATE_LIMIT_PER_SECOND'] = float(os.environ.get('RATE_LIMIT_PER_SECOND',
+                                                               20 if app.config['TRUSTED_PROXIES'] else 0))
+    app.config['RATE_LIMIT_BURST'] = int(os.environ.get('RATE_LIMIT_BURST', 60))
+    # Only useful with threaded workers; a sync worker runs one request at a time
+    app.config['MAX_CONCURRENT_REQUESTS'] = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 0))
+    app.config['PRIORITY_RESERVED_REQUESTS'] = int(os.environ.get('PRIORITY_RESERVED_REQUESTS', 2))
+    app.config['REQUEST_QUEUE_DEPTH'] = int(os.environ.get('REQUEST_QUEUE_DEPTH', 16))
+    app.config['REQUEST_QUEUE_TIMEOUT_MS'] = int(os.environ.get('REQUEST_QUEUE_TIMEOUT_MS', 500))
+    # Shed requests that waited longer than this behind the proxy (needs X-Request-Start)
+    app.config['MAX_QUEUE_TIME_MS'] = int(os.environ.get('MAX_QUEUE_TIME_MS', 0))
+    # Built static assets (python -m assets build); sources are served when there is no manifest
+    app.config['ASSET_DIR'] = os.environ.get('ASSET_DIR', assets.DIST_DIR)
+    # On-page debug logger; unset = only when serving sources or a --debug build
+    if 'DEBUG_LOGGER' in os.environ:
+        app.config['DEBUG_LOGGER'] = os.environ['DEBUG_LOGGER'].lower() in ('1', 'true', 'yes')
+    # Response compression (see compression.py); level 0 turns it off
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+    app.config['COMPRESS_MIN_BYTES'] = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    # Summaries of battles with at least this many rounds are compressed while they stream
+    app.config['COMPRESS_STREAM_ROUNDS'] = int(os.environ.get('COMPRESS_STREAM_ROUNDS', 100))
+    if config:
+        app.config.update(config)
+    if app.config['AI_POLICY'] not in ('heuristic', 'table'):
+        raise ValueError(f"AI_POLICY must be 'heuristic' or 'table', not {app.config['AI_POLICY']!r}")
+    if app.config['AI_POLICY'] == 'table' and not (app.config['AI_POLICY_TABLE']
+                                                   and os.path.isfile(app.config['AI_POLICY_TABLE'])):
+        raise ValueError("AI_POLICY=table needs AI_POLICY_TABLE set to a compiled policy file")
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+    app.extensions['admission'] = Admission.from_config(app.config)
+    CORS(app)
+    manifest = assets.init_app(app)
+    app.config.setdefault('DEBUG_LOGGER', not manifest or 'js/debug-logger.js' in manifest.assets)
+    app.register_blueprint(bp)
+    return app
+
+
+def warm_up() -> None:
+    """Build catalogs and derived indexes before workers fork (gunicorn --preload)"""
+    # Also compiles every bot's passive hooks
+    current_catalog()
+    flask_app = globals().get('app')
+    if flask_app is not None and flask_app.config.get('AI_POLICY') == 'table':
+        # Map the table in the master; forked workers share the mapping
+        from game.policy_table import get_policy_table
+        get_policy_table(flask_app.config['AI_POLICY_TABLE'])
+
+
+def prepare_preload() -> None:
+    """Warm up in the master and freeze the heap so workers share it copy-on-write"""
+    warm_up()
+    gc.collect()
+    gc.freeze()
+
+
+def on_worker_start() -> None:
+    """Start per-worker background threads (gunicorn post_fork hook)"""
+    global _catalog_watcher
+    get_battle_storage().start()
+    journal = get_journal()
+    if journal is not None:
+        journal.start()
+    path = os.environ.get('CATALOG_PATH')
+    if path:
+        # Every worker watches the file, so one edit reaches all of them
+        if _catalog_watcher is None:
+            _catalog_watcher = CatalogWatcher(path, float(os.environ.get('CATALOG_WATCH_INTERVAL', 5)))
+        _catalog_watcher.start()
+
+
+def __getattr__(name: str):
+    # `gunicorn app:app` and `from app import app` create the default app lazily
+    if name == 'app':
+        with _init_lock:
+            if 'app' not in globals():
+                globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@bp.before_app_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+def _client_keys() -> List[str]:
+    """Rate-limit keys: the client address (after ProxyFix), plus the session's client id if it has one"""
+    keys = ['addr:' + (request.remote_addr or '')]
+    client = session.get('client')
+    if client:
+        keys.append('session:' + client)
+    return keys
+
+
+@bp.before_app_request
+def _admit_request():
+    """Rate-limit and shed load before any route runs (429/503 with Retry-After)"""
+    endpoint = request.endpoint
+    if endpoint in ADMISSION_EXEMPT:
+        return None
+    admission = current_app.extensions['admission']
+    high_priority = endpoint in ADMISSION_PRIORITY
+    holds_slot, rejection = admission.admit(
+        _client_keys(), high_priority=high_priority,
+        request_start=request.headers.get('X-Request-Start'),
+        limit_concurrency=endpoint not in ADMISSION_LONG_POLL)
+    if rejection is None:
+        g.admission_slot = holds_slot
+        if admission.buckets is not None and not high_priority and 'client' not in session:
+            # Only admitted requests get a client id, so a rejected client cannot mint fresh ones
+            session['client'] = secrets.token_urlsafe(12)
+        return None
+    status, message, retry_after = rejection
+    REQUESTS_REJECTED.labels(str(status)).inc()
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+@bp.teardown_app_request
+def _release_admission(_error):
+    if g.pop('admission_slot', False):
+        current_app.extensions['admission'].release()
+
+
+@bp.after_app_request
+def _record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.labels(route, request.method).observe(time.perf_counter() - started)
+        REQUEST_COUNT.labels(route, request.method, str(response.status_code)).inc()
+    return response
+
+
+@bp.after_app_request
+def _compress_response(response):
+    level = current_app.config['COMPRESS_LEVEL']
+    if level and request.method != 'HEAD':
+        size = response.content_length
+        compress_response(response, request.accept_encodings, level, current_app.config['COMPRESS_MIN_BYTES'])
+        if response.content_length != size:
+            COMPRESSION_BYTES.labels('in').inc(size)
+            COMPRESSION_BYTES.labels('out').inc(response.content_length)
+    return response
+
+
+def admin_required(view):
+    """Protect a view with the ADMIN_TOKEN bearer token (404 when unset)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_token = current_app.config.get('ADMIN_TOKEN')
+        if not admin_token:
+            return jsonify({'error': 'Not found'}), 404
+        header = request.headers.get('Authorization', '')
+        token = header[len('Bearer '):] if header.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+        if not secrets.compare_digest(token.encode(), admin_token.encode()):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@bp.route('/')
 def index():
     """Main game page"""
-    return render_template('index.html')
+    return render_template('index.html',
+                           catalog_url=url_for('.get_catalog', version=get_catalog_bundle().version),
+                           debug_logger=current_app.config['DEBUG_LOGGER'])
 
-@app.route('/api/actions', methods=['GET'])
+@bp.route('/api/actions', methods=['GET'])
 def get_actions():
     """Get all available actions"""
-    return jsonify(get_all_actions())
+    catalog = current_catalog()
+    return precompressed(catalog.actions_json, catalog.actions_gzip, request.accept_encodings,
+                         current_app.config['COMPRESS_LEVEL'])
 
-@app.route('/api/bots', methods=['GET'])
+@bp.route('/api/bots', methods=['GET'])
 def get_bots():
     """Get all available battle bots"""
-    return jsonify(get_all_battle_bots())
+    catalog = current_catalog()
+    return precompressed(catalog.bots_json, catalog.bots_gzip, request.accept_encodings,
+                         current_app.config['COMPRESS_LEVEL'])
 
-@app.route('/api/bots/<bot_id>/skins', methods=['GET'])
+@bp.route('/api/bots/<bot_id>/skins', methods=['GET'])
 def get_skins(bot_id):
     """Get all skins for a bot"""
     return jsonify(get_bot_skins(bot_id))
 
-@app.route('/api/bots/<bot_id>/unlocked-skins/<int:level>', methods=['GET'])
+@bp.route('/api/bots/<bot_id>/unlocked-skins/<int:level>', methods=['GET'])
 def get_unlocked(bot_id, level):
     """Get unlocked skins for a bot at given level"""
     return jsonify(get_unlocked_skins(bot_id, level))
 
-@app.route('/api/battle/start', methods=['POST'])
-def start_battle():
-    """Start a new battle"""
-    data = request.json
-    
-    # Create agents
+@bp.route('/api/catalog', methods=['GET'])
+def get_current_catalog():
+    """Redirect to the current content-hashed catalog bundle"""
+    response = redirect(url_for('.get_catalog', version=get_catalog_bundle().version))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@bp.route('/api/catalog/<version>', methods=['GET'])
+def get_catalog(version):
+    """Get bots, skins and actions in one immutable, precompressed bundle"""
+    bundle = get_catalog_bundle()
+    if version != bundle.version:
+        return jsonify({'error': 'Unknown catalog version', 'current': bundle.version}), 404
+
+    response = precompressed(bundle.body, bundle.gzip_body, request.accept_encodings,
+                             current_app.config['COMPRESS_LEVEL'])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    # Each representation gets its own entity tag
+    response.set_etag(bundle.version + ('-gzip' if response.content_encoding else ''))
+    return response.make_conditional(request)
+
+def _battle_from_spec(data: Dict):
+    """Build a Battle from start parameters; returns (battle, None) or (None, error message)"""
     agent1_name = data.get('agent1_name', 'Agent Alpha')
     agent2_name = data.get('agent2_name', 'Agent Beta')
     agent1_bot = data.get('agent1_bot', 'mende')
     agent2_bot = data.get('agent2_bot', 'regulus')
-    
+    agent1_level = data.get('agent1_level', 1)
+    agent2_level = data.get('agent2_level', 1)
+
     # Get bot data
-    agent1_bot_data = get_battle_bot(agent1_bot)
-    agent2_bot_data = get_battle_bot(agent2_bot)
-    
-    agent1 = Agent(agent1_name, agent_type=agent1_bot, level=1, agent_type_data=agent1_bot_data)
-    agent2 = Agent(agent2_name, agent_type=agent2_bot, level=1, agent_type_data=agent2_bot_data)
-    
-    # Create battle
-    battle = Battle(agent1, agent2)
+    catalog = current_catalog()
+    agent1_bot_data = catalog.find_bot(agent1_bot)
+    agent2_bot_data = catalog.find_bot(agent2_bot)
+    if agent1_bot_data is None or agent2_bot_data is None:
+        return None, 'Unknown bot'
+    if not _valid_level(agent1_level) or not _valid_level(agent2_level):
+        return None, f'level must be an integer from 1 to {MAX_LEVEL}'
+
+    agent1 = Agent(agent1_name, agent_type=agent1_bot, level=agent1_level, agent_type_data=agent1_bot_data)
+    agent2 = Agent(agent2_name, agent_type=agent2_bot, level=agent2_level, agent_type_data=agent2_bot_data)
+    return _new_battle(agent1, agent2, catalog), None
+
+@bp.route('/api/battle/start', methods=['POST'])
+def start_battle():
+    """Start a new battle"""
+    battle, error = _battle_from_spec(request.json)
+    if error:
+        return jsonify({'error': error}), 400
     
     # Generate battle ID
     battle_id = secrets.token_urlsafe(16)
-    battle_storage.set(battle_id, battle)
+    get_battle_storage().set(battle_id, battle)
+    _journal_start(battle_id, battle)
     
     # Store in session
     session['battle_id'] = battle_id
     
     return jsonify({
         'battle_id': battle_id,
-        'agent1': agent1.to_dict(),
-        'agent2': agent2.to_dict()
+        'agent1': battle.agent1.to_dict(),
+        'agent2': battle.agent2.to_dict()
     })
 
-@app.route('/api/battle/turn', methods=['POST'])
+def _play_turn(battle_id: str, battle: Battle, action1_id, action2_id, idempotency_key: Optional[str] = None,
+               expected_round: Optional[int] = None):
+    """Execute a turn while holding the battle's lock.
+
+    Returns (result, replayed, None) or (None, False, (error message, status)).
+    A turn submitted again with the same idempotency key returns the saved
+    result instead of playing another round. Journaled turns are appended
+    here; callers wait for the commit with _journal_sync().
+    """
+    storage = get_battle_storage()
+    fingerprint = (action1_id, action2_id)
+    with storage.lock(battle_id):
+        if idempotency_key is not None:
+            saved = storage.turn_result(battle_id, idempotency_key)
+            if saved is not None:
+                if saved[0] != fingerprint:
+                    return None, False, ('Idempotency key was already used for other actions', 422)
+                return saved[1], True, None
+        if battle.winner is not None:
+            return None, False, ('Battle is already over', 409)
+        if expected_round is not None and expected_round != battle.current_round:
+            return None, False, (f'Battle is at round {battle.current_round}, not {expected_round}', 409)
+
+        journal = get_journal() if battle.rng is not None else None
+        rng_state = battle.rng.getstate() if journal is not None else 0
+        started = time.perf_counter()
+        result = battle.execute_turn(action1_id, action2_id)
+        EXECUTE_TURN_TIME.observe(time.perf_counter() - started)
+        TURNS_EXECUTED.inc()
+        if journal is not None:
+            from journal import turn_record
+            journal.append(turn_record(battle_id, battle, rng_state, action1_id, action2_id, result))
+        if idempotency_key is not None:
+            storage.save_turn_result(battle_id, idempotency_key, fingerprint, result)
+    return result, False, None
+
+@bp.route('/api/battle/turn', methods=['POST'])
 def execute_turn():
-    """Execute one turn of battle"""
+    """Execute one turn of battle.
+
+    Send an Idempotency-Key header to make retries safe, and optionally
+    expected_round (rounds played so far) to reject turns based on a stale state.
+    """
     data = request.json
     battle_id = data.get('battle_id') or session.get('battle_id')
-    
-    if not battle_id or not battle_storage.has(battle_id):
+    battle = get_battle_storage().get(battle_id) if battle_id else None
+
+    if battle is None:
         return jsonify({'error': 'Battle not found'}), 404
 
-    battle = battle_storage.get(battle_id)
-    
     action1_id = data.get('action1_id', 1)
     action2_id = data.get('action2_id', 1)
-    
-    # Execute turn
-    result = battle.execute_turn(action1_id, action2_id)
-    
-    # Clean up if battle is over
-    if result['battle_over']:
-        # Keep battle for a while for summary
-        pass
-    
-    return jsonify(result)
-
-@app.route('/api/battle/summary/<battle_id>', methods=['GET'])
+    result, replayed, error = _play_turn(battle_id, battle, action1_id, action2_id,
+                                         request.headers.get('Idempotency-Key'), data.get('expected_round'))
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    _journal_sync()
+
+    response = jsonify(result)
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+@bp.route('/api/battle/summary/<battle_id>', methods=['GET'])
 def get_battle_summary(battle_id):
     """Get battle summary"""
-    if not battle_storage.has(battle_id):
+    battle = get_battle_storage().get(battle_id)
+    if battle is None:
         return jsonify({'error': 'Battle not found'}), 404
 
-    battle = battle_storage.get(battle_id)
+    level = current_app.config['COMPRESS_LEVEL']
+    if (level and battle.current_round >= current_app.config['COMPRESS_STREAM_ROUNDS']
+            and accepts_gzip(request.accept_encodings)):
+        return stream_json(_summary_snapshot(battle), _json_encoder(), level)
     return jsonify(battle.get_battle_summary())
 
-@app.route('/api/battle/ai-action', methods=['POST'])
+def _summary_snapshot(battle: Battle) -> Dict:
+    """Battle summary that later turns cannot change while it is streamed"""
+    summary = battle.get_battle_summary()
+    summary['battle_log'] = list(summary['battle_log'])
+    for key in ('agent1', 'agent2'):
+        state = summary[key]
+        summary[key] = dict(state, buffs=list(state['buffs']), debuffs=list(state['debuffs']))
+    return summary
+
+def _json_encoder() -> json.JSONEncoder:
+    """Encoder producing the same output as jsonify()"""
+    provider = current_app.json
+    return json.JSONEncoder(ensure_ascii=provider.ensure_ascii, sort_keys=provider.sort_keys,
+                            separators=(',', ':'), default=provider.default)
+
+@bp.route('/api/battle/win-chance/<battle_id>', methods=['GET'])
+def get_win_chance(battle_id):
+    """Win chances of both agents from the current state (exact late in the battle, sampled early)"""
+    battle = get_battle_storage().get(battle_id)
+    if battle is None:
+        return jsonify({'error': 'Battle not found'}), 404
+    # Evaluate a snapshot: turns may change the battle meanwhile
+    with get_battle_storage().lock(battle_id):
+        battle = battle.fork()
+
+    from game.win_probability import battle_win_probability
+    return jsonify(battle_win_probability(battle, budget=current_app.config['WIN_CHANCE_BUDGET_MS'] / 1000))
+
+@bp.route('/api/battle/preview', methods=['POST'])
+def preview_battle_actions():
+    """Expected damage and win chance of each action, from rollouts of forked battles"""
+    data = request.json
+    battle_id = data.get('battle_id') or session.get('battle_id')
+    battle = get_battle_storage().get(battle_id) if battle_id else None
+
+    if battle is None:
+        return jsonify({'error': 'Battle not found'}), 404
+    # Roll out from a snapshot so turns are not held up for the whole budget
+    with get_battle_storage().lock(battle_id):
+        battle = battle.fork()
+    if battle.winner is not None:
+        return jsonify({'error': 'Battle is already over'}), 409
+
+    agent = data.get('agent', 1)
+    if agent not in (1, 2):
+        return jsonify({'error': 'agent must be 1 or 2'}), 400
+    budget_ms = data.get('budget_ms', current_app.config['PREVIEW_BUDGET_MS'])
+    if not isinstance(budget_ms, (int, float)) or isinstance(budget_ms, bool) or not budget_ms > 0:
+        return jsonify({'error': 'budget_ms must be a positive number'}), 400
+    rollouts = data.get('rollouts', current_app.config['PREVIEW_MAX_ROLLOUTS'])
+    if not isinstance(rollouts, int) or isinstance(rollouts, bool) or rollouts < 1:
+        return jsonify({'error': 'rollouts must be a positive integer'}), 400
+    budget_ms = min(budget_ms, current_app.config['PREVIEW_BUDGET_MS'])
+    rollouts = min(rollouts, current_app.config['PREVIEW_MAX_ROLLOUTS'])
+
+    from game.preview import preview_actions
+    return jsonify(preview_actions(battle, agent, rollouts=rollouts, budget=budget_ms / 1000))
+
+@bp.route('/api/battle/ai-action', methods=['POST'])
 def get_ai_action():
     """Get AI-recommended action"""
     data = request.json
     battle_id = data.get('battle_id') or session.get('battle_id')
-    
-    if not battle_id or not battle_storage.has(battle_id):
+    battle = get_battle_storage().get(battle_id) if battle_id else None
+
+    if battle is None:
         return jsonify({'error': 'Battle not found'}), 404
 
-    battle = battle_storage.get(battle_id)
     agent = battle.agent2  # AI is always agent2
     opponent = battle.agent1
 
-    action = select_ai_action(agent, opponent)
+    started = time.perf_counter()
+    action = None
+    if current_app.config.get('AI_POLICY') == 'table':
+        # Fall back to the heuristic for states the table does not cover
+        from game.policy_table import get_policy_table
+        action = get_policy_table(current_app.config['AI_POLICY_TABLE']).select(agent, opponent, battle.catalog)
+    if action is None:
+        action = select_ai_action(agent, opponent, actions=battle.catalog.actions)
+    AI_ACTION_TIME.observe(time.perf_counter() - started)
 
     return jsonify({'action_id': action['id']})
 
-@app.route('/health')
+def _batch_items(key: str):
+    """The list under `key` of the request body, or an error response"""
+    data = request.get_json(silent=True) or {}
+    items = data.get(key)
+    if not isinstance(items, list):
+        return None, (jsonify({'error': f'{key} must be a list'}), 400)
+    limit = current_app.config['BATCH_MAX_ITEMS']
+    if len(items) > limit:
+        return None, (jsonify({'error': f'At most {limit} items per batch'}), 413)
+    return items, None
+
+@bp.route('/api/battles/batch/start', methods=['POST'])
+def batch_start_battles():
+    """Create many battles; each item takes the same fields as /api/battle/start"""
+    specs, error_response = _batch_items('battles')
+    if error_response:
+        return error_response
+
+    results, created = [], []
+    for spec in specs:
+        battle, error = _battle_from_spec(spec) if isinstance(spec, dict) else (None, 'Expected an object')
+        if error:
+            results.append({'error': error})
+            continue
+        battle_id = secrets.token_urlsafe(16)
+        created.append((battle_id, battle))
+        results.append({'battle_id': battle_id, 'agent1': battle.agent1.to_dict(), 'agent2': battle.agent2.to_dict()})
+    get_battle_storage().set_many(created)
+    for battle_id, battle in created:
+        _journal_start(battle_id, battle)
+    return jsonify({'results': results})
+
+@bp.route('/api/battles/batch/turn', methods=['POST'])
+def batch_execute_turns():
+    """Execute one turn in each of many battles: [{battle_id, action1_id, action2_id}, ...]"""
+    turns, error_response = _batch_items('turns')
+    if error_response:
+        return error_response
+
+    turns = [turn if isinstance(turn, dict) else {} for turn in turns]
+    battles = get_battle_storage().get_many([turn.get('battle_id') for turn in turns
+                                             if isinstance(turn.get('battle_id'), str)])
+    results = []
+    for turn in turns:
+        battle_id = turn.get('battle_id')
+        battle = battles.get(battle_id) if isinstance(battle_id, str) else None
+        action1_id = turn.get('action1_id', 1)
+        action2_id = turn.get('action2_id', 1)
+        idempotency_key = turn.get('idempotency_key')
+        if battle is None:
+            results.append({'battle_id': battle_id, 'error': 'Battle not found'})
+        elif not all(isinstance(action_id, int) and not isinstance(action_id, bool)
+                     for action_id in (action1_id, action2_id)):
+            results.append({'battle_id': battle_id, 'error': 'Action ids must be integers'})
+        elif idempotency_key is not None and not isinstance(idempotency_key, str):
+            results.append({'battle_id': battle_id, 'error': 'idempotency_key must be a string'})
+        elif action1_id not in battle.catalog.actions_by_id or action2_id not in battle.catalog.actions_by_id:
+            results.append({'battle_id': battle_id, 'error': 'Unknown action'})
+        else:
+            result, replayed, error = _play_turn(battle_id, battle, action1_id, action2_id,
+                                                 idempotency_key, turn.get('expected_round'))
+            if error:
+                results.append({'battle_id': battle_id, 'error': error[0]})
+            else:
+                results.append({'battle_id': battle_id, 'result': result, 'replayed': replayed})
+    # One commit covers the whole batch
+    _journal_sync()
+    return jsonify({'results': results})
+
+@bp.route('/api/battles/batch/get', methods=['POST'])
+def batch_get_battles():
+    """Current state (without the log) of many battles in one storage lookup"""
+    battle_ids, error_response = _batch_items('battle_ids')
+    if error_response:
+        return error_response
+
+    battles = get_battle_storage().get_many([battle_id for battle_id in battle_ids if isinstance(battle_id, str)])
+    results = []
+    for battle_id in battle_ids:
+        battle = battles.get(battle_id) if isinstance(battle_id, str) else None
+        if battle is None:
+            results.append({'battle_id': battle_id, 'error': 'Battle not found'})
+            continue
+        results.append({
+            'battle_id': battle_id,
+            'rounds': battle.current_round,
+            'winner': battle.winner.name if battle.winner else None,
+            'agent1': battle.agent1.to_dict(),
+            'agent2': battle.agent2.to_dict(),
+        })
+    return jsonify({'results': results})
+
+@bp.route('/api/tournaments', methods=['POST'])
+def start_tournament():
+    """Start a tournament in the background; poll it with GET /api/tournaments/<id>"""
+    from game.tournament import (FORMATS as TOURNAMENT_FORMATS, MAX_MATCH_ROUNDS, TooManyTournaments, Tournament,
+                                 entrants_from_spec)
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', 'round_robin')
+    if fmt not in TOURNAMENT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(TOURNAMENT_FORMATS)}"}), 400
+
+    entrants = data.get('entrants', 'all')
+    if entrants != 'all' and (not isinstance(entrants, list) or len(entrants) > MAX_TOURNAMENT_ENTRANTS):
+        return jsonify({'error': f'entrants must be "all" or a list of at most {MAX_TOURNAMENT_ENTRANTS}'}), 400
+    if entrants != 'all' and not all(_valid_level(item.get('level', 1)) for item in entrants if isinstance(item, dict)):
+        return jsonify({'error': f'level must be an integer from 1 to {MAX_LEVEL}'}), 400
+    try:
+        max_rounds = min(int(data.get('max_rounds', 100)), MAX_MATCH_ROUNDS)
+        tournament = Tournament(entrants_from_spec(entrants), fmt, seed=int(data.get('seed', 0)),
+                                rounds=int(data['rounds']) if data.get('rounds') is not None else None,
+                                max_rounds=max_rounds)
+    except (KeyError, TypeError, ValueError) as error:
+        return jsonify({'error': str(error)}), 400
+
+    try:
+        tournament_id = get_tournaments().create(tournament)
+    except TooManyTournaments as error:
+        return jsonify({'error': str(error)}), 429
+    return jsonify({'tournament_id': tournament_id, 'total_rounds': tournament.total_rounds}), 202
+
+@bp.route('/api/tournaments/<tournament_id>', methods=['GET'])
+def get_tournament(tournament_id):
+    """Standings plus match results from index ?since= on (pass the previous response's `next`)"""
+    tournament = get_tournaments().get(tournament_id)
+    if tournament is None:
+        return jsonify({'error': 'Tournament not found'}), 404
+    return jsonify(tournament.snapshot(request.args.get('since', 0, type=int)))
+
+@bp.route('/api/matchmaking/queue', methods=['POST'])
+def enqueue_for_match():
+    """Join the matchmaking queue; poll the ticket until it has a battle_id"""
+    data = request.get_json(silent=True) or {}
+    bot_id = data.get('bot', 'mende')
+    level = data.get('level', 1)
+    if current_catalog().find_bot(bot_id) is None:
+        return jsonify({'error': 'Unknown bot'}), 400
+    if not _valid_level(level):
+        return jsonify({'error': f'level must be an integer from 1 to {MAX_LEVEL}'}), 400
+    latency_ms = data.get('latency_ms', 0)
+    if (not isinstance(latency_ms, (int, float)) or isinstance(latency_ms, bool)
+            or not math.isfinite(latency_ms) or latency_ms < 0):
+        return jsonify({'error': 'latency_ms must be a non-negative number'}), 400
+    latency_ms = min(latency_ms, MAX_LATENCY_MS)
+
+    ticket = get_matchmaking().enqueue(data.get('name') or 'Agent', bot_id, level, latency_ms)
+    if ticket.battle_id:
+        session['battle_id'] = ticket.battle_id
+    return jsonify(ticket.to_dict()), 202 if ticket.status == 'waiting' else 200
+
+@bp.route('/api/matchmaking/queue/<ticket_id>', methods=['GET'])
+def poll_match(ticket_id):
+    """Ticket status; ?wait=N blocks up to N seconds until a match is found (long-poll)"""
+    wait = min(request.args.get('wait', 0, type=float), current_app.config['MATCHMAKING_MAX_WAIT'])
+    queue = get_matchmaking()
+    ticket = queue.wait(ticket_id, wait) if wait > 0 else queue.get(ticket_id)
+    if ticket is None:
+        return jsonify({'error': 'Ticket not found'}), 404
+    if ticket.battle_id:
+        session['battle_id'] = ticket.battle_id
+    return jsonify(ticket.to_dict())
+
+@bp.route('/api/matchmaking/queue/<ticket_id>', methods=['DELETE'])
+def leave_queue(ticket_id):
+    """Leave the queue (only while still waiting)"""
+    if not get_matchmaking().cancel(ticket_id):
+        return jsonify({'error': 'Ticket not waiting'}), 409
+    return jsonify({'ticket_id': ticket_id, 'status': 'cancelled'})
+
+@bp.route('/health')
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'ok'})
 
+@bp.route('/metrics')
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@bp.route('/admin/profile/cpu', methods=['GET', 'POST'])
+@admin_required
+def profile_cpu():
+    """Start a stack sampling run (POST) or fetch its collapsed stacks (GET)"""
+    import profiling
+
+    if request.method == 'POST':
+        seconds = request.args.get('seconds', 10, type=float)
+        interval = request.args.get('interval', 0.005, type=float)
+        if not profiling.sampler.start(seconds, interval):
+            return jsonify({'error': 'Profiling already running'}), 409
+        return jsonify({'status': 'started', 'seconds': seconds}), 202
+
+    result = profiling.sampler.result()
+    if request.args.get('format') == 'collapsed':
+        return Response(result['collapsed'] + '\n', content_type='text/plain; charset=utf-8')
+    return jsonify(result)
+
+@bp.route('/admin/profile/tracemalloc', methods=['GET', 'POST'])
+@admin_required
+def profile_tracemalloc():
+    """Toggle tracemalloc (POST start/stop) or report top allocation sites (GET)"""
+    import profiling
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('action') == 'stop':
+            changed = profiling.stop_tracemalloc()
+        else:
+            changed = profiling.start_tracemalloc(int(data.get('frames', 5)))
+        return jsonify({'tracing': profiling.tracemalloc.is_tracing(), 'changed': changed})
+
+    limit = request.args.get('limit', 20, type=int)
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'group_by must be lineno, filename or traceback'}), 400
+    return jsonify(profiling.top_allocations(limit, group_by))
+
+@bp.route('/admin/memory', methods=['GET'])
+@admin_required
+def memory_footprint():
+    """Report stored battle footprint: total bytes, by round count and top-N largest"""
+    top_n = request.args.get('top', 10, type=int)
+    return jsonify(get_memory_monitor().report(top_n))
+
+@bp.route('/admin/journal', methods=['GET'])
+@admin_required
+def journal_status():
+    """Report this worker's turn journal counters"""
+    journal = get_journal()
+    if journal is None:
+        return jsonify({'error': 'Journal is off (set JOURNAL_DIR)'}), 404
+    return jsonify(journal.stats())
+
+@bp.route('/admin/journal/<battle_id>', methods=['GET'])
+@admin_required
+def journal_replay(battle_id):
+    """Rebuild a battle from the journal (all workers' segments) and return its summary"""
+    journal = get_journal()
+    if journal is None:
+        return jsonify({'error': 'Journal is off (set JOURNAL_DIR)'}), 404
+    journal.sync()
+    from journal import JournalReader
+    try:
+        battle = JournalReader(journal.directory).rebuild(battle_id)
+    except KeyError:
+        return jsonify({'error': 'Battle not in journal'}), 404
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 409
+    return jsonify(battle.get_battle_summary())
+
+@bp.route('/admin/catalog', methods=['GET'])
+@admin_required
+def catalog_status():
+    """Report the catalog version this worker serves"""
+    return jsonify(current_catalog().to_dict())
+
+@bp.route('/admin/catalog/reload', methods=['POST'])
+@admin_required
+def reload_catalog():
+    """Swap in a new catalog from the JSON body, or from CATALOG_PATH when there is none.
+
+    Only this worker reloads; with CATALOG_PATH set, edit the file and every
+    worker's watcher picks it up instead. Running battles keep their catalog.
+    """
+    data = request.get_json(silent=True)
+    path = os.environ.get('CATALOG_PATH')
+    try:
+        if data is not None:
+            catalog = Catalog(data, source='admin')
+        elif path:
+            catalog = load_catalog_file(path)
+        else:
+            return jsonify({'error': 'Send catalog data or set CATALOG_PATH'}), 400
+    except (OSError, ValueError) as error:
+        return jsonify({'error': str(error)}), 400
+    previous = install_catalog(catalog)
+    return jsonify({'version': catalog.version, 'previous': previous.version if previous else None})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=True)
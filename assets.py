@@ -0,0 +1,306 @@
+"""
+Agent Battle Simulator - Static Asset Pipeline
+Builds fingerprinted, minified and precompressed static files and serves them.
+
+Usage:
+    python -m assets build                  # static/ -> static/dist/ + manifest.json
+    python -m assets build --debug          # also ship the debug logger
+
+The build minifies every asset in ASSETS, names it after a hash of its
+contents (css/style.css -> css/style.1f2e3d4c5b.css) and writes .gz and, when
+the brotli package is installed, .br variants next to it. manifest.json maps
+source names to built ones. With a manifest present, url_for('static', ...)
+resolves to the built names, which are served with the best precompressed
+variant the client accepts and an immutable Cache-Control header. Files not
+in the manifest are served from static/ as before.
+
+The minifiers only drop comments and whitespace (JS keeps its line breaks,
+so automatic semicolon insertion is unaffected); they are no substitute for
+a real bundler, but need no Node toolchain.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+from flask import Flask, abort, request, send_from_directory
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+# URL prefix of built files below /static/
+URL_PREFIX = 'dist/'
+
+# Assets to build; debug-only ones are left out of production builds
+ASSETS = ('css/style.css', 'js/game.js')
+DEBUG_ASSETS = ('js/debug-logger.js',)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Content-Encoding -> file suffix, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and redundant whitespace"""
+    css = _CSS_COMMENT.sub('', source)
+    css = _CSS_SPACE.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = _CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip() + '\n'
+
+
+# A '/' after these (or at the start) begins a regex literal, otherwise it is division
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^\n')
+# A / after these words starts a regex (return /x/), after other words it divides (a / b)
+_REGEX_KEYWORDS = frozenset({'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                             'case', 'do', 'else', 'yield', 'await'})
+# ... and after the ) closing their heads: if (a) /x/.test(s)
+_CONTROL_KEYWORDS = frozenset({'if', 'while', 'for', 'with'})
+_WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$')
+
+
+def minify_js(source: str) -> str:
+    """Drop comments, indentation and blank lines outside strings, templates and regexes"""
+    out: List[str] = []
+    i, n = 0, len(source)
+    # One entry per open ${ ... } inside template literals: the brace depth to return at
+    templates: List[int] = []
+    depth = 0
+    last = '\n'
+    # The last token as far as / is concerned: a word, or whether a ) closed a control-flow head
+    last_word: Optional[str] = None
+    control_paren = False
+    # One entry per open (: whether it starts a control-flow head
+    parens: List[bool] = []
+
+    def emit(text: str) -> None:
+        nonlocal last, last_word, control_paren
+        out.append(text)
+        stripped = text.rstrip(' \t')
+        if stripped:
+            last = stripped[-1]
+            last_word, control_paren = None, False
+
+    def regex_allowed() -> bool:
+        if last_word is not None:
+            return last_word in _REGEX_KEYWORDS
+        return control_paren if last == ')' else last in _REGEX_AFTER
+
+    while i < n:
+        char = source[i]
+        if char == '/' and source.startswith('//', i):
+            i = source.find('\n', i)
+            i = n if i < 0 else i
+        elif char == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            if out and not out[-1].endswith((' ', '\n')):
+                emit(' ')
+        elif char in '\'"':
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            emit(source[i:end + 1])
+            i = end + 1
+        elif char == '`' or (char == '}' and templates and templates[-1] == depth):
+            if char == '}':
+                templates.pop()
+            # Template text up to the closing backtick or the next ${
+            end = i + 1
+            while end < n and source[end] != '`' and not source.startswith('${', end):
+                end += 2 if source[end] == '\\' else 1
+            if source.startswith('${', end):
+                templates.append(depth)
+                emit(source[i:end + 2])
+                i = end + 2
+            else:
+                emit(source[i:end + 1])
+                i = end + 1
+        elif char == '/' and regex_allowed():
+            end, in_class = i + 1, False
+            while end < n and (in_class or source[end] != '/') and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            emit(source[i:end + 1])
+            i = end + 1
+        elif char in ' \t\r\n':
+            end = i
+            while end < n and source[end] in ' \t\r\n':
+                end += 1
+            if '\n' in source[i:end]:
+                if last != '\n':
+                    if out[-1] == ' ':
+                        out.pop()
+                    emit('\n')
+            elif last != '\n':
+                emit(' ')
+            i = end
+        elif char in _WORD_CHARS:
+            end = i + 1
+            while end < n and source[end] in _WORD_CHARS:
+                end += 1
+            # A property (x.return) is not a keyword
+            word = source[i:end] if last != '.' else ''
+            emit(source[i:end])
+            last_word = word
+            i = end
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            if char == '(':
+                parens.append(last_word in _CONTROL_KEYWORDS)
+            closes_control = char == ')' and bool(parens) and parens.pop()
+            emit(char)
+            control_paren = closes_control
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprinted_name(name: str, body: bytes) -> str:
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(body).hexdigest()[:10]}{extension}'
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def build(source: str = STATIC_DIR, output: str = DIST_DIR, debug: bool = False) -> Dict[str, str]:
+    """Build every asset into output and write the manifest; returns source name -> built name"""
+    brotli = _brotli()
+    manifest = {}
+    for name in ASSETS + (DEBUG_ASSETS if debug else ()):
+        with open(os.path.join(source, name), encoding='utf-8') as handle:
+            text = handle.read()
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        body = (minify(text) if minify else text).encode('utf-8')
+        built = fingerprinted_name(name, body)
+        path = os.path.join(output, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = [('', body), ('.gz', gzip.compress(body, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(body, quality=11)))
+        for suffix, data in variants:
+            # Only keep compressed variants that are actually smaller
+            if suffix and len(data) >= len(body):
+                continue
+            with open(path + suffix, 'wb') as handle:
+                handle.write(data)
+        manifest[name] = built
+    with open(os.path.join(output, MANIFEST_NAME), 'w', encoding='utf-8') as handle:
+        json.dump({'assets': manifest, 'debug': debug}, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+    return manifest
+
+
+class AssetManifest:
+    """Built asset names for one app; a missing manifest means serve sources as they are."""
+
+    def __init__(self, directory: str = DIST_DIR):
+        self.directory = directory
+        self.assets: Dict[str, str] = {}
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as handle:
+                self.assets = json.load(handle)['assets']
+        except (OSError, ValueError, KeyError):
+            pass
+        self.built = frozenset(self.assets.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.assets)
+
+    def url_filename(self, filename: str) -> str:
+        built = self.assets.get(filename)
+        return URL_PREFIX + built if built is not None else filename
+
+
+def preferred_encoding(accept_encodings, available) -> Optional[str]:
+    """Best of the available content codings the client accepts (None = identity)"""
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def init_app(app: Flask) -> AssetManifest:
+    """Resolve url_for('static', ...) to built names and serve built files precompressed"""
+    manifest = AssetManifest(app.config['ASSET_DIR'])
+    app.extensions['assets'] = manifest
+    if not manifest:
+        return manifest
+    send_static_file = app.view_functions['static']
+
+    @app.url_defaults
+    def _fingerprinted_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.url_filename(values['filename'])
+
+    def static(filename):
+        if not filename.startswith(URL_PREFIX):
+            return send_static_file(filename=filename)
+        built = filename[len(URL_PREFIX):]
+        if built not in manifest.built:
+            abort(404)
+        available = [encoding for encoding, suffix in ENCODINGS
+                     if os.path.exists(os.path.join(manifest.directory, built + suffix))]
+        encoding = preferred_encoding(request.accept_encodings, available)
+        suffix = dict(ENCODINGS)[encoding] if encoding else ''
+        response = send_from_directory(manifest.directory, built + suffix, max_age=31536000,
+                                       mimetype=mimetypes.guess_type(built)[0])
+        # Name and encoding of the file on disk are an implementation detail
+        response.headers.pop('Content-Disposition', None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    app.view_functions['static'] = static
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m assets', description="Build fingerprinted static assets")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_cmd = commands.add_parser('build', help="Minify, fingerprint and precompress static files")
+    build_cmd.add_argument('-o', '--output', default=DIST_DIR)
+    build_cmd.add_argument('--debug', action='store_true', help="Include the debug logger")
+    args = parser.parse_args(argv)
+
+    manifest = build(output=args.output, debug=args.debug)
+    if _brotli() is None:
+        print("note: brotli is not installed, only .gz variants were written", file=sys.stderr)
+    for name, built in sorted(manifest.items()):
+        print(f"{name} -> {built}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
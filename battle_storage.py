@@ -1,19 +1,62 @@
+import copy
+import os
 import threading
 import time
-from typing import Dict, Optional, Tuple
+import weakref
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+# Battles share this many turn locks; two battles only contend when they hash to the same stripe
+LOCK_STRIPES = 256
+# Idempotency keys remembered per battle (oldest forgotten first)
+TURN_RESULTS_PER_BATTLE = 16
+
+
+def _call_if_alive(method: weakref.WeakMethod) -> None:
+    bound = method()
+    if bound is not None:
+        bound()
 
 
 class BattleStorage:
     """Thread-safe in-memory battle storage with TTL-based cleanup."""
 
-    def __init__(self, ttl_seconds: int = 3600, cleanup_interval: int = 300):
+    def __init__(self, ttl_seconds: int = 3600, cleanup_interval: int = 300, autostart: bool = True):
         self.ttl_seconds = ttl_seconds
         self.cleanup_interval = cleanup_interval
         self._battles: Dict[str, Tuple[object, float]] = {}
         self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # battle_id -> idempotency key -> (request fingerprint, turn result)
+        self._turn_results: Dict[str, OrderedDict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
         self._stop_event = threading.Event()
-        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self._cleanup_thread.start()
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        if autostart:
+            self.start()
+        # Checked once per fork rather than on every write
+        os.register_at_fork(after_in_child=partial(_call_if_alive, weakref.WeakMethod(self._after_fork)))
+
+    def _after_fork(self) -> None:
+        # Only the forking thread survives: locks other threads held stay locked, the cleanup thread is gone
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        if self._owner_pid is not None:
+            self.start()
+
+    def start(self) -> None:
+        """Start the cleanup thread in this process (forked children restart it themselves)."""
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self._stop_event = threading.Event()
+            self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+            self._cleanup_thread.start()
 
     def _cleanup_loop(self) -> None:
         while not self._stop_event.wait(self.cleanup_interval):
@@ -21,7 +64,8 @@ class BattleStorage:
 
     def stop(self) -> None:
         self._stop_event.set()
-        self._cleanup_thread.join(timeout=1)
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join(timeout=1)
 
     def set(self, battle_id: str, battle: object) -> None:
         with self._lock:
@@ -31,14 +75,70 @@ class BattleStorage:
         with self._lock:
             entry = self._battles.get(battle_id)
             if not entry:
+                self.misses += 1
                 return None
 
             battle, created_at = entry
             if time.time() - created_at > self.ttl_seconds:
                 del self._battles[battle_id]
+                self._turn_results.pop(battle_id, None)
+                self.expired += 1
+                self.misses += 1
                 return None
+            self.hits += 1
             return battle
 
+    def set_many(self, items: List[Tuple[str, object]]) -> None:
+        """Store several battles under one lock acquisition."""
+        now = time.time()
+        with self._lock:
+            for battle_id, battle in items:
+                self._battles[battle_id] = (battle, now)
+
+    def get_many(self, battle_ids: List[str]) -> Dict[str, object]:
+        """Look up several battles under one lock acquisition; missing/expired ids are left out."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for battle_id in battle_ids:
+                entry = self._battles.get(battle_id)
+                if not entry:
+                    self.misses += 1
+                    continue
+                battle, created_at = entry
+                if now - created_at > self.ttl_seconds:
+                    del self._battles[battle_id]
+                    self._turn_results.pop(battle_id, None)
+                    self.expired += 1
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[battle_id] = battle
+        return found
+
+    def lock(self, battle_id: str) -> threading.Lock:
+        """Lock to hold while reading or changing one battle.
+
+        Locks are striped: a fixed pool shared by hashing the battle id, so there
+        is nothing to create or clean up per battle. Never hold two at once.
+        """
+        return self._stripes[hash(battle_id) % len(self._stripes)]
+
+    def turn_result(self, battle_id: str, key: str) -> Optional[Tuple[object, Dict]]:
+        """(fingerprint, result) saved for an idempotency key of a battle, if any."""
+        with self._lock:
+            results = self._turn_results.get(battle_id)
+            return results.get(key) if results else None
+
+    def save_turn_result(self, battle_id: str, key: str, fingerprint: object, result: Dict) -> None:
+        """Save a snapshot of a turn's result: it shares the agents' buff lists, which later turns change."""
+        result = copy.deepcopy(result)
+        with self._lock:
+            results = self._turn_results.setdefault(battle_id, OrderedDict())
+            results[key] = (fingerprint, result)
+            if len(results) > TURN_RESULTS_PER_BATTLE:
+                results.popitem(last=False)
+
     def has(self, battle_id: str) -> bool:
         return self.get(battle_id) is not None
 
@@ -49,6 +149,26 @@ class BattleStorage:
                        if created_at < cutoff]
             for battle_id in expired:
                 del self._battles[battle_id]
+                self._turn_results.pop(battle_id, None)
+            self.expired += len(expired)
+
+    def items(self) -> List[Tuple[str, object, float]]:
+        """Return a snapshot of (battle_id, battle, created_at) for live battles."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            return [(battle_id, battle, created_at)
+                    for battle_id, (battle, created_at) in self._battles.items()
+                    if created_at >= cutoff]
+
+    def stats(self) -> Dict[str, int]:
+        """Return lookup and expiration counters since startup."""
+        with self._lock:
+            return {
+                'size': len(self._battles),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+            }
 
     def __contains__(self, battle_id: str) -> bool:
         return self.has(battle_id)
@@ -0,0 +1,4 @@
+"""
+Agent Battle Simulator - Benchmarks
+Run from the repository root, e.g. `python -m benchmarks.bench_engine`.
+"""
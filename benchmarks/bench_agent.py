@@ -0,0 +1,61 @@
+"""
+Agent Battle Simulator - Agent Representation Benchmark
+Measures memory per Agent and to_dict throughput (clean and after a stat change).
+
+Usage:
+    python -m benchmarks.bench_agent [--agents 10000] [--calls 200000]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from game import Agent, get_all_battle_bots
+
+
+def memory_per_agent(count: int) -> float:
+    bots = get_all_battle_bots()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    agents = [Agent(f"Agent {index}", agent_type=bots[index % len(bots)]['id'],
+                    agent_type_data=bots[index % len(bots)]) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del agents
+    return (after - before) / count
+
+
+def to_dict_rate(calls: int, mutate: bool) -> float:
+    bot = get_all_battle_bots()[0]
+    agent = Agent('Alpha', agent_type=bot['id'], agent_type_data=bot)
+    started = time.perf_counter()
+    for index in range(calls):
+        if mutate:
+            agent.hp = 50 + (index & 31)
+        agent.to_dict()
+    return calls / (time.perf_counter() - started)
+
+
+def run(agents: int, calls: int) -> Dict:
+    return {
+        'bytes_per_agent': round(memory_per_agent(agents), 1),
+        'to_dict_per_second': round(to_dict_rate(calls, mutate=False)),
+        'to_dict_after_change_per_second': round(to_dict_rate(calls, mutate=True)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Agent memory and serialization benchmark")
+    parser.add_argument('--agents', type=int, default=10000)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.agents, args.calls), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
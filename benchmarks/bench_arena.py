@@ -0,0 +1,56 @@
+"""
+Agent Battle Simulator - Arena Benchmark
+Measures the time of one Arena round against the number of combatants.
+
+Usage:
+    python -m benchmarks.bench_arena [--sizes 2 8 64 256] [--rounds 3] [--repeats 20]
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+from game.agents import Agent
+from game.arena import Arena
+from game.battle_bots import get_battle_bot
+from game.catalog import get_catalog
+
+
+def round_time(size: int, rounds: int, repeats: int, targeting: str) -> Dict:
+    bots = [get_battle_bot(bot_id) for bot_id in get_catalog().passive_free_bots]
+    best = None
+    for repeat in range(repeats):
+        agents = [Agent(f"Agent {index}", agent_type=bots[index % len(bots)]['id'],
+                        agent_type_data=bots[index % len(bots)]) for index in range(size)]
+        arena = Arena(agents, targeting=targeting, seed=repeat)
+        # Stamina does not regenerate, so only the first rounds are full-size
+        started = time.perf_counter()
+        played = 0
+        while played < rounds and arena.winner_team is None:
+            arena.execute_round()
+            played += 1
+        per_round = (time.perf_counter() - started) / played
+        best = per_round if best is None else min(best, per_round)
+    return {
+        'combatants': size,
+        'targeting': targeting,
+        'us_per_round': round(best * 1e6, 1),
+        'us_per_combatant': round(best * 1e6 / size, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Arena round time vs combatant count")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--targeting', choices=('random', 'weakest'), default='random')
+    args = parser.parse_args(argv)
+    print(json.dumps([round_time(size, args.rounds, args.repeats, args.targeting) for size in args.sizes],
+                     indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
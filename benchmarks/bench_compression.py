@@ -0,0 +1,105 @@
+"""
+Agent Battle Simulator - Response Compression Benchmark
+Compares gzip CPU cost with bytes saved for the API's typical JSON payloads.
+
+Usage:
+    python -m benchmarks.bench_compression                    # levels 1, 6 and 9
+    python -m benchmarks.bench_compression --levels 1 4 6 --rounds 20 100 300
+
+For every payload it reports the JSON size, the time to encode it (what the
+request already pays) and, per gzip level, the compressed size, the share
+saved and the time to compress, buffered and streamed (compression.stream_json).
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import timeit
+from typing import Callable, Dict, List, Optional
+
+SEED = 1234
+
+
+def _timed(operation: Callable[[], object]) -> float:
+    """Best seconds per call"""
+    timer = timeit.Timer(operation)
+    calls, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=calls)) / calls
+
+
+def _battle_log(rounds: int) -> Dict:
+    """Summary of a battle with the given number of rounds (logs of seeded battles joined)"""
+    from game import Agent, Battle
+    from game.catalog import get_catalog
+
+    catalog = get_catalog()
+    rng = random.Random(SEED)
+    # The engine draws from the random module
+    random.seed(SEED)
+    log, battle = [], None
+    while len(log) < rounds:
+        bots = rng.sample(catalog.bots, 2)
+        battle = Battle(*(Agent(bot['name'], agent_type=bot['id'], agent_type_data=bot) for bot in bots),
+                        catalog=catalog)
+        while battle.winner is None and len(log) < rounds:
+            log.append(battle.execute_turn(rng.choice(catalog.actions)['id'], rng.choice(catalog.actions)['id']))
+    summary = battle.get_battle_summary()
+    summary['battle_log'] = log
+    summary['rounds'] = len(log)
+    return summary
+
+
+def payloads(rounds: List[int]) -> Dict[str, object]:
+    from game.catalog import get_catalog
+
+    summaries = {count: _battle_log(count) for count in rounds}
+    result: Dict[str, object] = {
+        'turn': summaries[max(rounds)]['battle_log'][0],
+        'actions': get_catalog().actions,
+    }
+    for count in rounds:
+        result[f'summary_{count}_rounds'] = summaries[count]
+    return result
+
+
+def measure(value, levels: List[int]) -> Dict:
+    from compression import gzip_chunks, json_chunks
+
+    encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+    body = encoder.encode(value).encode('utf-8')
+    row: Dict = {
+        'bytes': len(body),
+        'encode_us': round(_timed(lambda: encoder.encode(value)) * 1e6, 1),
+        'levels': {},
+    }
+    for level in levels:
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+        row['levels'][level] = {
+            'bytes': len(compressed),
+            'saved': round(1 - len(compressed) / len(body), 3),
+            'gzip_us': round(_timed(lambda: gzip.compress(body, compresslevel=level, mtime=0)) * 1e6, 1),
+            'stream_us': round(_timed(lambda: b''.join(gzip_chunks(json_chunks(value, encoder), level))) * 1e6, 1),
+        }
+    return row
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="gzip CPU cost versus bytes saved for API payloads")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    results = {name: measure(value, args.levels) for name, value in payloads(args.rounds).items()}
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
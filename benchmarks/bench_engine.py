@@ -0,0 +1,281 @@
+"""
+Agent Battle Simulator - Engine Microbenchmarks
+Times the engine hot paths with fixed seeds and compares against a baseline.
+
+Usage:
+    python -m benchmarks.bench_engine                       # run and print JSON
+    python -m benchmarks.bench_engine --compare             # fail on regressions
+    python -m benchmarks.bench_engine --save                # update the baseline
+    python -m benchmarks.bench_engine --filter storage --output out.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+SEED = 1234
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+REFERENCE = 'reference_loop'
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function that returns the operation to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _make_agent(bot_id: str):
+    from game import Agent, get_battle_bot
+
+    bot = get_battle_bot(bot_id)
+    return Agent(bot['name'], agent_type=bot_id, level=1, agent_type_data=bot)
+
+
+@benchmark(REFERENCE)
+def bench_reference():
+    # Pure-Python loop used to normalise results across machines
+    def op():
+        total = 0
+        for i in range(100):
+            total += i
+        return total
+    return op
+
+
+def _execute_turn_op(bot1: str, bot2: str):
+    from game import Battle
+
+    agent1, agent2 = _make_agent(bot1), _make_agent(bot2)
+    action_pairs = [(a, b) for a in range(1, 9) for b in range(1, 9)]
+    state = {'battle': Battle(agent1, agent2), 'turn': 0}
+
+    def op():
+        battle = state['battle']
+        if battle.winner is not None or battle.current_round >= 8:
+            battle = state['battle'] = Battle(agent1, agent2)
+        action1, action2 = action_pairs[state['turn'] % len(action_pairs)]
+        state['turn'] += 1
+        battle.execute_turn(action1, action2)
+    return op
+
+
+@benchmark('battle.execute_turn')
+def bench_execute_turn():
+    # Bots without passive hooks: must not regress against the pre-hook engine
+    return _execute_turn_op('connect', 'mentor')
+
+
+@benchmark('battle.execute_turn_passives')
+def bench_execute_turn_passives():
+    return _execute_turn_op('pulse', 'regulus')
+
+
+@benchmark('actions.calculate_damage')
+def bench_calculate_damage():
+    from game.actions import ACTIONS, calculate_damage
+
+    attacker, defender = _make_agent('mende'), _make_agent('regulus')
+    action = ACTIONS[0]
+    return lambda: calculate_damage(action, attacker, defender)
+
+
+@benchmark('actions.apply_effects')
+def bench_apply_effects():
+    from game.actions import ACTIONS, apply_effects
+
+    attacker, defender = _make_agent('mende'), _make_agent('regulus')
+    state = {'index': 0}
+
+    def op():
+        action = ACTIONS[state['index'] % len(ACTIONS)]
+        state['index'] += 1
+        if state['index'] % 16 == 0:
+            attacker.reset_for_battle()
+            defender.reset_for_battle()
+        apply_effects(action, attacker, defender)
+    return op
+
+
+@benchmark('ai.select_ai_action')
+def bench_select_ai_action():
+    from game.ai import select_ai_action
+
+    agent, opponent = _make_agent('regulus'), _make_agent('mende')
+    opponent.add_debuff({'name': 'Brennend', 'attack': -3, 'duration': 2})
+    rng = random.Random(SEED)
+    return lambda: select_ai_action(agent, opponent, rng=rng)
+
+
+@benchmark('agent.to_dict')
+def bench_agent_to_dict():
+    agent = _make_agent('mende')
+    return agent.to_dict
+
+
+@benchmark('agent.from_dict')
+def bench_agent_from_dict():
+    from game import Agent
+
+    data = _make_agent('mende').to_dict()
+    return lambda: Agent.from_dict(data)
+
+
+@benchmark('actions.get_action')
+def bench_get_action():
+    from game import get_action
+
+    return lambda: get_action(8)
+
+
+@benchmark('bots.get_battle_bot')
+def bench_get_battle_bot():
+    from game import get_battle_bot
+
+    return lambda: get_battle_bot('genesis')
+
+
+def _make_storage(size: int):
+    from battle_storage import BattleStorage
+
+    storage = BattleStorage(cleanup_interval=3600)
+    for index in range(size):
+        storage.set(f"battle-{index}", object())
+    return storage
+
+
+@benchmark('storage.set')
+def bench_storage_set():
+    storage = _make_storage(1000)
+    battle = object()
+    state = {'index': 0}
+
+    def op():
+        state['index'] += 1
+        storage.set(f"battle-{state['index'] % 1000}", battle)
+    return op
+
+
+@benchmark('storage.get')
+def bench_storage_get():
+    storage = _make_storage(1000)
+    return lambda: storage.get('battle-500')
+
+
+@benchmark('storage.cleanup')
+def bench_storage_cleanup():
+    storage = _make_storage(1000)
+    return storage.cleanup
+
+
+def _time_op(op: Callable[[], None], min_time: float, repeats: int) -> Dict:
+    """Calibrate an iteration count, then return the best of several repeats."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 5 or number >= 1 << 24:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            op()
+        timings.append((time.perf_counter() - started) / number)
+
+    timings.sort()
+    return {
+        'ns_per_op': round(timings[0] * 1e9, 1),
+        'median_ns_per_op': round(timings[len(timings) // 2] * 1e9, 1),
+        'iterations': number,
+        'repeats': repeats,
+    }
+
+
+def run(names: List[str], min_time: float = 0.2, repeats: int = 5) -> Dict:
+    results = {}
+    for name in names:
+        random.seed(SEED)
+        op = BENCHMARKS[name]()
+        results[name] = _time_op(op, min_time, repeats)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'seed': SEED,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return regression messages, using the reference loop to normalise machines."""
+    current_results, baseline_results = current['results'], baseline['results']
+    scale = 1.0
+    if REFERENCE in current_results and REFERENCE in baseline_results:
+        scale = current_results[REFERENCE]['ns_per_op'] / baseline_results[REFERENCE]['ns_per_op']
+
+    regressions = []
+    for name, result in current_results.items():
+        if name == REFERENCE or name not in baseline_results:
+            continue
+        expected = baseline_results[name]['ns_per_op'] * scale
+        ratio = result['ns_per_op'] / expected
+        result['baseline_ratio'] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {result['ns_per_op']:.0f} ns/op vs {expected:.0f} expected "
+                               f"(+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Engine hot path microbenchmarks")
+    parser.add_argument('--filter', default='', help="Only run benchmarks containing this text")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Target seconds per repeat")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--compare', action='store_true', help="Exit 1 on regressions against the baseline")
+    parser.add_argument('--threshold', type=float, default=0.3, help="Allowed slowdown (0.3 = 30%%)")
+    parser.add_argument('--save', action='store_true', help="Store results as the new baseline")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name or name == REFERENCE]
+    results = run(names, args.min_time, args.repeats)
+
+    regressions = []
+    if args.compare:
+        with open(args.baseline, encoding='utf-8') as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as handle:
+            handle.write(output + '\n')
+
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+"""
+Agent Battle Simulator - Vectorized Environment Benchmark
+Measures BattleEnv throughput in env-steps per minute.
+
+Usage:
+    python -m benchmarks.bench_env [--envs 4096] [--seconds 3]
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+from game.env import BattleEnv
+
+
+def steps_per_minute(num_envs: int, seconds: float, bots: str) -> Dict:
+    bot1, bot2 = bots.split(':')
+    env = BattleEnv(bot1, bot2, num_envs=num_envs, seed=1)
+    env.reset()
+    steps = 0
+    policy_time = 0.0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        policy_started = time.perf_counter()
+        actions = env.random_actions()
+        policy_time += time.perf_counter() - policy_started
+        env.step(actions)
+        steps += 1
+    elapsed = time.perf_counter() - started
+    return {
+        'num_envs': num_envs,
+        'env_steps_per_minute': round(steps * num_envs / (elapsed - policy_time) * 60),
+        'with_random_policy_per_minute': round(steps * num_envs / elapsed * 60),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="BattleEnv throughput")
+    parser.add_argument('--envs', type=int, nargs='+', default=[256, 4096])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--bots', default='connect:mentor')
+    args = parser.parse_args(argv)
+    print(json.dumps([steps_per_minute(envs, args.seconds, args.bots) for envs in args.envs], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
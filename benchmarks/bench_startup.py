@@ -0,0 +1,60 @@
+"""
+Agent Battle Simulator - Startup Benchmark
+Measures `import game`, `import app` and first-request latency in fresh interpreters.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = r"""
+import json, time
+started = time.perf_counter()
+import game
+game_done = time.perf_counter()
+import app
+import_done = time.perf_counter()
+client = app.app.test_client()
+client.get('/health')
+first_done = time.perf_counter()
+client.post('/api/battle/start', json={})
+battle_done = time.perf_counter()
+print(json.dumps({
+    'import_game_ms': (game_done - started) * 1000,
+    'import_app_ms': (import_done - game_done) * 1000,
+    'first_request_ms': (first_done - import_done) * 1000,
+    'first_battle_ms': (battle_done - first_done) * 1000,
+}))
+"""
+
+
+def measure(runs: int) -> Dict:
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(key, []).append(value)
+    return {key: {'median_ms': round(statistics.median(values), 2), 'min_ms': round(min(values), 2)}
+            for key, values in samples.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import and first-request timings")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.runs), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
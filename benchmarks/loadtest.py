@@ -0,0 +1,294 @@
+"""
+Agent Battle Simulator - HTTP Load Test
+Runs concurrent virtual players through the full battle flow and reports
+latency percentiles, throughput and error rates per endpoint.
+
+Usage:
+    python -m benchmarks.loadtest --mode testclient --players 8 --battles 20
+    python -m benchmarks.loadtest --mode gunicorn --workers 4 --players 32 --think-ms 50
+    python -m benchmarks.loadtest --url http://localhost:5001 --players 16 --duration 60
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+NOT_FOUND = 'Battle not found'
+
+
+class TestClientTransport:
+    """In-process transport using the Flask test client (one per player)."""
+
+    def __init__(self):
+        from app import app
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpTransport:
+    """Real HTTP transport with its own cookie jar (one per player)."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self._base_url = base_url.rstrip('/')
+        self._timeout = timeout
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self._base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self._opener.open(req, timeout=self._timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as error:
+            try:
+                return error.code, json.loads(error.read() or b'{}')
+            except ValueError:
+                return error.code, {}
+        except (urllib.error.URLError, OSError) as error:
+            return 0, {'error': str(error)}
+
+
+class Recorder:
+    """Collects latencies and outcomes per endpoint from all player threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.battles_completed = 0
+
+    def record(self, endpoint: str, seconds: float, status: int, body: Dict) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if status == 404 and body.get('error') == NOT_FOUND:
+                self.errors[endpoint]['battle_not_found'] += 1
+            elif status == 0:
+                self.errors[endpoint]['connection'] += 1
+            elif status >= 400:
+                self.errors[endpoint][str(status)] += 1
+
+    def battle_done(self) -> None:
+        with self._lock:
+            self.battles_completed += 1
+
+
+def _timed(recorder: Recorder, transport, endpoint: str, method: str, path: str,
+           body: Optional[Dict] = None) -> Tuple[int, Dict]:
+    started = time.perf_counter()
+    status, payload = transport.request(method, path, body)
+    recorder.record(endpoint, time.perf_counter() - started, status, payload)
+    return status, payload
+
+
+def _think(rng: random.Random, think_ms: float) -> None:
+    if think_ms > 0:
+        time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+
+
+def play_battle(transport, recorder: Recorder, rng: random.Random, bots: List[str],
+                think_ms: float, max_rounds: int) -> None:
+    """Run one start → (ai-action + turn)* → summary flow."""
+    status, started = _timed(recorder, transport, 'start', 'POST', '/api/battle/start', {
+        'agent1_bot': rng.choice(bots),
+        'agent2_bot': rng.choice(bots),
+    })
+    if status != 200:
+        return
+    battle_id = started['battle_id']
+
+    for _ in range(max_rounds):
+        _think(rng, think_ms)
+        status, ai = _timed(recorder, transport, 'ai-action', 'POST', '/api/battle/ai-action',
+                            {'battle_id': battle_id})
+        if status != 200:
+            return
+        status, turn = _timed(recorder, transport, 'turn', 'POST', '/api/battle/turn', {
+            'battle_id': battle_id,
+            'action1_id': rng.randint(1, 8),
+            'action2_id': ai['action_id'],
+        })
+        if status != 200:
+            return
+        if turn.get('battle_over'):
+            break
+
+    _timed(recorder, transport, 'summary', 'GET', f'/api/battle/summary/{battle_id}')
+    recorder.battle_done()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict:
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        ordered = sorted(values)
+        errors = dict(recorder.errors.get(endpoint, {}))
+        error_count = sum(errors.values())
+        histogram = []
+        for bound in HISTOGRAM_BOUNDS_MS + (None,):
+            low = histogram[-1]['le_ms'] if histogram else 0
+            if bound is None:
+                count = sum(1 for value in ordered if value * 1000 > low)
+            else:
+                count = sum(1 for value in ordered if low < value * 1000 <= bound)
+            histogram.append({'le_ms': bound if bound is not None else '+Inf', 'count': count})
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'errors': errors,
+            'error_rate': round(error_count / len(ordered), 4) if ordered else 0.0,
+            'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+            'p99_ms': round(_percentile(ordered, 0.99) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            'histogram': histogram,
+        }
+        total_requests += len(ordered)
+        total_errors += error_count
+
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'requests': total_requests,
+        'requests_per_second': round(total_requests / elapsed, 1) if elapsed else 0.0,
+        'battles_completed': recorder.battles_completed,
+        'battles_per_second': round(recorder.battles_completed / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'battle_not_found': sum(errors.get('battle_not_found', 0) for errors in recorder.errors.values()),
+        'endpoints': endpoints,
+    }
+
+
+def run_load(make_transport, players: int, battles: int, duration: Optional[float],
+             think_ms: float, max_rounds: int, seed: int) -> Dict:
+    from game import get_all_battle_bots
+
+    bots = [bot['id'] for bot in get_all_battle_bots()]
+    recorder = Recorder()
+    deadline = time.monotonic() + duration if duration else None
+
+    def player(index: int) -> None:
+        rng = random.Random(seed + index)
+        transport = make_transport()
+        played = 0
+        while (deadline is None and played < battles) or (deadline and time.monotonic() < deadline):
+            play_battle(transport, recorder, rng, bots, think_ms, max_rounds)
+            played += 1
+
+    threads = [threading.Thread(target=player, args=(index,), daemon=True) for index in range(players)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(recorder, time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers: int, threads: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads),
+               '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+    process = subprocess.Popen(command, cwd=ROOT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=1):
+                return process, base_url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become healthy")
+
+
+def _print_summary(summary: Dict) -> None:
+    print(f"{summary['requests']} requests in {summary['elapsed_seconds']}s "
+          f"({summary['requests_per_second']} req/s, {summary['battles_per_second']} battles/s), "
+          f"error rate {summary['error_rate'] * 100:.2f}%, battle not found: {summary['battle_not_found']}")
+    print(f"{'endpoint':<10} {'reqs':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>8}")
+    for name, stats in summary['endpoints'].items():
+        print(f"{name:<10} {stats['requests']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} {sum(stats['errors'].values()):>8}")
+        peak = max((bucket['count'] for bucket in stats['histogram']), default=0) or 1
+        for bucket in stats['histogram']:
+            if bucket['count']:
+                bar = '#' * max(1, int(40 * bucket['count'] / peak))
+                print(f"    <= {str(bucket['le_ms']):>5} ms {bucket['count']:>7} {bar}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Battle flow HTTP load test")
+    parser.add_argument('--mode', choices=('testclient', 'gunicorn'), default='testclient')
+    parser.add_argument('--url', help="Target an already running server instead of starting one")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--players', type=int, default=8, help="Concurrent virtual players")
+    parser.add_argument('--battles', type=int, default=10, help="Battles per player")
+    parser.add_argument('--duration', type=float, help="Run for N seconds instead of a battle count")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Mean think time between rounds")
+    parser.add_argument('--max-rounds', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON summary")
+    args = parser.parse_args(argv)
+
+    # Every virtual player comes from the same address; do not measure the per-client rate limit
+    os.environ.setdefault('RATE_LIMIT_PER_SECOND', '0')
+    process = None
+    if args.url:
+        make_transport = lambda: HttpTransport(args.url)
+    elif args.mode == 'gunicorn':
+        process, base_url = start_gunicorn(args.workers, args.threads)
+        make_transport = lambda: HttpTransport(base_url)
+    else:
+        sys.path.insert(0, ROOT)
+        make_transport = TestClientTransport
+
+    try:
+        summary = run_load(make_transport, args.players, args.battles, args.duration,
+                           args.think_ms, args.max_rounds, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    summary['mode'] = 'url' if args.url else args.mode
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_summary(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""
+Agent Battle Simulator - Response Compression
+gzip for JSON and text responses, negotiated via Accept-Encoding.
+
+Three paths, cheapest first:
+
+1. Precompressed: immutable bodies (catalog bundle, actions, bots) are
+   compressed once at level 9 when the catalog is built; precompressed()
+   picks the variant per request and costs nothing per response. Like the
+   other paths it sends the plain body when the configured level is 0.
+2. Buffered: compress_response() gzips other responses at or above
+   min_size after the view ran (see the after_request hook in app.py).
+3. Streamed: stream_json() encodes and compresses large payloads (long battle
+   summaries) chunk by chunk, so neither the full JSON text nor the full
+   compressed body has to sit in memory at once.
+
+Small bodies are sent as they are: below about a kilobyte gzip saves little
+and its header and CPU time are not worth it.
+"""
+
+import gzip
+import json
+import zlib
+from typing import Iterator
+
+from flask import Response
+
+# Content types worth compressing (images, archives etc. are compressed already)
+COMPRESSIBLE_TYPES = frozenset({'application/json', 'application/javascript', 'text/javascript', 'text/html',
+                                'text/css', 'text/plain', 'image/svg+xml'})
+# Uncompressed bytes per compressor call when streaming
+STREAM_CHUNK = 16384
+
+
+def accepts_gzip(accept_encodings) -> bool:
+    return accept_encodings['gzip'] > 0
+
+
+def precompressed(body: bytes, gzip_body: bytes, accept_encodings, level: int,
+                  content_type: str = 'application/json') -> Response:
+    """Response from a body compressed ahead of time, picking the variant the client accepts.
+
+    level is the configured compression level; 0 (compression off) always sends body.
+    """
+    if not level:
+        return Response(body, content_type=content_type)
+    if accepts_gzip(accept_encodings):
+        response = Response(gzip_body, content_type=content_type)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, content_type=content_type)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def compressible(response: Response, min_size: int) -> bool:
+    """Whether the response is a complete, uncompressed body worth gzipping"""
+    return (response.status_code == 200 and not response.is_streamed and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers and response.mimetype in COMPRESSIBLE_TYPES
+            and (response.content_length or 0) >= min_size)
+
+
+def compress_response(response: Response, accept_encodings, level: int, min_size: int) -> Response:
+    """gzip the response body in place when the client accepts it and it is large enough"""
+    if not compressible(response, min_size):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip(accept_encodings):
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=level, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag:
+        # A different representation needs a different entity tag
+        response.set_etag(etag + '-gzip', weak)
+    return response
+
+
+def json_chunks(value, encoder: json.JSONEncoder) -> Iterator[str]:
+    """JSON text of value in pieces, one per item of the lists directly inside a dict.
+
+    Each piece is encoded in one call, which is several times faster than
+    encoder.iterencode() and its many tiny chunks.
+    """
+    if not isinstance(value, dict):
+        yield encoder.encode(value)
+        return
+    items = sorted(value.items()) if encoder.sort_keys else value.items()
+    yield '{'
+    for index, (key, item) in enumerate(items):
+        prefix = (encoder.item_separator if index else '') + encoder.encode(str(key)) + encoder.key_separator
+        if isinstance(item, list):
+            yield prefix + '['
+            for position, element in enumerate(item):
+                yield (encoder.item_separator if position else '') + encoder.encode(element)
+            yield ']'
+        else:
+            yield prefix + encoder.encode(item)
+    yield '}'
+
+
+def gzip_chunks(chunks: Iterator[str], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending, size = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK:
+            data = compressor.compress(''.join(pending).encode('utf-8'))
+            pending, size = [], 0
+            if data:
+                yield data
+    yield compressor.compress(''.join(pending).encode('utf-8')) + compressor.flush()
+
+
+def stream_json(value, encoder: json.JSONEncoder, level: int) -> Response:
+    """gzip-compressed JSON response, encoded and compressed while it is sent.
+
+    The value must not change while the response is streamed (pass copies of
+    lists that other requests may append to).
+    """
+    response = Response(gzip_chunks(json_chunks(value, encoder), level), content_type='application/json')
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -2,20 +2,34 @@
 Agent Battle Simulator - Game Package
 """
 
-from .agents import Agent
-from .actions import get_action, get_all_actions
-from .battle import Battle
-from .battle_bots import get_all_battle_bots, get_battle_bot
-from .skins import get_bot_skins, get_unlocked_skins, get_current_skin
+import importlib
 
-__all__ = [
-    'Agent',
-    'get_action',
-    'get_all_actions',
-    'Battle',
-    'get_all_battle_bots',
-    'get_battle_bot',
-    'get_bot_skins',
-    'get_unlocked_skins',
-    'get_current_skin'
-]
+# Public name -> submodule; submodules are imported on first attribute access
+_EXPORTS = {
+    'Agent': 'agents',
+    'get_action': 'actions',
+    'get_all_actions': 'actions',
+    'Battle': 'battle',
+    'get_all_battle_bots': 'battle_bots',
+    'get_battle_bot': 'battle_bots',
+    'find_battle_bot': 'battle_bots',
+    'get_bot_skins': 'skins',
+    'get_unlocked_skins': 'skins',
+    'get_current_skin': 'skins',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
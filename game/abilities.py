@@ -0,0 +1,244 @@
+"""
+Agent Battle Simulator - Passive Ability Engine
+Compiles each bot's "passives" into per-phase hook lists used by the battle engine
+"""
+
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .battle_bots import get_battle_bot
+
+# Hook signatures (state is the per-battle dict of the hook's owner; state['rng'], when
+# present, is the battle's random generator and replaces the random module):
+#   stamina_cost(state, owner, action, cost) -> cost
+#   pre_damage(state, owner, opponent, action, damage, messages) -> damage   (owner attacks)
+#   pre_damage_taken(state, owner, opponent, action, damage, messages) -> damage   (owner defends)
+#   post_damage(state, owner, opponent, action, damage, messages)   (owner dealt damage)
+#   post_damage_taken(state, owner, opponent, action, damage, messages)   (owner took damage)
+#   end_of_round(state, owner, opponent, messages)
+PHASES = ('stamina_cost', 'pre_damage', 'pre_damage_taken', 'post_damage', 'post_damage_taken', 'end_of_round')
+
+
+class PassiveHooks:
+    """Compiled hooks of one bot, one tuple per phase (empty when unused)."""
+
+    __slots__ = PHASES + ('has_hooks',)
+
+    def __init__(self, hooks: Optional[Dict[str, List[Callable]]] = None):
+        hooks = hooks or {}
+        for phase in PHASES:
+            setattr(self, phase, tuple(hooks.get(phase, ())))
+        self.has_hooks = any(hooks.get(phase) for phase in PHASES)
+
+
+NO_HOOKS = PassiveHooks()
+
+
+def _stamina_discount(percent):
+    def hook(state, owner, action, cost):
+        return cost - cost * percent // 100
+    return 'stamina_cost', hook
+
+
+def _critical_hit(chance, multiplier):
+    def hook(state, owner, opponent, action, damage, messages):
+        if state.get('rng', random).random() < chance:
+            messages.append(f"⚡ {owner.name} landet einen kritischen Treffer!")
+            return int(damage * multiplier)
+        return damage
+    return 'pre_damage', hook
+
+
+def _armor_piercing(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        # take_damage() subtracts defense // 2; give back the ignored share
+        return damage + opponent.get_effective_defense() * percent // 100 // 2
+    return 'pre_damage', hook
+
+
+def _burst(every, percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        if state['round'] % every == 0:
+            messages.append(f"💥 {owner.name} entfesselt einen Burst!")
+            return damage + damage * percent // 100
+        return damage
+    return 'pre_damage', hook
+
+
+def _combo(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        return damage + damage * percent * state.get('hits', 0) // 100
+    return 'pre_damage', hook
+
+
+def _count_hits(state, owner, opponent, action, damage, messages):
+    state['hits'] = state.get('hits', 0) + 1
+
+
+def _charge(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        return damage + damage * percent * (state['round'] - 1) // 100
+    return 'pre_damage', hook
+
+
+def _minimum_damage():
+    def hook(state, owner, opponent, action, damage, messages):
+        # Guarantee the action's minimum even after the defender's armor
+        return max(damage, action['damage_range'][0] + opponent.get_effective_defense() // 2)
+    return 'pre_damage', hook
+
+
+def _damage_reduction(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        return damage - damage * percent // 100
+    return 'pre_damage_taken', hook
+
+
+def _dodge(chance):
+    def hook(state, owner, opponent, action, damage, messages):
+        if damage > 0 and state.get('rng', random).random() < chance:
+            messages.append(f"💨 {owner.name} weicht aus!")
+            return 0
+        return damage
+    return 'pre_damage_taken', hook
+
+
+def _block_first(chance):
+    def hook(state, owner, opponent, action, damage, messages):
+        if state.get('blocked_first'):
+            return damage
+        state['blocked_first'] = True
+        if damage > 0 and state.get('rng', random).random() < chance:
+            messages.append(f"🛡️ {owner.name} blockt den ersten Angriff!")
+            return 0
+        return damage
+    return 'pre_damage_taken', hook
+
+
+def _taunt(attack):
+    def hook(state, owner, opponent, action, damage, messages):
+        if not state.get('taunted'):
+            state['taunted'] = True
+            state['taunt_round'] = state['round']
+            opponent.add_debuff({'name': 'Verspottet', 'attack': attack, 'duration': 1})
+            messages.append(f"😏 {owner.name} verspottet {opponent.name}!")
+    return 'post_damage', hook
+
+
+def _expire_taunt(state, owner, opponent, messages):
+    # The taunt lasts for the rest of its round and the whole next one
+    if state['round'] > state.get('taunt_round', state['round']):
+        opponent.remove_debuff('Verspottet')
+        del state['taunt_round']
+
+
+def _lifesteal(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        amount = damage * percent // 100
+        if amount > 0:
+            owner.heal(amount)
+            messages.append(f"💚 {owner.name} heilt {amount} HP!")
+    return 'post_damage', hook
+
+
+def _reflect_damage(percent):
+    def hook(state, owner, opponent, action, damage, messages):
+        reflected = damage * percent // 100
+        if reflected > 0:
+            opponent.hp = max(0, opponent.hp - reflected)
+            messages.append(f"↩️ {owner.name} reflektiert {reflected} Schaden!")
+    return 'post_damage_taken', hook
+
+
+def _regenerate_hp(amount):
+    def hook(state, owner, opponent, messages):
+        if owner.hp < owner.max_hp:
+            owner.heal(amount)
+            messages.append(f"🌿 {owner.name} regeneriert {amount} HP")
+    return 'end_of_round', hook
+
+
+def _regenerate_stamina(amount):
+    def hook(state, owner, opponent, messages):
+        if owner.stamina < owner.max_stamina:
+            owner.restore_stamina(amount)
+            messages.append(f"🔋 {owner.name} regeneriert {amount} Stamina")
+    return 'end_of_round', hook
+
+
+def _random_buff(amount):
+    def hook(state, owner, opponent, messages):
+        stat = state.get('rng', random).choice(('attack', 'defense'))
+        # Each round's buff replaces the previous one, so the stats do not creep up
+        owner.remove_buff('Schöpfung')
+        owner.add_buff({'name': 'Schöpfung', stat: amount, 'duration': 1})
+        messages.append(f"🌟 {owner.name} erschafft einen Buff (+{amount} {stat.capitalize()})")
+    return 'end_of_round', hook
+
+
+# Passive type -> factory(**params) returning (phase, hook)
+PASSIVE_FACTORIES: Dict[str, Callable[..., Tuple[str, Callable]]] = {
+    'stamina_discount': _stamina_discount,
+    'critical_hit': _critical_hit,
+    'armor_piercing': _armor_piercing,
+    'burst': _burst,
+    'combo': _combo,
+    'charge': _charge,
+    'minimum_damage': _minimum_damage,
+    'damage_reduction': _damage_reduction,
+    'dodge': _dodge,
+    'block_first': _block_first,
+    'taunt': _taunt,
+    'lifesteal': _lifesteal,
+    'reflect_damage': _reflect_damage,
+    'regenerate_hp': _regenerate_hp,
+    'regenerate_stamina': _regenerate_stamina,
+    'random_buff': _random_buff,
+}
+
+# Extra hooks some passives need in another phase
+_COMPANION_HOOKS = {
+    'combo': ('post_damage', _count_hits),
+    'taunt': ('end_of_round', _expire_taunt),
+}
+
+
+def compile_passives(passives: List[Dict]) -> PassiveHooks:
+    """Compile a bot's passive specs into per-phase hook lists."""
+    if not passives:
+        return NO_HOOKS
+
+    hooks: Dict[str, List[Callable]] = {}
+    for spec in passives:
+        params = {key: value for key, value in spec.items() if key != 'type'}
+        try:
+            factory = PASSIVE_FACTORIES[spec['type']]
+        except KeyError:
+            raise ValueError(f"Unknown passive type: {spec.get('type')!r}")
+        phase, hook = factory(**params)
+        hooks.setdefault(phase, []).append(hook)
+        if spec['type'] in _COMPANION_HOOKS:
+            companion_phase, companion = _COMPANION_HOOKS[spec['type']]
+            hooks.setdefault(companion_phase, []).append(companion)
+    return PassiveHooks(hooks)
+
+
+# bot id -> (bot data the hooks were compiled from, hooks); a reloaded catalog brings new bot dicts
+_compiled_by_bot: Dict[str, Tuple[Dict, PassiveHooks]] = {}
+
+
+def get_passive_hooks(agent) -> PassiveHooks:
+    """Return the compiled hooks for an agent (cached per catalog bot)."""
+    type_data = agent.agent_type_data
+    if type_data is not get_battle_bot(agent.agent_type):
+        return compile_passives(type_data.get('passives', []))
+
+    cached = _compiled_by_bot.get(agent.agent_type)
+    if cached is None or cached[0] is not type_data:
+        cached = _compiled_by_bot[agent.agent_type] = (type_data, compile_passives(type_data.get('passives', [])))
+    return cached[1]
+
+
+def seed_passive_hooks(compiled: Dict[str, Tuple[Dict, PassiveHooks]]) -> None:
+    """Prime the cache with hooks compiled ahead of time (see game.catalog.install_catalog)."""
+    _compiled_by_bot.update(compiled)
@@ -4,7 +4,7 @@ Absurde Kampfaktionen mit Effekten
 """
 
 import random
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 ACTIONS = [
     {
@@ -113,6 +113,59 @@ ACTIONS = [
     }
 ]
 
+# Buff/debuff names created by apply_effects()
+EFFECT_NAMES = ('Brennend', 'Verlangsamt', 'Klebrig', 'Demoralisiert', 'Geschwächt', 'Fokussiert')
+
+# What each effect of apply_effects() does, for code that simulates battles without Agents:
+# (target: 'defender'/'attacker', attack delta, defense delta, heal, effect name)
+EFFECT_RULES: Dict[str, Tuple[str, int, int, int, Optional[str]]] = {
+    'burn': ('defender', -3, 0, 0, 'Brennend'),
+    'slow': ('defender', 0, -4, 0, 'Verlangsamt'),
+    'sticky': ('defender', -2, 0, 0, 'Klebrig'),
+    'debuff_attack': ('defender', -5, 0, 0, 'Demoralisiert'),
+    'debuff_defense': ('defender', 0, -6, 0, 'Geschwächt'),
+    'buff_defense': ('attacker', 0, 5, 0, 'Fokussiert'),
+    'heal': ('attacker', 0, 0, 15, None),
+}
+
+# One flag bit per effect name, for simulators that keep effects as an int
+EFFECT_BITS: Dict[str, int] = {name: 1 << index for index, name in enumerate(EFFECT_NAMES)}
+
+
+def compile_action(action: Dict) -> Tuple:
+    """EFFECT_RULES of an action folded into one flat tuple:
+    (cost, low, high, defender attack/defense delta and bits, attacker attack/defense delta and bits, heal)"""
+    deltas = [0, 0, 0, 0, 0, 0, 0]
+    for effect in action['effects']:
+        target, attack, defense, heal, name = EFFECT_RULES[effect]
+        base = 0 if target == 'defender' else 3
+        deltas[base] += attack
+        deltas[base + 1] += defense
+        deltas[base + 2] |= EFFECT_BITS.get(name, 0)
+        deltas[6] += heal
+    low, high = action['damage_range']
+    return (action['stamina_cost'], low, high) + tuple(deltas)
+
+
+class ActionTable:
+    """One action list with the lookups simulators that work without Agents need.
+
+    Each catalog builds its own (Catalog.action_table), so a simulation of a
+    battle follows the rules of the catalog that battle was started with.
+    """
+
+    def __init__(self, actions: List[Dict]):
+        self.actions = actions
+        self.by_id = {action['id']: action for action in actions}
+        self.compiled = {action['id']: compile_action(action) for action in actions}
+        self.cheapest = min(actions, key=lambda action: action['stamina_cost'])
+        self.min_cost = self.cheapest['stamina_cost']
+        self.max_cost = max(action['stamina_cost'] for action in actions)
+        self.max_roll = max(action['damage_range'][1] for action in actions)
+        # Whether any action raises its user's or its target's attack
+        self.attack_can_grow = any(compiled[3] > 0 or compiled[6] > 0 for compiled in self.compiled.values())
+
+
 def get_action(action_id: int) -> Dict:
     """Get action by ID"""
     for action in ACTIONS:
@@ -120,9 +173,9 @@ def get_action(action_id: int) -> Dict:
             return action.copy()
     return ACTIONS[0].copy()
 
-def calculate_damage(action: Dict, attacker, defender) -> int:
+def calculate_damage(action: Dict, attacker, defender, rng=random) -> int:
     """Calculate damage for an action"""
-    base_damage = random.randint(*action['damage_range'])
+    base_damage = rng.randint(*action['damage_range'])
     attack_bonus = attacker.get_effective_attack() // 5
     defense_reduction = defender.get_effective_defense() // 10
     
@@ -171,10 +224,16 @@ def apply_effects(action: Dict, attacker, defender) -> List[str]:
     
     return messages
 
-def get_random_comment(action: Dict) -> str:
+def get_random_comment(action: Dict, rng=random) -> str:
     """Get random battle comment"""
-    return random.choice(action['comments'])
+    return rng.choice(action['comments'])
 
 def get_all_actions() -> List[Dict]:
     """Get all available actions"""
     return [action.copy() for action in ACTIONS]
+
+
+def _install(actions: List[Dict]) -> None:
+    """Make another catalog version's actions current (see game.catalog.install_catalog)"""
+    global ACTIONS
+    ACTIONS = actions
@@ -4,42 +4,94 @@ Adapted for WebApp
 """
 
 import random
+from operator import attrgetter
 from typing import Dict, List, Optional
 
 from .battle_bots import get_battle_bot
 
+# Stats that appear in to_dict(); assigning any of them invalidates the cached dict
+_TRACKED_FIELDS = (
+    'name', 'level', 'hp', 'max_hp', 'stamina', 'max_stamina', 'attack', 'defense',
+    'xp', 'xp_to_next_level', 'buffs', 'debuffs', 'wins', 'losses',
+)
+
+_RESTORED_FIELDS = tuple((field, '_' + field) for field in (
+    'max_hp', 'hp', 'max_stamina', 'stamina',
+    'attack', 'defense', 'xp', 'xp_to_next_level',
+    'wins', 'losses'
+))
+
+
 class Agent:
+    __slots__ = ('agent_type', '_type_data', '_cache') + tuple('_' + field for field in _TRACKED_FIELDS)
+
     def __init__(self, name: str, agent_type: str = "ninja", level: int = 1, agent_type_data: Dict = None):
-        self.name = name
+        self._cache = None
+        self._name = name
         self.agent_type = agent_type  # Agent type ID
-        self.level = level
-        self.agent_type_data = agent_type_data or {}
+        self._level = level
+        # Kept by reference: catalog bots are shared, and a catalog reload must not change this agent
+        agent_type_data = agent_type_data or {}
+        self._type_data = agent_type_data
         
         # Get bonuses from agent type
-        stats_bonus = self.agent_type_data.get('stats', {})
+        stats_bonus = agent_type_data.get('stats', {})
         hp_bonus = stats_bonus.get('hp_bonus', 0)
         stamina_bonus = stats_bonus.get('stamina_bonus', 0)
         attack_bonus = stats_bonus.get('attack_bonus', 0)
         defense_bonus = stats_bonus.get('defense_bonus', 0)
         
         # Base stats with agent type bonuses
-        self.max_hp = 100 + (level - 1) * 20 + hp_bonus
-        self.hp = self.max_hp
-        self.max_stamina = 100 + (level - 1) * 10 + stamina_bonus
-        self.stamina = self.max_stamina
-        self.attack = 10 + (level - 1) * 2 + attack_bonus
-        self.defense = 10 + (level - 1) * 2 + defense_bonus
+        # (slots are written directly; the cache is already empty)
+        self._max_hp = 100 + (level - 1) * 20 + hp_bonus
+        self._hp = self._max_hp
+        self._max_stamina = 100 + (level - 1) * 10 + stamina_bonus
+        self._stamina = self._max_stamina
+        self._attack = 10 + (level - 1) * 2 + attack_bonus
+        self._defense = 10 + (level - 1) * 2 + defense_bonus
         
         # XP System
-        self.xp = 0
-        self.xp_to_next_level = self.calculate_xp_needed(level)
+        self._xp = 0
+        self._xp_to_next_level = self.calculate_xp_needed(level)
         
         # Battle stats
-        self.buffs: List[Dict] = []
-        self.debuffs: List[Dict] = []
-        self.wins = 0
-        self.losses = 0
-        
+        self._buffs: List[Dict] = []
+        self._debuffs: List[Dict] = []
+        self._wins = 0
+        self._losses = 0
+
+    @property
+    def agent_type_data(self) -> Dict:
+        """Static bot metadata, as given at construction"""
+        return self._type_data
+
+    @agent_type_data.setter
+    def agent_type_data(self, data: Dict):
+        self._type_data = data
+        self._cache = None
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != '_cache'}
+
+    def __setstate__(self, state: Dict):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._cache = None
+
+    def clone(self) -> "Agent":
+        """Independent copy for what-if play.
+
+        Stats and the buff/debuff lists are copied; the effect dicts and bot
+        data are shared since nothing mutates them in place.
+        """
+        clone = Agent.__new__(Agent)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone._buffs = list(self._buffs)
+        clone._debuffs = list(self._debuffs)
+        clone._cache = None
+        return clone
+
     def calculate_xp_needed(self, level: int) -> int:
         """Calculate XP needed for next level"""
         return int(100 * (1.5 ** (level - 1)))
@@ -69,30 +121,38 @@ class Agent:
     
     def add_buff(self, buff: Dict):
         """Add a buff to the agent"""
-        self.buffs.append(buff)
+        self._buffs.append(buff)
     
     def add_debuff(self, debuff: Dict):
         """Add a debuff to the agent"""
-        self.debuffs.append(debuff)
+        self._debuffs.append(debuff)
+
+    def remove_buff(self, name: str):
+        """Remove the agent's buffs called name"""
+        self.buffs = [buff for buff in self._buffs if buff.get('name') != name]
+
+    def remove_debuff(self, name: str):
+        """Remove the agent's debuffs called name"""
+        self.debuffs = [debuff for debuff in self._debuffs if debuff.get('name') != name]
     
     def get_effective_attack(self) -> int:
         """Calculate attack with buffs/debuffs"""
-        attack = self.attack
-        for buff in self.buffs:
+        attack = self._attack
+        for buff in self._buffs:
             if 'attack' in buff:
                 attack += buff['attack']
-        for debuff in self.debuffs:
+        for debuff in self._debuffs:
             if 'attack' in debuff:
                 attack += debuff['attack']  # debuffs are negative
         return max(1, attack)
     
     def get_effective_defense(self) -> int:
         """Calculate defense with buffs/debuffs"""
-        defense = self.defense
-        for buff in self.buffs:
+        defense = self._defense
+        for buff in self._buffs:
             if 'defense' in buff:
                 defense += buff['defense']
-        for debuff in self.debuffs:
+        for debuff in self._debuffs:
             if 'defense' in debuff:
                 defense += debuff['defense']  # debuffs are negative
         return max(1, defense)
@@ -100,58 +160,70 @@ class Agent:
     def take_damage(self, damage: int) -> int:
         """Take damage and return actual damage taken"""
         actual_damage = max(1, damage - self.get_effective_defense() // 2)
-        self.hp = max(0, self.hp - actual_damage)
+        self._hp = max(0, self._hp - actual_damage)
+        self._cache = None
         return actual_damage
     
     def heal(self, amount: int):
         """Heal the agent"""
-        self.hp = min(self.max_hp, self.hp + amount)
+        self._hp = min(self._max_hp, self._hp + amount)
+        self._cache = None
     
     def use_stamina(self, amount: int) -> bool:
         """Use stamina, return False if not enough"""
-        if self.stamina >= amount:
-            self.stamina -= amount
+        if self._stamina >= amount:
+            self._stamina -= amount
+            self._cache = None
             return True
         return False
     
     def restore_stamina(self, amount: int):
         """Restore stamina"""
-        self.stamina = min(self.max_stamina, self.stamina + amount)
+        self._stamina = min(self._max_stamina, self._stamina + amount)
+        self._cache = None
     
     def is_alive(self) -> bool:
         """Check if agent is still alive"""
-        return self.hp > 0
+        return self._hp > 0
     
     def reset_for_battle(self):
         """Reset HP/Stamina for new battle"""
-        self.hp = self.max_hp
-        self.stamina = self.max_stamina
-        self.buffs = []
-        self.debuffs = []
+        self._hp = self._max_hp
+        self._stamina = self._max_stamina
+        self._buffs = []
+        self._debuffs = []
+        self._cache = None
     
     def to_dict(self) -> Dict:
-        """Convert agent to dictionary for JSON"""
-        return {
-            'name': self.name,
-            'type': self.agent_type,
-            'type_name': self.agent_type_data.get('name', 'Unknown'),
-            'avatar': self.agent_type_data.get('avatar', '🤖'),
-            'color': self.agent_type_data.get('color', '#00ff00'),
-            'level': self.level,
-            'hp': self.hp,
-            'max_hp': self.max_hp,
-            'stamina': self.stamina,
-            'max_stamina': self.max_stamina,
-            'attack': self.attack,
-            'defense': self.defense,
-            'xp': self.xp,
-            'xp_to_next_level': self.xp_to_next_level,
-            'xp_percentage': int((self.xp / self.xp_to_next_level) * 100) if self.xp_to_next_level > 0 else 0,
-            'buffs': self.buffs,
-            'debuffs': self.debuffs,
-            'wins': self.wins,
-            'losses': self.losses
-        }
+        """Convert agent to dictionary for JSON.
+
+        The dict is cached until a tracked stat is reassigned, so callers must
+        treat it as read-only. Buff/debuff lists are shared live, as before.
+        """
+        if self._cache is None:
+            type_data = self.agent_type_data
+            self._cache = {
+                'name': self._name,
+                'type': self.agent_type,
+                'type_name': type_data.get('name', 'Unknown'),
+                'avatar': type_data.get('avatar', '🤖'),
+                'color': type_data.get('color', '#00ff00'),
+                'level': self._level,
+                'hp': self._hp,
+                'max_hp': self._max_hp,
+                'stamina': self._stamina,
+                'max_stamina': self._max_stamina,
+                'attack': self._attack,
+                'defense': self._defense,
+                'xp': self._xp,
+                'xp_to_next_level': self._xp_to_next_level,
+                'xp_percentage': int((self._xp / self._xp_to_next_level) * 100) if self._xp_to_next_level > 0 else 0,
+                'buffs': self._buffs,
+                'debuffs': self._debuffs,
+                'wins': self._wins,
+                'losses': self._losses
+            }
+        return self._cache
 
     @classmethod
     def from_dict(cls, data: Dict) -> "Agent":
@@ -167,15 +239,28 @@ class Agent:
         )
 
         # Restore stats and progress
-        for attr in [
-            'max_hp', 'hp', 'max_stamina', 'stamina',
-            'attack', 'defense', 'xp', 'xp_to_next_level',
-            'wins', 'losses'
-        ]:
+        for attr, slot in _RESTORED_FIELDS:
             if attr in data:
-                setattr(agent, attr, data[attr])
+                setattr(agent, slot, data[attr])
 
-        agent.buffs = data.get('buffs', [])
-        agent.debuffs = data.get('debuffs', [])
+        agent._buffs = data.get('buffs', [])
+        agent._debuffs = data.get('debuffs', [])
+        agent._cache = None
 
         return agent
+
+
+def _tracked_property(field: str) -> property:
+    slot = getattr(Agent, '_' + field)
+    set_slot = slot.__set__
+
+    def setter(self, value):
+        set_slot(self, value)
+        self._cache = None
+
+    return property(attrgetter('_' + field), setter)
+
+
+for _field in _TRACKED_FIELDS:
+    setattr(Agent, _field, _tracked_property(_field))
+del _field
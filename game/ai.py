@@ -0,0 +1,106 @@
+"""
+Agent Battle Simulator - AI Opponent
+Weighted, effect-aware action selection for computer-controlled agents
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+from .actions import get_all_actions
+from .agents import Agent
+
+
+def _get_ai_profile(agent: Agent) -> str:
+    """Return deterministic AI profile (aggressive/defensive) based on bot ID."""
+    profile_hash = sum(ord(char) for char in agent.agent_type)
+    return 'aggressive' if profile_hash % 2 else 'defensive'
+
+
+def _get_action_category(action: Dict) -> str:
+    """Classify an action into offensive/debuff/defensive categories."""
+    debuff_effects = {'burn', 'slow', 'sticky', 'debuff_attack', 'debuff_defense'}
+    defensive_effects = {'heal', 'buff_defense'}
+
+    action_effects = set(action.get('effects', []))
+    if action_effects & defensive_effects:
+        return 'defensive'
+    if action_effects & debuff_effects:
+        return 'debuff'
+    return 'offensive'
+
+
+def _has_named_effect(effects: List[Dict], name: str) -> bool:
+    """Check if a list of buffs/debuffs contains an entry by name."""
+    return any(effect.get('name') == name for effect in effects)
+
+
+BASE_PROFILE_WEIGHTS = {
+    'aggressive': {'offensive': 1.2, 'debuff': 1.0, 'defensive': 0.85},
+    'defensive': {'offensive': 0.9, 'debuff': 1.0, 'defensive': 1.25},
+}
+
+
+def action_weights(profile: str, available_actions: List[Dict], type_randomness: Dict[str, float],
+                   low_hp: bool, opponent_burning: bool, agent_sticky: bool) -> Tuple[List[Dict], List[float]]:
+    """Return the candidate actions and their selection weights for one decision."""
+    defensive_options = [a for a in available_actions if _get_action_category(a) == 'defensive']
+    if profile == 'defensive' and low_hp and defensive_options:
+        available_actions = defensive_options
+
+    if agent_sticky:
+        min_cost = min(action['stamina_cost'] for action in available_actions)
+        cheap_cap = min_cost + 5
+        available_actions = [a for a in available_actions if a['stamina_cost'] <= cheap_cap]
+
+    weights = []
+    for action in available_actions:
+        category = _get_action_category(action)
+        weight = type_randomness[category]
+
+        if profile == 'aggressive' and category == 'offensive':
+            weight *= 1.1
+
+        if profile == 'defensive' and category == 'defensive':
+            weight *= 1.2
+
+        if low_hp and category == 'defensive':
+            weight *= 1.35
+
+        if opponent_burning and category == 'debuff':
+            weight *= 1.25
+
+        if agent_sticky:
+            weight *= 1 / (1 + (action['stamina_cost'] / 12))
+
+        weight *= 1 + (action['damage_range'][1] / 60)
+        weight *= 1 + max(0, (40 - action['stamina_cost'])) / 220
+
+        weights.append(weight)
+    return available_actions, weights
+
+
+def select_ai_action(agent: Agent, opponent: Agent, rng: Optional[random.Random] = None,
+                     actions: Optional[List[Dict]] = None) -> Dict:
+    """Choose an AI action with weighted randomness and awareness of current effects."""
+
+    rng = rng or random
+    actions = actions or get_all_actions()
+
+    # Filter actions by stamina
+    available_actions = [a for a in actions if a['stamina_cost'] <= agent.stamina]
+
+    if not available_actions:
+        return sorted(actions, key=lambda x: x['stamina_cost'])[0]
+
+    profile = _get_ai_profile(agent)
+    profile_weights = BASE_PROFILE_WEIGHTS.get(profile, BASE_PROFILE_WEIGHTS['aggressive'])
+    type_randomness = {category: profile_weights[category] * rng.uniform(0.85, 1.15)
+                       for category in ['offensive', 'debuff', 'defensive']}
+
+    available_actions, weights = action_weights(
+        profile, available_actions, type_randomness,
+        low_hp=agent.hp < agent.max_hp * 0.4,
+        opponent_burning=_has_named_effect(opponent.debuffs, 'Brennend'),
+        agent_sticky=_has_named_effect(agent.debuffs, 'Klebrig'),
+    )
+    return rng.choices(available_actions, weights=weights, k=1)[0]
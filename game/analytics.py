@@ -0,0 +1,398 @@
+"""
+Agent Battle Simulator - Battle Analytics
+Streams battles into columnar numpy chunks for balance statistics and export.
+
+Requires numpy (see requirements-train.txt); Parquet export also needs pyarrow.
+
+Usage:
+    python -m game.analytics simulate --pairs all --battles 1000 --workers 4 -o stats/
+    python -m game.analytics simulate --pairs mende:regulus --battles 500 --format parquet -o stats/
+    python -m game.analytics report stats/
+
+The pipeline is a chain of generators. Battles come from simulation shards
+(simulate_records) or from any iterable of finished Battle objects
+(battle_records). They are turned into batches of per-column lists, which
+ColumnBuffer copies into preallocated numpy arrays. Each time a buffer is
+full, the chunk goes to the sinks: GroupBy aggregations and NPZ/Parquet
+writers that write it at once. Memory is bounded by the chunk size, not by
+the number of events.
+
+Two tables are produced:
+    events   one row per action played: battle, round, agent (1/2), bot,
+             opponent, action_id, damage, used (False = not enough stamina)
+    battles  one row per battle: battle, bot1, bot2, level1, level2, rounds,
+             winner (0 = draw, 1, 2)
+Bots are stored as small integer codes; the code -> bot id list is kept in the
+store's manifest.json.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from multiprocessing.pool import AsyncResult
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .battle import Battle
+from .battle_bots import get_all_battle_bots
+from .catalog import get_catalog
+from .sim import battle_seed, make_shards, parse_pairs, play_battle
+
+EVENT_SCHEMA = (('battle', np.int64), ('round', np.int32), ('agent', np.int8), ('bot', np.int16),
+                ('opponent', np.int16), ('action_id', np.int16), ('damage', np.int32), ('used', np.bool_))
+BATTLE_SCHEMA = (('battle', np.int64), ('bot1', np.int16), ('bot2', np.int16), ('level1', np.int16),
+                 ('level2', np.int16), ('rounds', np.int32), ('winner', np.int8))
+SCHEMAS = {'events': EVENT_SCHEMA, 'battles': BATTLE_SCHEMA}
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+# Per-column lists for each table, as produced by the record generators
+Columns = Dict[str, List]
+Chunk = Dict[str, np.ndarray]
+Sink = Callable[[Chunk], None]
+
+
+def empty_columns(table: str) -> Columns:
+    return {name: [] for name, _ in SCHEMAS[table]}
+
+
+def default_bot_codes() -> Dict[str, int]:
+    return {bot['id']: code for code, bot in enumerate(get_all_battle_bots())}
+
+
+def _add_battle(events: Columns, battles: Columns, battle: Battle, number: int, bot_codes: Dict[str, int]) -> None:
+    """Append one finished battle's rows (unknown bots get the next free code)"""
+    codes = [bot_codes.setdefault(agent.agent_type, len(bot_codes)) for agent in (battle.agent1, battle.agent2)]
+    for turn in battle.battle_log:
+        for entry in turn['actions']:
+            agent = entry['agent']
+            events['battle'].append(number)
+            events['round'].append(turn['round'])
+            events['agent'].append(agent)
+            events['bot'].append(codes[agent - 1])
+            events['opponent'].append(codes[2 - agent])
+            events['action_id'].append(entry['action_id'])
+            events['damage'].append(entry['damage'])
+            events['used'].append(entry['used'])
+    if battle.winner is battle.agent1:
+        winner = 1
+    elif battle.winner is battle.agent2:
+        winner = 2
+    else:
+        winner = 0
+    for name, value in (('battle', number), ('bot1', codes[0]), ('bot2', codes[1]),
+                        ('level1', battle.agent1.level), ('level2', battle.agent2.level),
+                        ('rounds', battle.current_round), ('winner', winner)):
+        battles[name].append(value)
+
+
+def battle_records(battles: Iterable[Battle], bot_codes: Dict[str, int], start: int = 0,
+                   batch_size: int = 256) -> Iterator[Tuple[Columns, Columns]]:
+    """(events, battles) column batches from finished battles, numbered from `start`"""
+    events, rows = empty_columns('events'), empty_columns('battles')
+    for number, battle in enumerate(battles, start):
+        _add_battle(events, rows, battle, number, bot_codes)
+        if len(rows['battle']) >= batch_size:
+            yield events, rows
+            events, rows = empty_columns('events'), empty_columns('battles')
+    if rows['battle']:
+        yield events, rows
+
+
+def _simulate_shard(task) -> Tuple[Columns, Columns]:
+    (pair_index, start, count), pairs, config = task
+    bot1, bot2 = pairs[pair_index]
+    events, rows = empty_columns('events'), empty_columns('battles')
+    for index in range(start, start + count):
+        battle = play_battle(bot1, bot2, battle_seed(config['seed'], bot1, bot2, index),
+                             config['level'], config['max_rounds'])
+        _add_battle(events, rows, battle, pair_index * config['battles'] + index, config['bot_codes'])
+    return events, rows
+
+
+def simulate_records(pairs: List[Tuple[str, str]], battles: int, bot_codes: Dict[str, int], seed: int = 0,
+                     level: int = 1, max_rounds: int = 100, workers: int = 1,
+                     shard_size: int = 100) -> Iterator[Tuple[Columns, Columns]]:
+    """(events, battles) column batches of AI-vs-AI battles, one batch per shard.
+
+    Battles are seeded like game.sim, so the rows match a campaign with the
+    same settings; battle numbers are pair index * battles + index.
+    """
+    config = {'seed': seed, 'level': level, 'max_rounds': max_rounds, 'battles': battles, 'bot_codes': bot_codes}
+    tasks = [(shard, pairs, config) for shard in make_shards(len(pairs), battles, shard_size)]
+    if workers <= 1:
+        for task in tasks:
+            yield _simulate_shard(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        # Pool.imap would queue every shard at once and buffer finished ones without limit while the
+        # sinks are slow; at most two shards per worker in flight keeps memory bounded and the order intact
+        pending: Deque[AsyncResult] = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_simulate_shard, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class ColumnBuffer:
+    """Preallocated numpy columns; every full chunk is passed to the sinks and the arrays reused.
+
+    Sinks get views into the buffer that are only valid during the call;
+    copy anything that has to outlive it.
+    """
+
+    def __init__(self, schema: Sequence[Tuple[str, type]], chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 sinks: Sequence[Sink] = ()):
+        self.arrays = {name: np.empty(chunk_rows, dtype=dtype) for name, dtype in schema}
+        self.chunk_rows = chunk_rows
+        self.sinks = list(sinks)
+        self.size = 0
+        self.rows = 0
+
+    def extend(self, columns: Columns) -> None:
+        count = len(next(iter(columns.values())))
+        offset = 0
+        while offset < count:
+            take = min(count - offset, self.chunk_rows - self.size)
+            for name, values in columns.items():
+                self.arrays[name][self.size:self.size + take] = values[offset:offset + take]
+            self.size += take
+            offset += take
+            if self.size == self.chunk_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self.size:
+            return
+        chunk = {name: array[:self.size] for name, array in self.arrays.items()}
+        for sink in self.sinks:
+            sink(chunk)
+        self.rows += self.size
+        self.size = 0
+
+
+def run_pipeline(records: Iterable[Tuple[Columns, Columns]], event_sinks: Sequence[Sink] = (),
+                 battle_sinks: Sequence[Sink] = (), chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, int]:
+    """Feed record batches through chunk buffers into the sinks; returns row counts per table"""
+    events = ColumnBuffer(EVENT_SCHEMA, chunk_rows, event_sinks)
+    # A battle has dozens of events; a smaller battles buffer keeps memory in line
+    battles = ColumnBuffer(BATTLE_SCHEMA, max(1, chunk_rows // 16), battle_sinks)
+    for event_columns, battle_columns in records:
+        events.extend(event_columns)
+        battles.extend(battle_columns)
+    events.flush()
+    battles.flush()
+    return {'events': events.rows, 'battles': battles.rows}
+
+
+class GroupBy:
+    """Streaming group-by: row count plus sum and mean of value columns per key combination."""
+
+    def __init__(self, keys: Sequence[str], values: Sequence[str] = (),
+                 where: Optional[Callable[[Chunk], np.ndarray]] = None):
+        self.keys = tuple(keys)
+        self.values = tuple(values)
+        self.where = where
+        # key tuple -> [count, sum of each value column]
+        self._groups: Dict[Tuple, List[float]] = {}
+
+    def __call__(self, chunk: Chunk) -> None:
+        mask = self.where(chunk) if self.where is not None else None
+        columns = {name: chunk[name] if mask is None else chunk[name][mask] for name in self.keys + self.values}
+        keys = np.stack([columns[name].astype(np.int64) for name in self.keys], axis=1)
+        if not len(keys):
+            return
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        totals = [np.bincount(inverse, minlength=len(groups))]
+        totals += [np.bincount(inverse, weights=columns[name], minlength=len(groups)) for name in self.values]
+        for index, group in enumerate(map(tuple, groups.tolist())):
+            entry = self._groups.setdefault(group, [0] * len(totals))
+            for column, total in enumerate(totals):
+                entry[column] += total[index].item()
+
+    def rows(self) -> List[Dict]:
+        """One dict per group, sorted by key: key columns, count, sum_<v> and mean_<v>"""
+        result = []
+        for group, totals in sorted(self._groups.items()):
+            row = dict(zip(self.keys, group))
+            row['count'] = int(totals[0])
+            for name, total in zip(self.values, totals[1:]):
+                row[f'sum_{name}'] = total
+                row[f'mean_{name}'] = total / totals[0]
+            result.append(row)
+        return result
+
+
+class ColumnStore:
+    """Chunked on-disk tables: NPZ files per chunk, or one Parquet file per table (row group per chunk).
+
+    Chunks are written as they arrive; close() writes manifest.json with the
+    schema, row counts and the bot code list.
+    """
+
+    def __init__(self, directory: str, fmt: str = 'npz', bot_codes: Optional[Dict[str, int]] = None):
+        if fmt not in ('npz', 'parquet'):
+            raise ValueError("format must be npz or parquet")
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt = fmt
+        self.bot_codes = bot_codes if bot_codes is not None else default_bot_codes()
+        self.tables: Dict[str, Dict] = {table: {'rows': 0, 'files': []} for table in SCHEMAS}
+        self._parquet: Dict[str, object] = {}
+
+    def sink(self, table: str) -> Sink:
+        return lambda chunk: self.write(table, chunk)
+
+    def write(self, table: str, chunk: Chunk) -> None:
+        info = self.tables[table]
+        if self.fmt == 'npz':
+            name = f'{table}-{len(info["files"]):05d}.npz'
+            np.savez_compressed(os.path.join(self.directory, name), **chunk)
+            info['files'].append(name)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            batch = pa.table({name: pa.array(values) for name, values in chunk.items()})
+            writer = self._parquet.get(table)
+            if writer is None:
+                name = f'{table}.parquet'
+                writer = self._parquet[table] = pq.ParquetWriter(os.path.join(self.directory, name), batch.schema)
+                info['files'].append(name)
+            writer.write_table(batch)
+        info['rows'] += len(next(iter(chunk.values())))
+
+    def close(self) -> None:
+        for writer in self._parquet.values():
+            writer.close()
+        self._parquet.clear()
+        bots = sorted(self.bot_codes, key=self.bot_codes.get)
+        manifest = {
+            'format': self.fmt,
+            'bots': bots,
+            'actions': {str(action['id']): action['name'] for action in get_catalog().actions},
+            'schemas': {table: [[name, np.dtype(dtype).str] for name, dtype in schema]
+                        for table, schema in SCHEMAS.items()},
+            'tables': self.tables,
+        }
+        with open(os.path.join(self.directory, 'manifest.json'), 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_manifest(directory: str) -> Dict:
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def read_chunks(directory: str, table: str) -> Iterator[Chunk]:
+    """Chunks of a stored table in write order (one NPZ file or Parquet row group at a time)"""
+    manifest = load_manifest(directory)
+    for name in manifest['tables'][table]['files']:
+        path = os.path.join(directory, name)
+        if manifest['format'] == 'npz':
+            with np.load(path) as data:
+                yield {column: data[column] for column in data.files}
+        else:
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(path)
+            for group in range(parquet.num_row_groups):
+                batch = parquet.read_row_group(group)
+                yield {column: batch.column(column).to_numpy() for column in batch.column_names}
+
+
+def balance_report(directory: str) -> Dict:
+    """Action pick rates and damage per bot, and rounds and win rates per matchup"""
+    manifest = load_manifest(directory)
+    bots, actions = manifest['bots'], manifest['actions']
+
+    picks = GroupBy(('bot', 'action_id'), ('damage',))
+    for chunk in read_chunks(directory, 'events'):
+        picks(chunk)
+    matchups = GroupBy(('bot1', 'bot2'), ('rounds',))
+    wins = GroupBy(('bot1', 'bot2', 'winner'))
+    for chunk in read_chunks(directory, 'battles'):
+        matchups(chunk)
+        wins(chunk)
+
+    per_bot: Dict[str, Dict] = {}
+    for row in picks.rows():
+        bot = per_bot.setdefault(bots[row['bot']], {'events': 0, 'damage': 0, 'actions': {}})
+        bot['events'] += row['count']
+        bot['damage'] += row['sum_damage']
+        bot['actions'][actions.get(str(row['action_id']), str(row['action_id']))] = row['count']
+    for bot in per_bot.values():
+        bot['mean_damage'] = bot['damage'] / bot['events']
+        bot['pick_rates'] = {name: count / bot['events'] for name, count in bot['actions'].items()}
+        del bot['actions']
+
+    outcomes: Dict[Tuple[int, int], Dict[int, int]] = {}
+    for row in wins.rows():
+        outcomes.setdefault((row['bot1'], row['bot2']), {})[row['winner']] = row['count']
+    matchup_rows = []
+    for row in matchups.rows():
+        counts = outcomes[(row['bot1'], row['bot2'])]
+        matchup_rows.append({
+            'bot1': bots[row['bot1']], 'bot2': bots[row['bot2']], 'battles': row['count'],
+            'mean_rounds': row['mean_rounds'],
+            'bot1_win_rate': counts.get(1, 0) / row['count'],
+            'bot2_win_rate': counts.get(2, 0) / row['count'],
+            'draw_rate': counts.get(0, 0) / row['count'],
+        })
+    return {'bots': per_bot, 'matchups': matchup_rows}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m game.analytics', description="Columnar battle statistics")
+    commands = parser.add_subparsers(dest='command', required=True)
+    simulate = commands.add_parser('simulate', help="Simulate battles into a column store")
+    simulate.add_argument('--pairs', default='all', help='"all" or comma-separated bot1:bot2 pairs')
+    simulate.add_argument('--battles', type=int, default=100, help="Battles per pair")
+    simulate.add_argument('--seed', type=int, default=0)
+    simulate.add_argument('--workers', type=int, default=1)
+    simulate.add_argument('--level', type=int, default=1)
+    simulate.add_argument('--max-rounds', type=int, default=100)
+    simulate.add_argument('--shard-size', type=int, default=100)
+    simulate.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Event rows per chunk")
+    simulate.add_argument('--format', choices=('npz', 'parquet'), default='npz')
+    simulate.add_argument('-o', '--output', required=True, help="Output directory")
+    report = commands.add_parser('report', help="Print pick rates, damage and matchup statistics")
+    report.add_argument('directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'report':
+        print(json.dumps(balance_report(args.directory), ensure_ascii=False, indent=2))
+        return 0
+
+    try:
+        pairs = parse_pairs(args.pairs)
+    except ValueError as error:
+        parser.error(str(error))
+    bot_codes = default_bot_codes()
+    with ColumnStore(args.output, args.format, bot_codes) as store:
+        records = simulate_records(pairs, args.battles, bot_codes, seed=args.seed, level=args.level,
+                                   max_rounds=args.max_rounds, workers=args.workers, shard_size=args.shard_size)
+        counts = run_pipeline(records, [store.sink('events')], [store.sink('battles')], args.chunk_rows)
+    print(json.dumps(counts), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""
+Agent Battle Simulator - Arena
+Team fights and free-for-all battles between any number of combatants.
+
+State is kept as one list per stat (struct of arrays) indexed by combatant,
+and every round is a single pass over the living combatants: all of them
+pay stamina, then act once in a freshly shuffled initiative order against a
+target picked by the targeting rule. Damage and effects follow
+Battle.execute_turn (effects stack for the rest of the battle). Passive
+abilities are not modeled, so agents of bots that have them are rejected;
+the arena only covers the catalog's passive_free_bots (python -m game.catalog
+bots lists them), and Battle remains the engine for the full roster. Cost per round is
+linear in the number of combatants ("weakest" targeting adds one sort per round).
+
+    arena = Arena(agents, teams=[0, 0, 0, 1, 1, 1], seed=1)   # 3v3
+    arena = Arena(agents, seed=1)                             # free-for-all
+    arena.run(max_rounds=100)                                 # or execute_round() per round
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .actions import EFFECT_BITS
+from .agents import Agent
+from .ai import BASE_PROFILE_WEIGHTS, _get_ai_profile, action_weights
+from .catalog import Catalog, get_catalog
+
+TARGETING = ('random', 'weakest')
+
+_BURNING = EFFECT_BITS['Brennend']
+_STICKY = EFFECT_BITS['Klebrig']
+
+
+class Arena:
+    """N combatants on any number of teams (default: everyone for themselves)."""
+
+    def __init__(self, agents: Sequence[Agent], teams: Optional[Sequence[int]] = None,
+                 targeting: str = 'random', seed=None, catalog: Optional[Catalog] = None):
+        if len(agents) < 2:
+            raise ValueError("An arena needs at least two combatants")
+        if teams is None:
+            teams = range(len(agents))
+        teams = list(teams)
+        if len(teams) != len(agents):
+            raise ValueError("teams must have one entry per agent")
+        if len(set(teams)) < 2:
+            raise ValueError("An arena needs at least two teams")
+        if targeting not in TARGETING:
+            raise ValueError(f"targeting must be one of {', '.join(TARGETING)}")
+        # Actions of the catalog current at creation, like Battle
+        catalog = catalog or get_catalog()
+        for agent in agents:
+            if (agent.agent_type_data or {}).get('passives'):
+                raise ValueError(f"Bot {agent.agent_type!r} has passive abilities, which Arena does not model "
+                                 f"(use one of {', '.join(catalog.passive_free_bots)})")
+
+        self.agents = list(agents)
+        self.teams = teams
+        self.targeting = targeting
+        self.rng = random.Random(seed)
+        self.catalog = catalog
+        self.actions = self.catalog.action_table
+        self.current_round = 0
+        self.winner_team: Optional[int] = None
+
+        # Struct of arrays, indexed by combatant
+        self.hp = [agent.max_hp for agent in agents]
+        self.max_hp = [agent.max_hp for agent in agents]
+        self.stamina = [agent.max_stamina for agent in agents]
+        self.base_attack = [agent.attack for agent in agents]
+        self.base_defense = [agent.defense for agent in agents]
+        self.attack_mod = [0] * len(agents)
+        self.defense_mod = [0] * len(agents)
+        self.effects = [0] * len(agents)
+        self.profiles = [_get_ai_profile(agent) for agent in agents]
+
+        self.alive = list(range(len(agents)))
+        self._team_alive = {team: teams.count(team) for team in set(teams)}
+
+    def attack(self, index: int) -> int:
+        return max(1, self.base_attack[index] + self.attack_mod[index])
+
+    def defense(self, index: int) -> int:
+        return max(1, self.base_defense[index] + self.defense_mod[index])
+
+    def effect_names(self, index: int) -> List[str]:
+        return [name for name, bit in EFFECT_BITS.items() if self.effects[index] & bit]
+
+    # Decisions
+
+    def _pick_target(self, index: int, ranked: Optional[List[int]]) -> Optional[int]:
+        team = self.teams[index]
+        if ranked is not None:
+            for target in ranked:
+                if self.hp[target] > 0 and self.teams[target] != team:
+                    return target
+            return None
+        alive = self.alive
+        # Rejection sampling stays O(1) expected unless almost everyone left is a teammate
+        for _ in range(8):
+            target = alive[self.rng.randrange(len(alive))]
+            if self.teams[target] != team and self.hp[target] > 0:
+                return target
+        enemies = [target for target in alive if self.teams[target] != team and self.hp[target] > 0]
+        return self.rng.choice(enemies) if enemies else None
+
+    def choose_action(self, index: int, target: int) -> int:
+        """select_ai_action's weighting, read from the arena's state"""
+        stamina = self.stamina[index]
+        available = [action for action in self.actions.actions if action['stamina_cost'] <= stamina]
+        if not available:
+            return self.actions.cheapest['id']
+        profile = self.profiles[index]
+        weights = BASE_PROFILE_WEIGHTS[profile]
+        type_randomness = {category: weight * self.rng.uniform(0.85, 1.15) for category, weight in weights.items()}
+        candidates, action_weight = action_weights(
+            profile, available, type_randomness,
+            low_hp=self.hp[index] < self.max_hp[index] * 0.4,
+            opponent_burning=bool(self.effects[target] & _BURNING),
+            agent_sticky=bool(self.effects[index] & _STICKY),
+        )
+        return self.rng.choices(candidates, weights=action_weight, k=1)[0]['id']
+
+    # Resolution
+
+    def execute_round(self, actions: Optional[Dict[int, Tuple[int, Optional[int]]]] = None) -> Dict:
+        """Resolve one round.
+
+        actions maps combatant index -> (action id, target index or None) for
+        player-controlled combatants; everyone else is played by the AI.
+        Returns the round number, the events in initiative order and the
+        winning team once only one team is left standing.
+        """
+        if self.winner_team is not None:
+            raise ValueError("Arena battle is already over")
+        actions = actions or {}
+        self.current_round += 1
+        rng = self.rng
+        hp, stamina = self.hp, self.stamina
+        compiled_actions = self.actions.compiled
+        ranked = sorted(self.alive, key=hp.__getitem__) if self.targeting == 'weakest' else None
+
+        # Decide and pay up front, like Battle.execute_turn
+        plans = []
+        for index in self.alive:
+            action_id, target = actions.get(index, (None, None))
+            if target is None or hp[target] <= 0 or self.teams[target] == self.teams[index]:
+                target = self._pick_target(index, ranked)
+            if action_id is None:
+                action_id = self.choose_action(index, target)
+            compiled = compiled_actions.get(action_id) if isinstance(action_id, int) else None
+            if compiled is None:
+                raise ValueError(f"Unknown action id: {action_id}")
+            can_use = stamina[index] >= compiled[0]
+            if can_use:
+                stamina[index] -= compiled[0]
+            plans.append((index, action_id, target, can_use))
+        rng.shuffle(plans)
+
+        events = []
+        for index, action_id, target, can_use in plans:
+            if hp[index] <= 0:
+                continue
+            if not can_use:
+                events.append({'attacker': index, 'action_id': action_id, 'target': None, 'damage': 0})
+                continue
+            if hp[target] <= 0:
+                # Target fell earlier this round
+                target = self._pick_target(index, ranked)
+                if target is None:
+                    break
+            (_, low, high, def_attack, def_defense, def_bits,
+             att_attack, att_defense, att_bits, heal) = compiled_actions[action_id]
+
+            defense = self.defense(target)
+            damage = max(1, rng.randint(low, high) + self.attack(index) // 5 - defense // 10)
+            damage = max(1, damage - defense // 2)
+            hp[target] = max(0, hp[target] - damage)
+
+            self.attack_mod[target] += def_attack
+            self.defense_mod[target] += def_defense
+            self.effects[target] |= def_bits
+            self.attack_mod[index] += att_attack
+            self.defense_mod[index] += att_defense
+            self.effects[index] |= att_bits
+            if heal:
+                hp[index] = min(self.max_hp[index], hp[index] + heal)
+
+            event = {'attacker': index, 'action_id': action_id, 'target': target, 'damage': damage}
+            if hp[target] == 0:
+                event['knocked_out'] = True
+                self._team_alive[self.teams[target]] -= 1
+            events.append(event)
+
+        self.alive = [index for index in self.alive if hp[index] > 0]
+        standing = [team for team, count in self._team_alive.items() if count > 0]
+        if len(standing) == 1:
+            self.winner_team = standing[0]
+        return {'round': self.current_round, 'events': events, 'winner_team': self.winner_team}
+
+    def stalled(self) -> bool:
+        """True when no living combatant can pay for any action (stamina never regenerates)"""
+        cheapest = self.actions.min_cost
+        return all(self.stamina[index] < cheapest for index in self.alive)
+
+    def run(self, max_rounds: int = 100) -> Optional[int]:
+        """Play AI-only rounds until one team is left, nobody can act or max_rounds;
+        returns the winning team (None = draw)"""
+        while self.winner_team is None and self.current_round < max_rounds and not self.stalled():
+            self.execute_round()
+        return self.winner_team
+
+    def combatant(self, index: int) -> Dict:
+        agent = self.agents[index]
+        return {
+            'name': agent.name,
+            'type': agent.agent_type,
+            'team': self.teams[index],
+            'hp': self.hp[index],
+            'max_hp': self.max_hp[index],
+            'stamina': self.stamina[index],
+            'attack': self.attack(index),
+            'defense': self.defense(index),
+            'effects': self.effect_names(index),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'round': self.current_round,
+            'winner_team': self.winner_team,
+            'combatants': [self.combatant(index) for index in range(len(self.agents))],
+        }
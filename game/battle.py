@@ -6,21 +6,68 @@ Handles battle logic and state
 import random
 from typing import Dict, List, Optional
 from .agents import Agent
-from .actions import get_action, calculate_damage, apply_effects, get_random_comment
+from .actions import calculate_damage, apply_effects, get_random_comment
+from .abilities import get_passive_hooks
+from .catalog import Catalog, get_catalog
 
 class Battle:
-    def __init__(self, agent1: Agent, agent2: Agent, reset_agents: bool = True):
+    def __init__(self, agent1: Agent, agent2: Agent, reset_agents: bool = True, catalog: Optional[Catalog] = None,
+                 rng: Optional[random.Random] = None):
         self.agent1 = agent1
         self.agent2 = agent2
+        # Actions are looked up in the catalog the battle started with, so reloads do not change running battles
+        self.catalog = catalog or get_catalog()
+        # Own random generator (e.g. for replayable battles, see journal.py); None = the random module
+        self.rng = rng
         self.current_round = 0
         self.battle_log: List[Dict] = []
         self.winner: Optional[Agent] = None
+
+        # Compiled passive abilities and their per-battle state
+        self.hooks1 = get_passive_hooks(agent1)
+        self.hooks2 = get_passive_hooks(agent2)
+        self.ability_state = ({'round': 0}, {'round': 0})
+        if rng is not None:
+            for state in self.ability_state:
+                state['rng'] = rng
+        self.has_passives = self.hooks1.has_hooks or self.hooks2.has_hooks
         
         # Reset agents for battle
         if reset_agents:
             self.agent1.reset_for_battle()
             self.agent2.reset_for_battle()
     
+    def fork(self, rng: Optional[random.Random] = None) -> "Battle":
+        """Copy of the current state that can be played on without touching this battle.
+
+        Cost does not grow with battle length: agents are cloned, compiled
+        passive hooks are shared and only their small per-battle state is
+        copied, and the fork starts with an empty battle_log. The fork draws
+        from `rng`, or from the random module when it is None.
+        """
+        fork = Battle.__new__(Battle)
+        fork.agent1 = self.agent1.clone()
+        fork.agent2 = self.agent2.clone()
+        fork.catalog = self.catalog
+        fork.rng = rng
+        fork.current_round = self.current_round
+        fork.battle_log = []
+        if self.winner is self.agent1:
+            fork.winner = fork.agent1
+        elif self.winner is self.agent2:
+            fork.winner = fork.agent2
+        else:
+            fork.winner = None
+        fork.hooks1 = self.hooks1
+        fork.hooks2 = self.hooks2
+        fork.ability_state = tuple({key: value for key, value in state.items() if key != 'rng'}
+                                   for state in self.ability_state)
+        if rng is not None:
+            for state in fork.ability_state:
+                state['rng'] = rng
+        fork.has_passives = self.has_passives
+        return fork
+
     def execute_turn(self, action1_id: int, action2_id: int) -> Dict:
         """Execute one turn of battle"""
         self.current_round += 1
@@ -35,22 +82,33 @@ class Battle:
         }
         
         # Get actions
-        action1 = get_action(action1_id)
-        action2 = get_action(action2_id)
+        action1 = self.catalog.get_action(action1_id)
+        action2 = self.catalog.get_action(action2_id)
         
+        # Passive abilities; battles between hook-free bots skip all of this
+        passive = self.has_passives
+        if passive:
+            cost1, cost2 = self._stamina_costs(action1, action2)
+        else:
+            cost1, cost2 = action1['stamina_cost'], action2['stamina_cost']
+
         # Check stamina
-        can_use_1 = self.agent1.use_stamina(action1['stamina_cost'])
-        can_use_2 = self.agent2.use_stamina(action2['stamina_cost'])
+        can_use_1 = self.agent1.use_stamina(cost1)
+        can_use_2 = self.agent2.use_stamina(cost2)
         
         # Execute actions (random order for fairness)
-        agents = [(self.agent1, self.agent2, action1, can_use_1),
-                  (self.agent2, self.agent1, action2, can_use_2)]
-        random.shuffle(agents)
+        agents = [(self.agent1, self.agent2, action1, can_use_1, 0),
+                  (self.agent2, self.agent1, action2, can_use_2, 1)]
+        rng = self.rng or random
+        rng.shuffle(agents)
         
-        for attacker, defender, action, can_use in agents:
+        for attacker, defender, action, can_use, side in agents:
             if not can_use:
                 turn_result['actions'].append({
                     'attacker': attacker.name,
+                    'agent': side + 1,
+                    'action_id': action['id'],
+                    'used': False,
                     'action': 'Keine Stamina!',
                     'damage': 0,
                     'effects': [],
@@ -59,17 +117,34 @@ class Battle:
                 continue
             
             # Calculate damage
-            damage = calculate_damage(action, attacker, defender)
-            actual_damage = defender.take_damage(damage)
-            
-            # Apply effects
-            effect_messages = apply_effects(action, attacker, defender)
+            damage = calculate_damage(action, attacker, defender, rng)
+            if passive:
+                passive_messages: List[str] = []
+                damage = self._pre_damage(side, action, damage, passive_messages)
+
+            if damage > 0:
+                actual_damage = defender.take_damage(damage)
+
+                # Apply effects
+                effect_messages = apply_effects(action, attacker, defender)
+            else:
+                # Dodged or blocked by a passive ability
+                actual_damage = 0
+                effect_messages = []
+
+            if passive:
+                if actual_damage > 0:
+                    self._post_damage(side, action, actual_damage, passive_messages)
+                effect_messages = passive_messages + effect_messages
             
             # Get comment
-            comment = get_random_comment(action)
+            comment = get_random_comment(action, rng)
             
             turn_result['actions'].append({
                 'attacker': attacker.name,
+                'agent': side + 1,
+                'action_id': action['id'],
+                'used': True,
                 'action': action['name'],
                 'description': action['description'],
                 'damage': actual_damage,
@@ -77,21 +152,18 @@ class Battle:
                 'comment': comment
             })
             
-            # Check if battle is over
+            # Check if battle is over (reflected damage can also fell the attacker)
             if not defender.is_alive():
-                turn_result['battle_over'] = True
-                turn_result['winner'] = attacker.name
-                self.winner = attacker
-                
-                # Award XP
-                attacker.add_xp(defender.level * 50)
-                defender.add_xp(defender.level * 25)  # Consolation prize
-                
-                # Update wins/losses
-                attacker.wins += 1
-                defender.losses += 1
-                
+                self._finish(turn_result, attacker, defender)
+                break
+            if passive and not attacker.is_alive():
+                self._finish(turn_result, defender, attacker)
                 break
+
+        if passive and not turn_result['battle_over']:
+            round_messages = self._end_of_round()
+            if round_messages:
+                turn_result['round_effects'] = round_messages
         
         # Update states
         turn_result['agent1_state'] = self.agent1.to_dict()
@@ -101,6 +173,62 @@ class Battle:
         self.battle_log.append(turn_result)
         
         return turn_result
+
+    def _sides(self, side: int):
+        """Return (owner, opponent, owner hooks, opponent hooks, owner state, opponent state)"""
+        state1, state2 = self.ability_state
+        if side == 0:
+            return self.agent1, self.agent2, self.hooks1, self.hooks2, state1, state2
+        return self.agent2, self.agent1, self.hooks2, self.hooks1, state2, state1
+
+    def _stamina_costs(self, action1: Dict, action2: Dict):
+        """Apply stamina_cost hooks and stamp the round into the ability state"""
+        costs = []
+        for side, action in ((0, action1), (1, action2)):
+            owner, _, hooks, _, state, _ = self._sides(side)
+            state['round'] = self.current_round
+            cost = action['stamina_cost']
+            for hook in hooks.stamina_cost:
+                cost = hook(state, owner, action, cost)
+            costs.append(cost)
+        return costs
+
+    def _pre_damage(self, side: int, action: Dict, damage: int, messages: List[str]) -> int:
+        attacker, defender, attacker_hooks, defender_hooks, attacker_state, defender_state = self._sides(side)
+        for hook in attacker_hooks.pre_damage:
+            damage = hook(attacker_state, attacker, defender, action, damage, messages)
+        for hook in defender_hooks.pre_damage_taken:
+            damage = hook(defender_state, defender, attacker, action, damage, messages)
+        return damage
+
+    def _post_damage(self, side: int, action: Dict, damage: int, messages: List[str]):
+        attacker, defender, attacker_hooks, defender_hooks, attacker_state, defender_state = self._sides(side)
+        for hook in attacker_hooks.post_damage:
+            hook(attacker_state, attacker, defender, action, damage, messages)
+        for hook in defender_hooks.post_damage_taken:
+            hook(defender_state, defender, attacker, action, damage, messages)
+
+    def _end_of_round(self) -> List[str]:
+        messages: List[str] = []
+        for side in (0, 1):
+            owner, opponent, hooks, _, state, _ = self._sides(side)
+            for hook in hooks.end_of_round:
+                hook(state, owner, opponent, messages)
+        return messages
+
+    def _finish(self, turn_result: Dict, winner: Agent, loser: Agent):
+        """Record the winner and award XP"""
+        turn_result['battle_over'] = True
+        turn_result['winner'] = winner.name
+        self.winner = winner
+        
+        # Award XP
+        winner.add_xp(loser.level * 50)
+        loser.add_xp(loser.level * 25)  # Consolation prize
+        
+        # Update wins/losses
+        winner.wins += 1
+        loser.losses += 1
     
     def get_battle_summary(self) -> Dict:
         """Get summary of the battle"""
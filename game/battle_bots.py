@@ -23,7 +23,10 @@ BATTLE_BOTS = [
             "Meeting-Einladung: Verlangsamt Gegner für 2 Runden",
             "+20% XP Gain"
         ],
-        "special": "Spottet Gegner automatisch (Debuff Attack -2)"
+        "special": "Spottet Gegner automatisch (Debuff Attack -2)",
+        "passives": [
+            {"type": "taunt", "attack": -2}
+        ]
     },
     {
         "id": "effi",
@@ -44,7 +47,10 @@ BATTLE_BOTS = [
             "Quick Strike: Chance auf Doppel-Angriff (20%)",
             "Effizienz-Boost: +10% Schaden"
         ],
-        "special": "Alle Aktionen kosten 15% weniger Stamina"
+        "special": "Alle Aktionen kosten 15% weniger Stamina",
+        "passives": [
+            {"type": "stamina_discount", "percent": 15}
+        ]
     },
     {
         "id": "prophet",
@@ -65,7 +71,10 @@ BATTLE_BOTS = [
             "Vorhersage: Sieht Gegner-Aktion voraus (Dodge +15%)",
             "Trend-Analyse: +15% Schaden"
         ],
-        "special": "+20% Critical Hit Chance"
+        "special": "+20% Critical Hit Chance",
+        "passives": [
+            {"type": "critical_hit", "chance": 0.2, "multiplier": 1.5}
+        ]
     },
     {
         "id": "regulus",
@@ -86,7 +95,10 @@ BATTLE_BOTS = [
             "Bestrafung: +25% Schaden gegen Buff-Gegner",
             "Unbestechlich: Immun gegen Debuffs (50% Chance)"
         ],
-        "special": "Reflektiert 20% Schaden zurück"
+        "special": "Reflektiert 20% Schaden zurück",
+        "passives": [
+            {"type": "reflect_damage", "percent": 20}
+        ]
     },
     {
         "id": "resource",
@@ -107,7 +119,10 @@ BATTLE_BOTS = [
             "Gold-Panzer: +15% Defense",
             "Investition: Heilt 3 HP pro Runde"
         ],
-        "special": "Regeneriert 5 Stamina pro Runde"
+        "special": "Regeneriert 5 Stamina pro Runde",
+        "passives": [
+            {"type": "regenerate_stamina", "amount": 5}
+        ]
     },
     {
         "id": "insight",
@@ -128,7 +143,10 @@ BATTLE_BOTS = [
             "Daten-Mining: Sieht Gegner-Stats",
             "Präzisions-Schlag: Ignoriert 25% Defense"
         ],
-        "special": "Ignoriert 25% der Gegner-Defense"
+        "special": "Ignoriert 25% der Gegner-Defense",
+        "passives": [
+            {"type": "armor_piercing", "percent": 25}
+        ]
     },
     {
         "id": "sentinel",
@@ -149,7 +167,10 @@ BATTLE_BOTS = [
             "Gegen-Schlag: Kontert Angriffe (30% Chance)",
             "Unerschütterlich: +20% Defense"
         ],
-        "special": "Nimmt 25% weniger Schaden von allen Angriffen"
+        "special": "Nimmt 25% weniger Schaden von allen Angriffen",
+        "passives": [
+            {"type": "damage_reduction", "percent": 25}
+        ]
     },
     {
         "id": "eco",
@@ -170,7 +191,10 @@ BATTLE_BOTS = [
             "Natur-Kraft: +15% Schaden",
             "Recycling: Konvertiert Schaden zu Stamina (10%)"
         ],
-        "special": "Regeneriert 5 HP pro Runde"
+        "special": "Regeneriert 5 HP pro Runde",
+        "passives": [
+            {"type": "regenerate_hp", "amount": 5}
+        ]
     },
     {
         "id": "spark",
@@ -191,7 +215,10 @@ BATTLE_BOTS = [
             "Kritischer Funke: +25% Critical Hit Chance",
             "Glass Cannon: +20% Schaden, -10% Defense"
         ],
-        "special": "+40% Schaden alle 3 Runden (Burst)"
+        "special": "+40% Schaden alle 3 Runden (Burst)",
+        "passives": [
+            {"type": "burst", "every": 3, "percent": 40}
+        ]
     },
     {
         "id": "connect",
@@ -212,7 +239,8 @@ BATTLE_BOTS = [
             "Koordination: Reduziert Cooldowns um 1 Runde",
             "Moral-Boost: Heilt 10 HP bei Sieg"
         ],
-        "special": "Buffs halten 1 Runde länger"
+        "special": "Buffs halten 1 Runde länger",
+        "passives": []
     },
     {
         "id": "mentor",
@@ -233,7 +261,8 @@ BATTLE_BOTS = [
             "Lehrstunde: Debufft Gegner-Attack (-3)",
             "Erfahrung: +10% Stats pro Level"
         ],
-        "special": "+30% XP Gain nach jedem Kampf"
+        "special": "+30% XP Gain nach jedem Kampf",
+        "passives": []
     },
     {
         "id": "scholar",
@@ -254,7 +283,8 @@ BATTLE_BOTS = [
             "Analyse: +25% Schaden nach 3 Runden",
             "Wissen: Debuffs dauern 1 Runde länger"
         ],
-        "special": "Debuffs auf Gegner dauern 1 Runde länger"
+        "special": "Debuffs auf Gegner dauern 1 Runde länger",
+        "passives": []
     },
     {
         "id": "fisc",
@@ -275,7 +305,10 @@ BATTLE_BOTS = [
             "Steuer-Rückzahlung: Heilt 15% des verursachten Schadens",
             "Audit: Sieht alle Gegner-Buffs/Debuffs"
         ],
-        "special": "Heilt 15% des verursachten Schadens"
+        "special": "Heilt 15% des verursachten Schadens",
+        "passives": [
+            {"type": "lifesteal", "percent": 15}
+        ]
     },
     {
         "id": "aura",
@@ -296,7 +329,8 @@ BATTLE_BOTS = [
             "Angriffs-Aura: +15% Schaden",
             "Mystische Präsenz: Buffs sind 50% effektiver"
         ],
-        "special": "Alle Buffs sind 50% effektiver"
+        "special": "Alle Buffs sind 50% effektiver",
+        "passives": []
     },
     {
         "id": "flow",
@@ -317,7 +351,10 @@ BATTLE_BOTS = [
             "Wasser-Schlag: Ignoriert Panzerung",
             "Im Flow: +20% Stamina Regeneration"
         ],
-        "special": "+30% Dodge Chance"
+        "special": "+30% Dodge Chance",
+        "passives": [
+            {"type": "dodge", "chance": 0.3}
+        ]
     },
     {
         "id": "pulse",
@@ -338,7 +375,10 @@ BATTLE_BOTS = [
             "Beat Drop: Massive Schaden-Spitze (50% mehr)",
             "Takt-Gefühl: +15% Critical Hit Chance"
         ],
-        "special": "Schaden steigt mit jedem Treffer (+10%)"
+        "special": "Schaden steigt mit jedem Treffer (+10%)",
+        "passives": [
+            {"type": "combo", "percent": 10}
+        ]
     },
     {
         "id": "deal",
@@ -359,7 +399,10 @@ BATTLE_BOTS = [
             "Win-Win: Heilt beide Kämpfer (aber sich selbst mehr)",
             "Geschäftssinn: +25% XP Gain"
         ],
-        "special": "Reduziert Gegner-Schaden um 20%"
+        "special": "Reduziert Gegner-Schaden um 20%",
+        "passives": [
+            {"type": "damage_reduction", "percent": 20}
+        ]
     },
     {
         "id": "aegis",
@@ -380,7 +423,10 @@ BATTLE_BOTS = [
             "Schild-Schlag: Kontert mit Defense-Wert",
             "Unbreakable: +25% Defense"
         ],
-        "special": "50% Chance ersten Angriff zu blocken"
+        "special": "50% Chance ersten Angriff zu blocken",
+        "passives": [
+            {"type": "block_first", "chance": 0.5}
+        ]
     },
     {
         "id": "certify",
@@ -401,7 +447,10 @@ BATTLE_BOTS = [
             "Bug-Fix: Entfernt negative Debuffs",
             "Zertifizierung: +20% Schaden"
         ],
-        "special": "Angriffe haben garantierten Mindest-Schaden"
+        "special": "Angriffe haben garantierten Mindest-Schaden",
+        "passives": [
+            {"type": "minimum_damage"}
+        ]
     },
     {
         "id": "volt",
@@ -422,7 +471,10 @@ BATTLE_BOTS = [
             "Elektro-Schock: Betäubt Gegner (Skip Turn 20%)",
             "Überspannung: +30% Schaden bei voller Stamina"
         ],
-        "special": "Schaden steigt jede Runde (+5%)"
+        "special": "Schaden steigt jede Runde (+5%)",
+        "passives": [
+            {"type": "charge", "percent": 5}
+        ]
     },
     {
         "id": "genesis",
@@ -443,18 +495,33 @@ BATTLE_BOTS = [
             "Neustart: Heilt 20 HP alle 5 Runden",
             "Allmacht: Alle Stats +10%"
         ],
-        "special": "Generiert zufälligen Buff jede Runde"
+        "special": "Generiert zufälligen Buff jede Runde",
+        "passives": [
+            {"type": "random_buff", "amount": 1}
+        ]
     }
 ]
 
+# Id-indexed registry; BATTLE_BOTS keeps the display order
+_BOTS_BY_ID = {bot['id']: bot for bot in BATTLE_BOTS}
+
+
+def find_battle_bot(bot_id: str):
+    """Get bot by ID, or None if there is no such bot"""
+    return _BOTS_BY_ID.get(bot_id)
+
+
 def get_battle_bot(bot_id: str):
     """Get bot by ID"""
-    for bot in BATTLE_BOTS:
-        if bot['id'] == bot_id:
-            return bot
-    return BATTLE_BOTS[3]  # Default: Regulus
+    return _BOTS_BY_ID.get(bot_id) or _BOTS_BY_ID.get('regulus', BATTLE_BOTS[0])  # Default: Regulus
 
 
 def get_all_battle_bots():
     """Get all available bots"""
     return BATTLE_BOTS
+
+
+def _install(bots):
+    """Make another catalog version's bots current (see game.catalog.install_catalog)"""
+    global BATTLE_BOTS, _BOTS_BY_ID
+    BATTLE_BOTS, _BOTS_BY_ID = bots, {bot['id']: bot for bot in bots}
@@ -0,0 +1,329 @@
+"""
+Agent Battle Simulator - Catalogs
+Versioned action, bot and skin catalogs and the content-hashed bundle served to clients.
+
+The built-in catalog comes from the Python modules (actions, battle_bots,
+skins). A catalog can also be loaded from a JSON data file with the same
+shape as the bundle ({"actions": [...], "bots": [...], "skins": {...}}):
+
+    python -m game.catalog export -o catalog.json     # start from the built-in data
+    python -m game.catalog check catalog.json         # validate and print the version
+    python -m game.catalog bots [catalog.json]        # which bots Arena and BattleEnv accept
+
+A Catalog is immutable once built. Loading validates the data and builds every
+derived index, compiled passive and pre-serialized response first; only then
+is the new version made current with a single reference swap. Battles keep a
+reference to the catalog they started with, so a reload never changes the
+rules of a running battle.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from . import actions as _actions_module, battle_bots as _bots_module, skins as _skins_module
+from .abilities import compile_passives, seed_passive_hooks
+from .actions import EFFECT_RULES, ActionTable, get_all_actions
+from .battle_bots import get_all_battle_bots
+from .skins import _build_unlock_index, get_bot_skins
+
+logger = logging.getLogger(__name__)
+
+_STAT_BONUSES = ('hp_bonus', 'stamina_bonus', 'attack_bonus', 'defense_bonus')
+
+
+class CatalogBundle:
+    """Serialized catalog; the version is a hash of the JSON body."""
+
+    __slots__ = ('version', 'body', 'gzip_body')
+
+    def __init__(self, data: Dict):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.body = body
+        # mtime=0 keeps the compressed bytes identical across workers and restarts
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def build_catalog_data() -> Dict:
+    """Collect everything the client needs for a cold page load"""
+    bots = get_all_battle_bots()
+    return {
+        'bots': bots,
+        'skins': {bot['id']: get_bot_skins(bot['id']) for bot in bots},
+        'actions': get_all_actions(),
+    }
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_catalog_data(data: Dict) -> List[str]:
+    """Return a list of problems with catalog data (empty when it is usable)"""
+    if not isinstance(data, dict):
+        return ['catalog must be an object with actions, bots and skins']
+    errors = []
+
+    actions = data.get('actions')
+    if not isinstance(actions, list) or not actions:
+        errors.append('actions must be a non-empty list')
+        actions = []
+    action_ids = set()
+    for index, action in enumerate(actions):
+        where = f'actions[{index}]'
+        if not isinstance(action, dict):
+            errors.append(f'{where} must be an object')
+            continue
+        if not _is_int(action.get('id')) or action['id'] in action_ids:
+            errors.append(f'{where}.id must be a unique integer')
+        else:
+            action_ids.add(action['id'])
+        for key in ('name', 'description'):
+            if not isinstance(action.get(key), str):
+                errors.append(f'{where}.{key} must be a string')
+        if not _is_int(action.get('stamina_cost')) or action['stamina_cost'] < 0:
+            errors.append(f'{where}.stamina_cost must be a non-negative integer')
+        damage_range = action.get('damage_range')
+        if (not isinstance(damage_range, (list, tuple)) or len(damage_range) != 2
+                or not all(_is_int(value) for value in damage_range) or not 0 <= damage_range[0] <= damage_range[1]):
+            errors.append(f'{where}.damage_range must be [low, high] with 0 <= low <= high')
+        effects = action.get('effects')
+        if not isinstance(effects, list) or any(effect not in EFFECT_RULES for effect in effects):
+            errors.append(f'{where}.effects must be a list of {", ".join(EFFECT_RULES)}')
+        comments = action.get('comments')
+        if not isinstance(comments, list) or not comments or not all(isinstance(c, str) for c in comments):
+            errors.append(f'{where}.comments must be a non-empty list of strings')
+
+    bots = data.get('bots')
+    if not isinstance(bots, list) or not bots:
+        errors.append('bots must be a non-empty list')
+        bots = []
+    bot_ids = set()
+    for index, bot in enumerate(bots):
+        where = f'bots[{index}]'
+        if not isinstance(bot, dict):
+            errors.append(f'{where} must be an object')
+            continue
+        if not isinstance(bot.get('id'), str) or bot['id'] in bot_ids:
+            errors.append(f'{where}.id must be a unique string')
+        else:
+            bot_ids.add(bot['id'])
+        if not isinstance(bot.get('name'), str):
+            errors.append(f'{where}.name must be a string')
+        stats = bot.get('stats', {})
+        if not isinstance(stats, dict) or not all(_is_int(stats.get(key, 0)) for key in _STAT_BONUSES):
+            errors.append(f'{where}.stats bonuses must be integers')
+        try:
+            compile_passives(bot.get('passives', []))
+        except (ValueError, TypeError, KeyError) as error:
+            errors.append(f'{where}.passives: {error}')
+
+    skins = data.get('skins')
+    if not isinstance(skins, dict):
+        errors.append('skins must be an object of bot id -> list of skins')
+        skins = {}
+    for bot_id in bot_ids - set(skins):
+        errors.append(f'skins has no entry for bot {bot_id!r}')
+    for bot_id, items in skins.items():
+        where = f'skins[{bot_id!r}]'
+        if bot_id not in bot_ids:
+            errors.append(f'{where} is not a known bot')
+        if not isinstance(items, list) or not items:
+            errors.append(f'{where} must be a non-empty list')
+            continue
+        for skin in items:
+            if not isinstance(skin, dict) or not _is_int(skin.get('id')) or not _is_int(skin.get('unlock_level')):
+                errors.append(f'{where} entries need integer id and unlock_level')
+                break
+    return errors
+
+
+class Catalog:
+    """One immutable catalog version with its derived indexes and serialized responses."""
+
+    def __init__(self, data: Dict, source: str = 'builtin'):
+        errors = validate_catalog_data(data)
+        if errors:
+            raise ValueError('Invalid catalog: ' + '; '.join(errors))
+        self.actions: List[Dict] = data['actions']
+        self.bots: List[Dict] = data['bots']
+        self.skins: Dict[str, List[Dict]] = data['skins']
+        self.source = source
+        self.loaded_at = time.time()
+
+        self.actions_by_id = {action['id']: action for action in self.actions}
+        self.action_table = ActionTable(self.actions)
+        self.bots_by_id = {bot['id']: bot for bot in self.bots}
+        self.unlock_index = {bot_id: _build_unlock_index(items) for bot_id, items in self.skins.items()}
+        self.passive_hooks = {bot['id']: (bot, compile_passives(bot.get('passives', []))) for bot in self.bots}
+        # Bots that game.arena and game.env accept: those engines do not run passive abilities
+        self.passive_free_bots = tuple(bot['id'] for bot in self.bots if not bot.get('passives'))
+        self.bundle = CatalogBundle(data)
+        self.version = self.bundle.version
+        self.actions_json = _serialize(self.actions)
+        self.bots_json = _serialize(self.bots)
+        self.actions_gzip = gzip.compress(self.actions_json, compresslevel=9, mtime=0)
+        self.bots_gzip = gzip.compress(self.bots_json, compresslevel=9, mtime=0)
+
+    def get_action(self, action_id: int) -> Dict:
+        """Action by ID (the first action for unknown IDs, like actions.get_action)"""
+        try:
+            action = self.actions_by_id.get(action_id)
+        except TypeError:
+            # Unhashable ids from request bodies (lists, objects) are unknown too
+            action = None
+        return (action if action is not None else self.actions[0]).copy()
+
+    def find_bot(self, bot_id: str) -> Optional[Dict]:
+        return self.bots_by_id.get(bot_id)
+
+    def to_dict(self) -> Dict:
+        return {'version': self.version, 'source': self.source, 'loaded_at': self.loaded_at,
+                'actions': len(self.actions), 'bots': len(self.bots), 'passive_free_bots': list(self.passive_free_bots)}
+
+
+def _serialize(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def load_catalog_file(path: str) -> Catalog:
+    """Read, validate and build a catalog from a JSON file (raises ValueError when invalid)"""
+    with open(path, encoding='utf-8') as handle:
+        try:
+            data = json.load(handle)
+        except json.JSONDecodeError as error:
+            raise ValueError(f'Invalid catalog: {error}') from None
+    return Catalog(data, source=os.path.abspath(path))
+
+
+_current: Optional[Catalog] = None
+_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """The current catalog: CATALOG_PATH when set, otherwise the built-in data"""
+    if _current is None:
+        with _lock:
+            if _current is None:
+                path = os.environ.get('CATALOG_PATH')
+                _swap(load_catalog_file(path) if path else Catalog(build_catalog_data()))
+    return _current
+
+
+def install_catalog(catalog: Catalog) -> Optional[Catalog]:
+    """Make a fully built catalog current; returns the previous one"""
+    with _lock:
+        return _swap(catalog)
+
+
+def _swap(catalog: Catalog) -> Optional[Catalog]:
+    """install_catalog's body; the caller holds _lock so concurrent installs cannot interleave"""
+    global _current
+    previous = _current
+    seed_passive_hooks(catalog.passive_hooks)
+    _actions_module._install(catalog.actions)
+    _bots_module._install(catalog.bots)
+    _skins_module._install(catalog.skins, catalog.unlock_index)
+    _current = catalog
+    return previous
+
+
+def get_catalog_bundle() -> CatalogBundle:
+    """Return the current catalog bundle, building the catalog on first use"""
+    return get_catalog().bundle
+
+
+class CatalogWatcher:
+    """Reloads the catalog when its file changes; invalid files are logged and ignored."""
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._mtime = self._stat()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def start(self) -> None:
+        """Start polling in this process (threads do not survive fork)."""
+        if self._owner_pid == os.getpid():
+            return
+        self._owner_pid = os.getpid()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def check(self) -> Optional[Catalog]:
+        """Reload if the file changed since the last check; returns the new catalog if swapped"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            catalog = load_catalog_file(self.path)
+        except (OSError, ValueError) as error:
+            logger.error("Keeping catalog %s, %s is unusable: %s", get_catalog().version, self.path, error)
+            return None
+        if catalog.version != get_catalog().version:
+            install_catalog(catalog)
+            logger.info("Catalog %s loaded from %s", catalog.version, self.path)
+            return catalog
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m game.catalog', description="Export or check catalog files")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Write the built-in catalog as JSON")
+    export.add_argument('-o', '--output', required=True)
+    check = commands.add_parser('check', help="Validate a catalog file and print its version")
+    check.add_argument('path')
+    bots = commands.add_parser('bots', help="List bots by engine support (Arena and BattleEnv skip passives)")
+    bots.add_argument('path', nargs='?', help="Catalog file (default: the built-in data)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(build_catalog_data(), handle, ensure_ascii=False, indent=2)
+            handle.write('\n')
+        return 0
+
+    try:
+        catalog = load_catalog_file(args.path) if args.path else Catalog(build_catalog_data())
+    except (OSError, ValueError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    if args.command == 'bots':
+        print(json.dumps({
+            'all_engines': list(catalog.passive_free_bots),
+            'battle_only': {bot['id']: [spec['type'] for spec in bot['passives']]
+                            for bot in catalog.bots if bot.get('passives')},
+        }, indent=2))
+        return 0
+    print(json.dumps(catalog.to_dict()))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,225 @@
+"""
+Agent Battle Simulator - Vectorized Battle Environment
+Steps N independent battles per call on numpy arrays, for training AI policies.
+
+Requires numpy (see requirements-train.txt).
+
+Rules follow Battle.execute_turn: both sides pay stamina, a coin flip decides
+who acts first, damage is randint(range) + attack // 5 - defense // 10,
+reduced by defense // 2 on impact, and buffs/debuffs stack for the rest of
+the battle. Passive abilities are not modeled, so bots that have them are
+rejected: the env only covers the catalog's passive_free_bots (python -m
+game.catalog bots lists them); Battle is the engine for the full roster.
+
+    env = BattleEnv(['connect'] * 1024, ['mentor'] * 1024, seed=1)
+    obs = env.reset()
+    obs, rewards, dones = env.step(actions)   # actions: int array (N, 2) of action ids
+"""
+
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .actions import EFFECT_NAMES, EFFECT_RULES
+from .agents import Agent
+from .catalog import Catalog, get_catalog
+
+# Per-side observation columns
+OBS_FIELDS = ('hp', 'max_hp', 'stamina', 'max_stamina', 'attack', 'defense') + \
+    tuple(f'effect_{name}' for name in EFFECT_NAMES) + ('round',)
+
+
+def _action_tables(actions: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """Per-action lookup arrays indexed by action id"""
+    size = max(action['id'] for action in actions) + 1
+    tables = {name: np.zeros(size, dtype=np.int32) for name in
+              ('cost', 'low', 'span', 'def_attack', 'def_defense', 'att_attack', 'att_defense', 'heal')}
+    tables['valid'] = np.zeros(size, dtype=bool)
+    tables['def_effects'] = np.zeros((size, len(EFFECT_NAMES)), dtype=np.int16)
+    tables['att_effects'] = np.zeros((size, len(EFFECT_NAMES)), dtype=np.int16)
+
+    for action in actions:
+        action_id = action['id']
+        low, high = action['damage_range']
+        tables['valid'][action_id] = True
+        tables['cost'][action_id] = action['stamina_cost']
+        tables['low'][action_id] = low
+        tables['span'][action_id] = high - low + 1
+        for effect in action['effects']:
+            target, attack, defense, heal, name = EFFECT_RULES[effect]
+            prefix = 'def' if target == 'defender' else 'att'
+            tables[f'{prefix}_attack'][action_id] += attack
+            tables[f'{prefix}_defense'][action_id] += defense
+            tables['heal'][action_id] += heal
+            if name is not None:
+                tables[f'{prefix}_effects'][action_id, EFFECT_NAMES.index(name)] += 1
+    return tables
+
+
+def _bot_stats(bot_ids: Sequence[str], level: int, catalog: Catalog) -> np.ndarray:
+    """(N, 4) array of max_hp, max_stamina, attack, defense taken from Agent"""
+    by_bot = {}
+    for bot_id in set(bot_ids):
+        bot = catalog.find_bot(bot_id)
+        if bot is None:
+            raise ValueError(f"Unknown bot: {bot_id!r}")
+        if bot.get('passives'):
+            raise ValueError(f"Bot {bot_id!r} has passive abilities, which BattleEnv does not model "
+                             f"(use one of {', '.join(catalog.passive_free_bots)})")
+        agent = Agent(bot['name'], agent_type=bot_id, level=level, agent_type_data=bot)
+        by_bot[bot_id] = (agent.max_hp, agent.max_stamina, agent.attack, agent.defense)
+    return np.array([by_bot[bot_id] for bot_id in bot_ids], dtype=np.int32)
+
+
+class BattleEnv:
+    """N battles stepped in lockstep; finished battles reset automatically."""
+
+    def __init__(self, bots1: Union[str, Sequence[str]], bots2: Union[str, Sequence[str]],
+                 num_envs: Optional[int] = None, level: int = 1, max_rounds: int = 100,
+                 seed: Optional[int] = None, catalog: Optional[Catalog] = None):
+        if isinstance(bots1, str) or isinstance(bots2, str):
+            if num_envs is None:
+                raise ValueError("num_envs is required when a single bot id is given")
+        num_envs = num_envs or len(bots1)
+        bots1 = [bots1] * num_envs if isinstance(bots1, str) else list(bots1)
+        bots2 = [bots2] * num_envs if isinstance(bots2, str) else list(bots2)
+        if len(bots1) != num_envs or len(bots2) != num_envs:
+            raise ValueError("bots1 and bots2 must both have num_envs entries")
+
+        self.num_envs = num_envs
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+        # Bots and actions of the catalog current at creation, like Battle
+        catalog = catalog or get_catalog()
+        self.tables = _action_tables(catalog.actions)
+
+        # Side-major state: index [side, env]
+        stats = np.stack([_bot_stats(bots1, level, catalog), _bot_stats(bots2, level, catalog)])
+        self.max_hp = np.ascontiguousarray(stats[:, :, 0])
+        self.max_stamina = np.ascontiguousarray(stats[:, :, 1])
+        self.base_attack = np.ascontiguousarray(stats[:, :, 2])
+        self.base_defense = np.ascontiguousarray(stats[:, :, 3])
+        self.hp = self.max_hp.copy()
+        self.stamina = self.max_stamina.copy()
+        self.attack_mod = np.zeros((2, num_envs), dtype=np.int32)
+        self.defense_mod = np.zeros((2, num_envs), dtype=np.int32)
+        self.effects = np.zeros((2, num_envs, len(EFFECT_NAMES)), dtype=np.int16)
+        self.round = np.zeros(num_envs, dtype=np.int32)
+
+        # Output buffers, reused every step
+        self.obs = np.zeros((num_envs, 2, len(OBS_FIELDS)), dtype=np.float32)
+        self.final_obs = np.zeros_like(self.obs)
+        self.rewards = np.zeros((num_envs, 2), dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.winners = np.full(num_envs, -1, dtype=np.int8)
+
+        # Scratch buffers
+        self._index = np.arange(num_envs)
+        self._uniform = np.empty(num_envs, dtype=np.float64)
+        self._can_use = np.zeros((2, num_envs), dtype=bool)
+
+    def reset(self) -> np.ndarray:
+        """Reset every battle and return the observation buffer"""
+        self._reset_where(np.ones(self.num_envs, dtype=bool))
+        return self._observe(self.obs)
+
+    def _reset_where(self, mask: np.ndarray) -> None:
+        np.copyto(self.hp, self.max_hp, where=mask)
+        np.copyto(self.stamina, self.max_stamina, where=mask)
+        self.attack_mod[:, mask] = 0
+        self.defense_mod[:, mask] = 0
+        self.effects[:, mask] = 0
+        self.round[mask] = 0
+
+    def effective_attack(self) -> np.ndarray:
+        return np.maximum(1, self.base_attack + self.attack_mod)
+
+    def effective_defense(self) -> np.ndarray:
+        return np.maximum(1, self.base_defense + self.defense_mod)
+
+    def _observe(self, out: np.ndarray) -> np.ndarray:
+        out[:, :, 0] = self.hp.T
+        out[:, :, 1] = self.max_hp.T
+        out[:, :, 2] = self.stamina.T
+        out[:, :, 3] = self.max_stamina.T
+        out[:, :, 4] = self.effective_attack().T
+        out[:, :, 5] = self.effective_defense().T
+        out[:, :, 6:6 + len(EFFECT_NAMES)] = self.effects.transpose(1, 0, 2)
+        out[:, :, -1] = self.round[:, None]
+        return out
+
+    def action_mask(self) -> np.ndarray:
+        """(N, 2, max_action_id + 1) bool: actions each side can currently pay for"""
+        tables = self.tables
+        return tables['valid'] & (self.stamina.T[:, :, None] >= tables['cost'])
+
+    def random_actions(self) -> np.ndarray:
+        """Uniformly random affordable actions (cheapest action when none is affordable)"""
+        mask = self.action_mask()
+        cheapest = int(np.flatnonzero(self.tables['valid'])[np.argmin(self.tables['cost'][self.tables['valid']])])
+        scores = self.rng.random(mask.shape) * mask
+        actions = scores.argmax(axis=2)
+        return np.where(mask.any(axis=2), actions, cheapest)
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Play one round in every battle.
+
+        actions is an int array (N, 2) of action ids for side 0 and side 1.
+        Returns (obs, rewards, dones). Rewards are +1/-1 for winner/loser and
+        0 otherwise (including draws at max_rounds). Finished battles are reset
+        and their last observation is kept in final_obs. The returned arrays
+        are buffers owned by the env and are overwritten by the next step.
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs, 2):
+            raise ValueError(f"actions must have shape ({self.num_envs}, 2)")
+        tables = self.tables
+        if actions.min() < 0 or actions.max() >= len(tables['valid']) or not tables['valid'][actions].all():
+            raise ValueError("Unknown action id")
+        actions = actions.T
+        index = self._index
+
+        self.round += 1
+        cost = tables['cost'][actions]
+        np.greater_equal(self.stamina, cost, out=self._can_use)
+        self.stamina -= cost * self._can_use
+
+        self.winners.fill(-1)
+        first = (self.rng.random(self.num_envs) < 0.5).astype(np.int8)
+        for phase in (0, 1):
+            attacker = first if phase == 0 else 1 - first
+            defender = 1 - attacker
+            action = actions[attacker, index]
+            active = self._can_use[attacker, index] & (self.winners < 0)
+
+            attack = np.maximum(1, self.base_attack[attacker, index] + self.attack_mod[attacker, index])
+            defense = np.maximum(1, self.base_defense[defender, index] + self.defense_mod[defender, index])
+            self.rng.random(out=self._uniform)
+            base = tables['low'][action] + (self._uniform * tables['span'][action]).astype(np.int32)
+            damage = np.maximum(1, base + attack // 5 - defense // 10)
+            damage = np.maximum(1, damage - defense // 2) * active
+            self.hp[defender, index] = np.maximum(0, self.hp[defender, index] - damage)
+
+            # Effects
+            self.attack_mod[defender, index] += tables['def_attack'][action] * active
+            self.defense_mod[defender, index] += tables['def_defense'][action] * active
+            self.attack_mod[attacker, index] += tables['att_attack'][action] * active
+            self.defense_mod[attacker, index] += tables['att_defense'][action] * active
+            self.effects[defender, index] += tables['def_effects'][action] * active[:, None]
+            self.effects[attacker, index] += tables['att_effects'][action] * active[:, None]
+            healed = self.hp[attacker, index] + tables['heal'][action] * active
+            self.hp[attacker, index] = np.minimum(self.max_hp[attacker, index], healed)
+
+            killed = active & (self.hp[defender, index] == 0)
+            self.winners[killed] = attacker[killed]
+
+        won = self.winners >= 0
+        np.logical_or(won, self.round >= self.max_rounds, out=self.dones)
+        self.rewards.fill(0)
+        self.rewards[won, self.winners[won]] = 1
+        self.rewards[won, 1 - self.winners[won]] = -1
+
+        if self.dones.any():
+            self._observe(self.final_obs)
+            self._reset_where(self.dones)
+        return self._observe(self.obs), self.rewards, self.dones
@@ -0,0 +1,88 @@
+"""
+Agent Battle Simulator - Memory Footprint
+Estimates how many bytes agents and battles hold, excluding static catalog data
+"""
+
+import sys
+from typing import Iterable, Optional, Set
+
+from . import actions as _actions_module, battle_bots as _bots_module, skins as _skins_module
+from .catalog import Catalog, get_catalog
+
+_shared_ids: Optional[Set[int]] = None
+_shared_version: Optional[str] = None
+
+
+def _static_ids() -> Set[int]:
+    """Ids of objects reachable from the built-in and current catalogs (shared by all battles)."""
+    global _shared_ids, _shared_version
+    catalog = get_catalog()
+    if _shared_ids is None or _shared_version != catalog.version:
+        ids: Set[int] = set()
+        # Module globals are read here, not at import: install_catalog rebinds them
+        stack = [_actions_module.ACTIONS, _bots_module.BATTLE_BOTS, _skins_module.BOT_SKINS,
+                 catalog.actions, catalog.bots, catalog.skins]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in ids:
+                continue
+            ids.add(id(obj))
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+        _shared_ids, _shared_version = ids, catalog.version
+    return _shared_ids
+
+
+def deep_sizeof(obj, seen: Optional[Set[int]] = None) -> int:
+    """Return the bytes held by obj and everything it references.
+
+    Objects already in `seen`, Catalog instances and objects belonging to the
+    action, bot and skin catalogs are not counted, so sharing is never billed twice.
+    """
+    seen = set() if seen is None else seen
+    shared = _static_ids()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        obj_id = id(current)
+        if obj_id in seen or obj_id in shared or isinstance(current, Catalog):
+            continue
+        seen.add(obj_id)
+        total += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, int, float, bool)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            attrs = getattr(current, '__dict__', None)
+            if attrs is not None:
+                stack.append(attrs)
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, '__slots__', ()):
+                    if hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return total
+
+
+def estimate_agent_bytes(agent, seen: Optional[Set[int]] = None) -> int:
+    """Estimate the bytes owned by a single agent."""
+    return deep_sizeof(agent, seen)
+
+
+def estimate_battle_bytes(battle, seen: Optional[Set[int]] = None) -> int:
+    """Estimate the bytes owned by a battle, including both agents and its log."""
+    return deep_sizeof(battle, seen)
+
+
+def estimate_total_bytes(battles: Iterable) -> int:
+    """Estimate the combined bytes of several battles, counting shared objects once."""
+    seen: Set[int] = set()
+    return sum(estimate_battle_bytes(battle, seen) for battle in battles)
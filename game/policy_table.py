@@ -0,0 +1,359 @@
+"""
+Agent Battle Simulator - Compiled Policy Tables
+Offline-compiled AI policies served by constant-time lookups from an mmap'd file.
+
+Usage:
+    python -m game.policy_table compile -o policy.bin                       # from select_ai_action
+    python -m game.policy_table compile --strategy mymod:choose -o policy.bin
+    python -m game.policy_table compile --from-sim 20000 -o policy.bin       # from battle outcomes
+    python -m game.policy_table info policy.bin
+
+The state space is discretized into: own bot, own hp bucket (share of max
+hp), own stamina bucket (absolute), opponent hp bucket and a few effect flags.
+Each cell holds one action id (0 = no entry; callers fall back to the
+heuristic). Stamina buckets are evaluated at their lower bound, so a stored
+action is always affordable for any stamina inside the bucket.
+
+File layout: 8-byte magic, u32 header length, JSON header, zero padding up to
+a 64-byte boundary, then one uint8 per cell in row-major order
+(bot, hp, stamina, opponent hp, flags). The server maps the file read-only, so
+all gunicorn workers share the same page-cache pages.
+"""
+
+import argparse
+import importlib
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .actions import get_all_actions
+from .agents import Agent
+from .battle import Battle
+from .battle_bots import find_battle_bot, get_all_battle_bots
+from .catalog import Catalog, get_catalog
+
+MAGIC = b'ABPTBL01'
+_HEADER_PREFIX = struct.Struct('<8sI')
+_ALIGN = 64
+
+# (whose effects, effect name) -> one bit each, in this order
+FLAG_EFFECTS: Tuple[Tuple[str, str], ...] = (
+    ('self', 'Klebrig'),
+    ('self', 'Fokussiert'),
+    ('opponent', 'Brennend'),
+    ('opponent', 'Geschwächt'),
+)
+
+DEFAULT_LAYOUT = {
+    'hp_buckets': 10,
+    'stamina_buckets': 20,
+    'stamina_step': 10,
+    'opponent_hp_buckets': 10,
+}
+
+Strategy = Callable[[Agent, Agent, random.Random], Dict]
+
+
+class TableLayout:
+    """Maps agent states to cell indexes."""
+
+    def __init__(self, bots: List[str], hp_buckets: int, stamina_buckets: int, stamina_step: int,
+                 opponent_hp_buckets: int, flags: Tuple[Tuple[str, str], ...] = FLAG_EFFECTS):
+        self.bots = list(bots)
+        self.bot_index = {bot_id: index for index, bot_id in enumerate(self.bots)}
+        self.hp_buckets = hp_buckets
+        self.stamina_buckets = stamina_buckets
+        self.stamina_step = stamina_step
+        self.opponent_hp_buckets = opponent_hp_buckets
+        self.flags = tuple(tuple(flag) for flag in flags)
+        self.flag_combos = 1 << len(self.flags)
+        self.size = (len(self.bots) * hp_buckets * stamina_buckets * opponent_hp_buckets
+                     * self.flag_combos)
+
+    @classmethod
+    def default(cls) -> "TableLayout":
+        return cls([bot['id'] for bot in get_all_battle_bots()], **DEFAULT_LAYOUT)
+
+    def to_header(self) -> Dict:
+        return {
+            'bots': self.bots,
+            'hp_buckets': self.hp_buckets,
+            'stamina_buckets': self.stamina_buckets,
+            'stamina_step': self.stamina_step,
+            'opponent_hp_buckets': self.opponent_hp_buckets,
+            'flags': [list(flag) for flag in self.flags],
+        }
+
+    @classmethod
+    def from_header(cls, header: Dict) -> "TableLayout":
+        return cls(header['bots'], header['hp_buckets'], header['stamina_buckets'],
+                   header['stamina_step'], header['opponent_hp_buckets'],
+                   tuple(tuple(flag) for flag in header['flags']))
+
+    def cell(self, bot: int, hp: int, stamina: int, opponent_hp: int, flags: int) -> int:
+        index = bot * self.hp_buckets + hp
+        index = index * self.stamina_buckets + stamina
+        index = index * self.opponent_hp_buckets + opponent_hp
+        return index * self.flag_combos + flags
+
+    def flags_of(self, agent: Agent, opponent: Agent) -> int:
+        bits = 0
+        for bit, (side, name) in enumerate(self.flags):
+            target = agent if side == 'self' else opponent
+            if any(effect.get('name') == name for effect in target.buffs + target.debuffs):
+                bits |= 1 << bit
+        return bits
+
+    def index_of(self, agent: Agent, opponent: Agent) -> Optional[int]:
+        """Cell index for an agent facing an opponent (None for bots not in the table)"""
+        bot = self.bot_index.get(agent.agent_type)
+        if bot is None:
+            return None
+        hp = min(self.hp_buckets - 1, agent.hp * self.hp_buckets // max(1, agent.max_hp))
+        stamina = min(self.stamina_buckets - 1, agent.stamina // self.stamina_step)
+        opponent_hp = min(self.opponent_hp_buckets - 1,
+                          opponent.hp * self.opponent_hp_buckets // max(1, opponent.max_hp))
+        return self.cell(bot, hp, stamina, opponent_hp, self.flags_of(agent, opponent))
+
+
+class PolicyTable:
+    """Read-only, memory-mapped policy table."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_length = _HEADER_PREFIX.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a policy table")
+            header_end = _HEADER_PREFIX.size + header_length
+            self.header = json.loads(self._mmap[_HEADER_PREFIX.size:header_end].decode('utf-8'))
+            self.layout = TableLayout.from_header(self.header)
+            self._offset = _aligned(header_end)
+            if len(self._mmap) != self._offset + self.layout.size:
+                raise ValueError(f"{path} is truncated or has the wrong size")
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def lookup(self, agent: Agent, opponent: Agent) -> int:
+        """Action id stored for this state (0 when the table has no entry)"""
+        index = self.layout.index_of(agent, opponent)
+        if index is None:
+            return 0
+        return self._mmap[self._offset + index]
+
+    def select(self, agent: Agent, opponent: Agent, catalog: Optional[Catalog] = None) -> Optional[Dict]:
+        """Action to play, or None when the caller should fall back to the heuristic.
+
+        Pass the battle's catalog: stored ids that are not among its actions
+        (e.g. after a catalog reload) fall back too.
+        """
+        catalog = catalog or get_catalog()
+        action_id = self.lookup(agent, opponent)
+        if action_id not in catalog.actions_by_id:
+            return None
+        action = catalog.get_action(action_id)
+        if action['stamina_cost'] > agent.stamina:
+            return None
+        return action
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_table(path: str, layout: TableLayout, cells: bytearray, meta: Optional[Dict] = None) -> None:
+    """Write a table file atomically"""
+    if len(cells) != layout.size:
+        raise ValueError(f"Expected {layout.size} cells, got {len(cells)}")
+    header = dict(layout.to_header(), **(meta or {}))
+    header_bytes = json.dumps(header, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    header_end = _HEADER_PREFIX.size + len(header_bytes)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as handle:
+        handle.write(_HEADER_PREFIX.pack(MAGIC, len(header_bytes)))
+        handle.write(header_bytes)
+        handle.write(b'\0' * (_aligned(header_end) - header_end))
+        handle.write(cells)
+    os.replace(tmp_path, path)
+
+
+_tables: Dict[str, PolicyTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_policy_table(path: str) -> PolicyTable:
+    """Return the process-wide table for a path, mapping it on first use"""
+    table = _tables.get(path)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(path)
+            if table is None:
+                table = _tables[path] = PolicyTable(path)
+    return table
+
+
+# Compilation
+
+
+def _representative(layout: TableLayout, bot_id: str, hp: int, stamina: int, opponent_hp: int,
+                    flags: int, opponent_bot: Dict) -> Optional[Tuple[Agent, Agent]]:
+    """Agents in the middle of a cell (stamina at its lower bound); None if unreachable"""
+    bot = find_battle_bot(bot_id)
+    agent = Agent(bot['name'], agent_type=bot_id, agent_type_data=bot)
+    stamina_value = stamina * layout.stamina_step
+    if stamina_value > agent.max_stamina:
+        return None
+    opponent = Agent(opponent_bot['name'], agent_type=opponent_bot['id'], agent_type_data=opponent_bot)
+    agent.hp = max(1, (2 * hp + 1) * agent.max_hp // (2 * layout.hp_buckets))
+    agent.stamina = stamina_value
+    opponent.hp = max(1, (2 * opponent_hp + 1) * opponent.max_hp // (2 * layout.opponent_hp_buckets))
+    for bit, (side, name) in enumerate(layout.flags):
+        if flags & (1 << bit):
+            target = agent if side == 'self' else opponent
+            # Stat deltas do not matter for the flag; only the name is checked
+            if name == 'Fokussiert':
+                target.add_buff({'name': name, 'duration': 2})
+            else:
+                target.add_debuff({'name': name, 'duration': 2})
+    return agent, opponent
+
+
+def compile_from_strategy(strategy: Strategy, layout: Optional[TableLayout] = None, samples: int = 5,
+                          seed: int = 0, opponent_id: str = 'regulus') -> Tuple[TableLayout, bytearray]:
+    """Store the most frequent choice of a strategy(agent, opponent, rng) in every cell"""
+    layout = layout or TableLayout.default()
+    opponent_bot = find_battle_bot(opponent_id)
+    cells = bytearray(layout.size)
+    rng = random.Random(seed)
+    for bot, bot_id in enumerate(layout.bots):
+        for hp in range(layout.hp_buckets):
+            for stamina in range(layout.stamina_buckets):
+                for opponent_hp in range(layout.opponent_hp_buckets):
+                    for flags in range(layout.flag_combos):
+                        agents = _representative(layout, bot_id, hp, stamina, opponent_hp, flags, opponent_bot)
+                        if agents is None:
+                            continue
+                        votes = Counter(strategy(*agents, rng)['id'] for _ in range(samples))
+                        cells[layout.cell(bot, hp, stamina, opponent_hp, flags)] = votes.most_common(1)[0][0]
+    return layout, cells
+
+
+def compile_from_simulation(battles: int, layout: Optional[TableLayout] = None, seed: int = 0,
+                            behaviour: Optional[Strategy] = None, explore: float = 0.2,
+                            min_samples: int = 5, max_rounds: int = 100) -> Tuple[TableLayout, bytearray]:
+    """Pick, per cell, the action with the best observed win rate in simulated battles.
+
+    Battles are played between random bot pairs with the behaviour strategy
+    (select_ai_action by default), taking a random affordable action with
+    probability `explore`. Cells with fewer than min_samples observations
+    for every action stay empty.
+    """
+    from .ai import select_ai_action
+
+    layout = layout or TableLayout.default()
+    behaviour = behaviour or select_ai_action
+    rng = random.Random(seed)
+    actions = get_all_actions()
+    bots = [find_battle_bot(bot_id) for bot_id in layout.bots]
+    # cell -> action id -> [wins, plays]
+    stats: Dict[int, Dict[int, List[int]]] = {}
+
+    for _ in range(battles):
+        bot1, bot2 = rng.choice(bots), rng.choice(bots)
+        agent1 = Agent(bot1['name'], agent_type=bot1['id'], agent_type_data=bot1)
+        agent2 = Agent(bot2['name'], agent_type=bot2['id'], agent_type_data=bot2)
+        battle = Battle(agent1, agent2, rng=rng)
+        decisions: Tuple[List, List] = ([], [])
+        while battle.winner is None and battle.current_round < max_rounds:
+            chosen = []
+            for side, (agent, opponent) in enumerate(((agent1, agent2), (agent2, agent1))):
+                affordable = [action for action in actions if action['stamina_cost'] <= agent.stamina]
+                if affordable and rng.random() < explore:
+                    action = rng.choice(affordable)
+                else:
+                    action = behaviour(agent, opponent, rng)
+                index = layout.index_of(agent, opponent)
+                if index is not None and action['stamina_cost'] <= agent.stamina:
+                    decisions[side].append((index, action['id']))
+                chosen.append(action['id'])
+            battle.execute_turn(*chosen)
+
+        for side, agent in enumerate((agent1, agent2)):
+            won = 1 if battle.winner is agent else 0
+            for index, action_id in decisions[side]:
+                record = stats.setdefault(index, {}).setdefault(action_id, [0, 0])
+                record[0] += won
+                record[1] += 1
+
+    cells = bytearray(layout.size)
+    for index, by_action in stats.items():
+        scored = [((wins + 1) / (plays + 2), action_id)
+                  for action_id, (wins, plays) in by_action.items() if plays >= min_samples]
+        if scored:
+            cells[index] = max(scored)[1]
+    return layout, cells
+
+
+def _load_strategy(spec: str) -> Strategy:
+    module_name, _, attribute = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attribute or 'select_ai_action')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m game.policy_table', description="Compile AI policy tables")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('compile', help="Compile a table")
+    build.add_argument('-o', '--output', required=True)
+    build.add_argument('--strategy', default='game.ai:select_ai_action',
+                       help="module:function with the select_ai_action(agent, opponent, rng) signature")
+    build.add_argument('--samples', type=int, default=5, help="Strategy calls per cell (majority vote)")
+    build.add_argument('--from-sim', type=int, metavar='BATTLES',
+                       help="Compile from the outcomes of this many simulated battles instead")
+    build.add_argument('--explore', type=float, default=0.2)
+    build.add_argument('--min-samples', type=int, default=5)
+    build.add_argument('--seed', type=int, default=0)
+    for field, value in DEFAULT_LAYOUT.items():
+        build.add_argument('--' + field.replace('_', '-'), type=int, default=value)
+
+    info = commands.add_parser('info', help="Show a table's header and coverage")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        table = get_policy_table(args.path)
+        cells = table._mmap[table._offset:]
+        filled = len(cells) - cells.count(0)
+        print(json.dumps(dict(table.header, cells=len(cells), filled=filled,
+                              action_counts=dict(Counter(byte for byte in cells if byte))), indent=2))
+        return 0
+
+    layout = TableLayout([bot['id'] for bot in get_all_battle_bots()],
+                         **{field: getattr(args, field) for field in DEFAULT_LAYOUT})
+    if args.from_sim:
+        layout, cells = compile_from_simulation(args.from_sim, layout, seed=args.seed, explore=args.explore,
+                                                min_samples=args.min_samples)
+        meta = {'source': 'simulation', 'battles': args.from_sim, 'seed': args.seed}
+    else:
+        layout, cells = compile_from_strategy(_load_strategy(args.strategy), layout,
+                                              samples=args.samples, seed=args.seed)
+        meta = {'source': args.strategy, 'samples': args.samples, 'seed': args.seed}
+    write_table(args.output, layout, cells, meta)
+    print(f"wrote {args.output}: {layout.size} cells, {layout.size - cells.count(0)} filled", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""
+Agent Battle Simulator - Action Preview
+What-if outcomes of each action for one side of a running battle.
+
+For every action the battle is forked, the action is played against the AI's
+reply, and the rest of the battle is rolled out with select_ai_action on both
+sides. Rollouts are interleaved across the actions until either the rollout
+limit or the time budget is reached, so every action ends up with the same
+number of samples and a long battle cannot stretch the request: forking costs
+the same at round 50 as at round 1.
+
+    preview = preview_actions(battle, agent=1, rollouts=200, budget=0.15)
+"""
+
+import random
+import time
+from typing import Dict, List, Optional
+
+from .ai import select_ai_action
+from .battle import Battle
+from .win_probability import hoeffding_bound
+
+
+def _rollout(battle: Battle, agent: int, action_id: int, max_rounds: int, rng: random.Random) -> Dict:
+    """Play action_id for `agent` this round, then AI moves for both until the end"""
+    fork = battle.fork(rng)
+    me, opponent = (fork.agent1, fork.agent2) if agent == 1 else (fork.agent2, fork.agent1)
+    my_hp, opponent_hp = me.hp, opponent.hp
+
+    actions = fork.catalog.actions
+    reply = select_ai_action(opponent, me, rng, actions=actions)['id']
+    if agent == 1:
+        fork.execute_turn(action_id, reply)
+    else:
+        fork.execute_turn(reply, action_id)
+    dealt = max(0, opponent_hp - opponent.hp)
+    taken = max(0, my_hp - me.hp)
+
+    # Stamina does not regenerate, so exhausted sides can stall; cap like game.sim does
+    last_round = battle.current_round + max_rounds
+    while fork.winner is None and fork.current_round < last_round:
+        fork.execute_turn(select_ai_action(fork.agent1, fork.agent2, rng, actions=actions)['id'],
+                          select_ai_action(fork.agent2, fork.agent1, rng, actions=actions)['id'])
+    return {'dealt': dealt, 'taken': taken, 'won': fork.winner is me, 'lost': fork.winner is opponent}
+
+
+def preview_actions(battle: Battle, agent: int = 1, rollouts: int = 200, budget: float = 0.15,
+                    max_rounds: int = 100, seed: Optional[int] = None) -> Dict:
+    """Expected damage dealt/taken this round and win chance for each action of `agent` (1 or 2).
+
+    Damage is the net HP the opponent / the agent loses in the round the action
+    is played. Stops after `rollouts` per action or `budget` seconds, whichever
+    comes first; at least one rollout per action is always played.
+    """
+    if agent not in (1, 2):
+        raise ValueError("agent must be 1 or 2")
+    if battle.winner is not None:
+        raise ValueError("Battle is already over")
+    # Rollouts draw from their own generator, never from the random module
+    rng = random.Random(seed)
+
+    me = battle.agent1 if agent == 1 else battle.agent2
+    started = time.perf_counter()
+    deadline = started + budget
+    totals = {action['id']: {'dealt': 0, 'taken': 0, 'won': 0, 'lost': 0} for action in battle.catalog.actions}
+
+    played = 0
+    while played < rollouts:
+        if played and time.perf_counter() >= deadline:
+            break
+        for action_id, total in totals.items():
+            result = _rollout(battle, agent, action_id, max_rounds, rng)
+            for key, value in result.items():
+                total[key] += value
+        played += 1
+
+    error = hoeffding_bound(played)
+    actions: List[Dict] = []
+    for action in battle.catalog.actions:
+        total = totals[action['id']]
+        actions.append({
+            'action_id': action['id'],
+            'name': action['name'],
+            'affordable': action['stamina_cost'] <= me.stamina,
+            'expected_damage_dealt': total['dealt'] / played,
+            'expected_damage_taken': total['taken'] / played,
+            'win_chance': total['won'] / played,
+            'loss_chance': total['lost'] / played,
+            'error': error,
+        })
+    return {
+        'agent': agent,
+        'round': battle.current_round,
+        'rollouts': played,
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+        'actions': actions,
+    }
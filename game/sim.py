@@ -0,0 +1,279 @@
+"""
+Agent Battle Simulator - Simulation Campaigns
+Runs AI-vs-AI battles in bulk and streams one result row per battle.
+
+Usage:
+    python -m game.sim --pairs all --battles 1000 --workers 4 -o results.jsonl
+    python -m game.sim --pairs mende:regulus,connect:mentor --battles 500 --format csv -o out.csv
+    python -m game.sim ... -o results.jsonl --resume     # continue an interrupted run
+
+Battles are split into shards of --shard-size battles. Each battle is seeded
+from (--seed, bot ids, battle index), so a shard always produces the same rows
+no matter which worker runs it or when. Finished shards are recorded in a
+checkpoint file next to the output together with the output size at that
+point; on --resume the output is truncated to that size and only the missing
+shards are run.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .agents import Agent
+from .ai import select_ai_action
+from .battle import Battle
+from .battle_bots import find_battle_bot, get_all_battle_bots
+
+FIELDS = ('bot1', 'bot2', 'index', 'seed', 'winner', 'rounds', 'hp1', 'hp2', 'stamina1', 'stamina2')
+
+# (pair index, first battle index, battle count)
+Shard = Tuple[int, int, int]
+
+
+def battle_seed(seed: int, bot1: str, bot2: str, index: int) -> str:
+    """Seed of one battle; independent of sharding and worker count"""
+    return f"{seed}:{bot1}:{bot2}:{index}"
+
+
+def play_battle(bot1: str, bot2: str, seed: Optional[str] = None, level: int = 1,
+                max_rounds: int = 100, level2: Optional[int] = None) -> Battle:
+    """Play one AI-vs-AI battle to the end (or max_rounds) and return it.
+
+    level2 sets bot2's level when it differs from bot1's. Draws only from a
+    generator of its own, so seeded battles are reproducible while other
+    threads play, and the module-level generator is never reseeded.
+    """
+    rng = random.Random(seed)
+
+    agents = []
+    for bot_id, bot_level in ((bot1, level), (bot2, level if level2 is None else level2)):
+        bot = find_battle_bot(bot_id)
+        if bot is None:
+            raise ValueError(f"Unknown bot: {bot_id!r}")
+        agents.append(Agent(bot['name'], agent_type=bot_id, level=bot_level, agent_type_data=bot))
+    agent1, agent2 = agents
+
+    battle = Battle(agent1, agent2, rng=rng)
+    # Stamina does not regenerate, so exhausted bots can stall; cap and call it a draw
+    while battle.winner is None and battle.current_round < max_rounds:
+        action1 = select_ai_action(agent1, agent2, rng)
+        action2 = select_ai_action(agent2, agent1, rng)
+        battle.execute_turn(action1['id'], action2['id'])
+    return battle
+
+
+def run_battle(bot1: str, bot2: str, seed: Optional[str] = None, level: int = 1,
+               max_rounds: int = 100, level2: Optional[int] = None) -> Dict:
+    """Play one AI-vs-AI battle and return its result row (winner None = draw)."""
+    battle = play_battle(bot1, bot2, seed, level, max_rounds, level2)
+    agent1, agent2 = battle.agent1, battle.agent2
+    if battle.winner is agent1:
+        winner = bot1
+    elif battle.winner is agent2:
+        winner = bot2
+    else:
+        winner = None
+    return {
+        'bot1': bot1,
+        'bot2': bot2,
+        'winner': winner,
+        'rounds': battle.current_round,
+        'hp1': agent1.hp,
+        'hp2': agent2.hp,
+        'stamina1': agent1.stamina,
+        'stamina2': agent2.stamina,
+    }
+
+
+def parse_pairs(spec: str) -> List[Tuple[str, str]]:
+    """Parse "all" or "a:b,c:d" into bot id pairs ("all" = every pair of distinct bots)."""
+    if spec == 'all':
+        bot_ids = [bot['id'] for bot in get_all_battle_bots()]
+        return list(itertools.combinations(bot_ids, 2))
+
+    pairs = []
+    for item in spec.split(','):
+        bot1, sep, bot2 = item.strip().partition(':')
+        if not sep:
+            raise ValueError(f"Expected bot1:bot2, got {item!r}")
+        for bot_id in (bot1, bot2):
+            if find_battle_bot(bot_id) is None:
+                raise ValueError(f"Unknown bot: {bot_id!r}")
+        pairs.append((bot1, bot2))
+    return pairs
+
+
+def make_shards(pair_count: int, battles: int, shard_size: int) -> List[Shard]:
+    return [(pair_index, start, min(shard_size, battles - start))
+            for pair_index in range(pair_count)
+            for start in range(0, battles, shard_size)]
+
+
+def _run_shard(task) -> Tuple[Shard, List[Dict]]:
+    shard, pairs, config = task
+    pair_index, start, count = shard
+    bot1, bot2 = pairs[pair_index]
+    rows = []
+    for index in range(start, start + count):
+        seed = battle_seed(config['seed'], bot1, bot2, index)
+        row = run_battle(bot1, bot2, seed, config['level'], config['max_rounds'])
+        row['index'] = index
+        row['seed'] = seed
+        rows.append(row)
+    return shard, rows
+
+
+class RowWriter:
+    """Appends result rows to a binary file as JSONL or CSV."""
+
+    def __init__(self, handle, fmt: str):
+        self.handle = handle
+        self.fmt = fmt
+        if fmt == 'csv' and handle.tell() == 0:
+            self._write_csv([dict(zip(FIELDS, FIELDS))])
+
+    def write(self, rows: List[Dict]) -> None:
+        if self.fmt == 'csv':
+            self._write_csv(rows)
+        else:
+            self.handle.write(''.join(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                      for row in rows).encode('utf-8'))
+
+    def _write_csv(self, rows: List[Dict]) -> None:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator='\n')
+        writer.writerows(rows)
+        self.handle.write(buffer.getvalue().encode('utf-8'))
+
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, config: Dict, done: Sequence[Shard], offset: int) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump({'config': config, 'done': sorted(done), 'offset': offset}, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def _results(tasks: List, workers: int) -> Iterator[Tuple[Shard, List[Dict]]]:
+    if workers <= 1:
+        for task in tasks:
+            yield _run_shard(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_run_shard, tasks)
+
+
+def run_campaign(pairs: List[Tuple[str, str]], battles: int, output: str, seed: int = 0,
+                 workers: int = 1, fmt: str = 'jsonl', shard_size: int = 100, level: int = 1,
+                 max_rounds: int = 100, resume: bool = False, checkpoint_path: Optional[str] = None,
+                 checkpoint_interval: float = 10.0, max_shards: Optional[int] = None,
+                 progress=None) -> Dict:
+    """Run (or resume) a campaign; returns counts of shards and battles run."""
+    checkpoint_path = checkpoint_path or output + '.ckpt'
+    config = {
+        'pairs': [list(pair) for pair in pairs], 'battles': battles, 'seed': seed,
+        'format': fmt, 'shard_size': shard_size, 'level': level, 'max_rounds': max_rounds,
+    }
+
+    done = set()
+    offset = 0
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None:
+        if checkpoint['config'] != config:
+            raise ValueError("Checkpoint was written with different settings; refusing to resume")
+        done = {tuple(shard) for shard in checkpoint['done']}
+        offset = checkpoint['offset']
+
+    pending = [shard for shard in make_shards(len(pairs), battles, shard_size) if shard not in done]
+    if max_shards is not None:
+        pending = pending[:max_shards]
+    tasks = [(shard, pairs, config) for shard in pending]
+
+    battles_run = 0
+    mode = 'r+b' if checkpoint is not None and os.path.exists(output) else 'w+b'
+    with open(output, mode) as handle:
+        # Drop rows of shards that finished after the last checkpoint
+        handle.truncate(offset)
+        handle.seek(offset)
+        writer = RowWriter(handle, fmt)
+        last_save = time.monotonic()
+        for shard, rows in _results(tasks, workers):
+            writer.write(rows)
+            done.add(shard)
+            battles_run += len(rows)
+            if progress:
+                progress(len(done), battles_run)
+            if time.monotonic() - last_save >= checkpoint_interval:
+                handle.flush()
+                os.fsync(handle.fileno())
+                save_checkpoint(checkpoint_path, config, done, handle.tell())
+                last_save = time.monotonic()
+        handle.flush()
+        os.fsync(handle.fileno())
+        save_checkpoint(checkpoint_path, config, done, handle.tell())
+
+    total_shards = len(make_shards(len(pairs), battles, shard_size))
+    return {'shards_run': len(pending), 'battles_run': battles_run,
+            'shards_done': len(done), 'shards_total': total_shards,
+            'complete': len(done) == total_shards}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m game.sim', description="Run AI-vs-AI battle campaigns")
+    parser.add_argument('--pairs', default='all', help='"all" or comma-separated bot1:bot2 pairs')
+    parser.add_argument('--battles', type=int, default=100, help="Battles per pair")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--shard-size', type=int, default=100)
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--max-rounds', type=int, default=100, help="Rounds before a battle is a draw")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint file")
+    parser.add_argument('--checkpoint', help="Checkpoint path (default: <output>.ckpt)")
+    parser.add_argument('--checkpoint-interval', type=float, default=10.0, help="Seconds between checkpoints")
+    parser.add_argument('--max-shards', type=int, help="Stop after this many shards (continue with --resume)")
+    args = parser.parse_args(argv)
+
+    try:
+        pairs = parse_pairs(args.pairs)
+    except ValueError as error:
+        parser.error(str(error))
+
+    def progress(shards: int, battles: int) -> None:
+        print(f"\r{shards} shards, {battles} battles", end='', file=sys.stderr, flush=True)
+
+    try:
+        result = run_campaign(pairs, args.battles, args.output, seed=args.seed, workers=args.workers,
+                              fmt=args.format, shard_size=args.shard_size, level=args.level,
+                              max_rounds=args.max_rounds, resume=args.resume,
+                              checkpoint_path=args.checkpoint,
+                              checkpoint_interval=args.checkpoint_interval,
+                              max_shards=args.max_shards, progress=progress)
+    except ValueError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+    print(json.dumps(result), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -3,6 +3,8 @@ Agent Battle Simulator - Skin System
 Skins werden durch Level-Ups freigeschaltet
 """
 
+from bisect import bisect_right
+
 # Skin-Definitionen für jeden Bot
 # Format: bot_id -> [skins]
 BOT_SKINS = {
@@ -155,25 +157,53 @@ BOT_SKINS = {
     ]
 }
 
+def _build_unlock_index(skins):
+    """Sort skins by unlock level and precompute the best skin for each prefix"""
+    ordered = sorted(skins, key=lambda s: s['unlock_level'])
+    levels = [skin['unlock_level'] for skin in ordered]
+    best = [None]
+    for count in range(1, len(ordered) + 1):
+        best.append(max(ordered[:count], key=lambda s: s['unlock_level']))
+    return levels, ordered, best
+
+
+# (skins, unlock index, default bot) of the current catalog, swapped as one
+# reference so readers never mix two versions. The unlock index maps
+# bot_id -> (unlock levels, skins, best skin per prefix); the default bot's
+# skins are used for bots without their own.
+_current = (BOT_SKINS, {bot_id: _build_unlock_index(skins) for bot_id, skins in BOT_SKINS.items()}, "mende")
+
+
 def get_bot_skins(bot_id: str):
     """Get all skins for a bot"""
-    return BOT_SKINS.get(bot_id, BOT_SKINS["mende"])
+    skins, _, default_bot = _current
+    return skins.get(bot_id, skins[default_bot])
 
 def get_unlocked_skins(bot_id: str, level: int):
     """Get all unlocked skins for a bot at given level"""
-    all_skins = get_bot_skins(bot_id)
-    return [skin for skin in all_skins if skin['unlock_level'] <= level]
+    _, unlock_index, default_bot = _current
+    levels, ordered, _ = unlock_index.get(bot_id, unlock_index[default_bot])
+    return ordered[:bisect_right(levels, level)]
 
 def get_current_skin(bot_id: str, level: int, skin_id: int = None):
     """Get current skin or best unlocked skin"""
-    unlocked = get_unlocked_skins(bot_id, level)
-    if not unlocked:
-        return get_bot_skins(bot_id)[0]  # Return standard skin
+    skins, unlock_index, default_bot = _current
+    levels, ordered, best = unlock_index.get(bot_id, unlock_index[default_bot])
+    unlocked_count = bisect_right(levels, level)
+    if not unlocked_count:
+        return skins.get(bot_id, skins[default_bot])[0]  # Return standard skin
     
     if skin_id:
-        for skin in unlocked:
+        for skin in ordered[:unlocked_count]:
             if skin['id'] == skin_id:
                 return skin
     
     # Return highest unlocked skin
-    return max(unlocked, key=lambda s: s['unlock_level'])
+    return best[unlocked_count]
+
+
+def _install(skins, unlock_index):
+    """Make another catalog version's skins and prebuilt unlock index current (see game.catalog.install_catalog)"""
+    global BOT_SKINS, _current
+    _current = (skins, unlock_index, "mende" if "mende" in skins else next(iter(skins)))
+    BOT_SKINS = skins
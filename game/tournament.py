@@ -0,0 +1,368 @@
+"""
+Agent Battle Simulator - Tournaments
+Round-robin, Swiss and single-elimination events between bots.
+
+Entrants keep one Agent for the whole event, so XP and level-ups from
+add_xp carry over into later rounds. A match is fully determined by both
+bots, both levels and its seed, so results are cached per
+(bot, level, bot, level, seed) and a rematch at the same levels - in this
+or any later tournament with the same seed - is not played again.
+
+Rounds run one after another (pairings and levels depend on the previous
+round); the matches of a round run on an optional process pool. Standings
+are updated as each result arrives, so polling never replays anything.
+
+    tournament = Tournament(entrants_from_spec('all'), 'swiss', seed=1)
+    tournament.run(executor)           # or TournamentManager().create(...)
+    tournament.snapshot(since=0)
+"""
+
+import math
+import secrets
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .agents import Agent
+from .battle_bots import find_battle_bot, get_all_battle_bots
+from .sim import run_battle
+from .win_probability import LRUCache
+
+FORMATS = ('round_robin', 'swiss', 'elimination')
+# Upper bound on a match's rounds: stalled bots would otherwise play every one of them
+MAX_MATCH_ROUNDS = 1000
+
+# (bot1, level1, bot2, level2, seed, max_rounds) -> run_battle row
+RESULTS = LRUCache(100_000)
+
+MatchKey = Tuple[str, int, str, int, str, int]
+
+
+def _play(key: MatchKey) -> Dict:
+    bot1, level1, bot2, level2, seed, max_rounds = key
+    return run_battle(bot1, bot2, seed, level=level1, max_rounds=max_rounds, level2=level2)
+
+
+class Entrant:
+    """One participant and its running record."""
+
+    def __init__(self, name: str, bot_id: str, level: int = 1):
+        bot = find_battle_bot(bot_id)
+        if bot is None:
+            raise ValueError(f"Unknown bot: {bot_id!r}")
+        self.agent = Agent(name, agent_type=bot_id, level=level, agent_type_data=bot)
+        self.points = 0.0
+        self.draws = 0
+        self.byes = 0
+        self.opponents: List[int] = []
+        self.eliminated_in: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        agent = self.agent
+        return {
+            'name': agent.name,
+            'bot': agent.agent_type,
+            'level': agent.level,
+            'xp': agent.xp,
+            'wins': agent.wins,
+            'losses': agent.losses,
+            'draws': self.draws,
+            'byes': self.byes,
+            'points': self.points,
+            'eliminated_in': self.eliminated_in,
+        }
+
+
+def entrants_from_spec(spec) -> List[Entrant]:
+    """"all" (every catalog bot) or a list of {"bot", "name"?, "level"?} dicts"""
+    if spec == 'all':
+        return [Entrant(bot['name'], bot['id']) for bot in get_all_battle_bots()]
+    entrants = []
+    for item in spec:
+        if not isinstance(item, dict) or not isinstance(item.get('bot'), str):
+            raise ValueError('Each entrant must be an object with a "bot" id')
+        bot_id = item['bot']
+        entrants.append(Entrant(item.get('name') or bot_id, bot_id, int(item.get('level', 1))))
+    return entrants
+
+
+def round_robin_rounds(count: int) -> List[List[Tuple[int, Optional[int]]]]:
+    """Circle-method schedule; None is a bye when the count is odd"""
+    players: List[Optional[int]] = list(range(count))
+    if count % 2:
+        players.append(None)
+    size = len(players)
+    rounds = []
+    for _ in range(size - 1):
+        rounds.append([(players[i], players[size - 1 - i]) for i in range(size // 2)])
+        players = [players[0], players[-1]] + players[1:-1]
+    return [[(a, b) if a is not None else (b, a) for a, b in pairs] for pairs in rounds]
+
+
+def bracket_order(size: int) -> List[int]:
+    """Seed positions of a standard bracket: best and worst seeds meet last"""
+    order = [0]
+    while len(order) < size:
+        length = len(order) * 2
+        order = [seed for position in order for seed in (position, length - 1 - position)]
+    return order
+
+
+class Tournament:
+    """A tournament between entrants; run() plays it, snapshot() may be called meanwhile."""
+
+    def __init__(self, entrants: Sequence[Entrant], fmt: str = 'round_robin', seed: int = 0,
+                 rounds: Optional[int] = None, max_rounds: int = 100):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt!r}")
+        if len(entrants) < 2:
+            raise ValueError("A tournament needs at least two entrants")
+        if not 1 <= max_rounds <= MAX_MATCH_ROUNDS:
+            raise ValueError(f"max_rounds must be from 1 to {MAX_MATCH_ROUNDS}")
+        if rounds is not None and rounds < 1:
+            raise ValueError("rounds must be at least 1")
+        self.entrants = list(entrants)
+        self.format = fmt
+        self.seed = seed
+        self.max_rounds = max_rounds
+        count = len(self.entrants)
+        if fmt == 'round_robin':
+            self.total_rounds = count - 1 + count % 2
+        elif fmt == 'swiss':
+            # More rounds than a round robin has would only replay pairings
+            self.total_rounds = min(rounds or math.ceil(math.log2(count)), count - 1 + count % 2)
+        else:
+            self.total_rounds = math.ceil(math.log2(count))
+
+        self.status = 'pending'
+        self.error: Optional[str] = None
+        self.current_round = 0
+        self.matches: List[Dict] = []
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+        # Elimination: entrant indexes still in, in bracket position order
+        self._alive: List[Optional[int]] = []
+
+    # Pairings
+
+    def _pairings(self, round_index: int) -> List[Tuple[int, Optional[int]]]:
+        if self.format == 'round_robin':
+            return round_robin_rounds(len(self.entrants))[round_index]
+        if self.format == 'swiss':
+            return self._swiss_pairings()
+        return self._elimination_pairings(round_index)
+
+    def _swiss_pairings(self) -> List[Tuple[int, Optional[int]]]:
+        ranked = sorted(range(len(self.entrants)), key=lambda index: -self.entrants[index].points)
+        pairs: List[Tuple[int, Optional[int]]] = []
+        if len(ranked) % 2:
+            # Bye for the lowest-ranked entrant without one so far
+            bye = next((index for index in reversed(ranked) if not self.entrants[index].byes), ranked[-1])
+            ranked.remove(bye)
+            pairs.append((bye, None))
+        while ranked:
+            first = ranked.pop(0)
+            played = self.entrants[first].opponents
+            partner = next((index for index in ranked if index not in played), ranked[0])
+            ranked.remove(partner)
+            pairs.append((first, partner))
+        return pairs
+
+    def _elimination_pairings(self, round_index: int) -> List[Tuple[int, Optional[int]]]:
+        if round_index == 0:
+            size = 1 << self.total_rounds
+            self._alive = [seed if seed < len(self.entrants) else None for seed in bracket_order(size)]
+        pairs = []
+        for position in range(0, len(self._alive), 2):
+            a, b = self._alive[position], self._alive[position + 1]
+            pairs.append((a, b) if a is not None else (b, a))
+        return pairs
+
+    # Results
+
+    def _match_key(self, index1: int, index2: int) -> MatchKey:
+        agent1, agent2 = self.entrants[index1].agent, self.entrants[index2].agent
+        seed = f"{self.seed}:{agent1.agent_type}@{agent1.level}:{agent2.agent_type}@{agent2.level}"
+        return (agent1.agent_type, agent1.level, agent2.agent_type, agent2.level, seed, self.max_rounds)
+
+    def _record(self, round_index: int, index1: int, index2: Optional[int],
+                row: Optional[Dict], cached: bool) -> Optional[int]:
+        """Apply one result to the standings; returns the winner's index (None = draw)"""
+        with self._lock:
+            entrant1 = self.entrants[index1]
+            match = {'round': round_index + 1, 'entrant1': entrant1.agent.name, 'entrant2': None,
+                     'winner': entrant1.agent.name, 'rounds': 0, 'bye': index2 is None, 'cached': cached}
+            if index2 is None:
+                entrant1.points += 1
+                entrant1.byes += 1
+                self.matches.append(match)
+                return index1
+
+            entrant2 = self.entrants[index2]
+            match['entrant2'] = entrant2.agent.name
+            match['rounds'] = row['rounds']
+            entrant1.opponents.append(index2)
+            entrant2.opponents.append(index1)
+            if row['winner'] is None:
+                winner = None
+                if self.format == 'elimination':
+                    # Someone has to advance: more HP left, then the better seed
+                    if row['hp1'] != row['hp2']:
+                        winner = index1 if row['hp1'] > row['hp2'] else index2
+                    else:
+                        winner = min(index1, index2)
+            elif row['bot1'] != row['bot2']:
+                winner = index1 if row['winner'] == row['bot1'] else index2
+            else:
+                # Mirror match: the winner is the one left standing
+                winner = index1 if row['hp1'] > row['hp2'] else index2
+
+            if winner is None:
+                entrant1.points += 0.5
+                entrant2.points += 0.5
+                entrant1.draws += 1
+                entrant2.draws += 1
+                match['winner'] = None
+            else:
+                loser = index2 if winner == index1 else index1
+                winning, losing = self.entrants[winner].agent, self.entrants[loser].agent
+                # Same awards as Battle._finish
+                loser_level = losing.level
+                winning.add_xp(loser_level * 50)
+                losing.add_xp(loser_level * 25)
+                winning.wins += 1
+                losing.losses += 1
+                self.entrants[winner].points += 1
+                if self.format == 'elimination':
+                    self.entrants[loser].eliminated_in = round_index + 1
+                match['winner'] = winning.name
+            self.matches.append(match)
+            return winner
+
+    def run(self, executor: Optional[Executor] = None) -> None:
+        """Play every round; matches of a round go to the executor when one is given"""
+        self.status = 'running'
+        try:
+            for round_index in range(self.total_rounds):
+                self.current_round = round_index + 1
+                winners = self._run_round(round_index, executor)
+                if self.format == 'elimination':
+                    self._alive = winners
+        except Exception as error:
+            self.status = 'failed'
+            self.error = str(error)
+            raise
+        self.status = 'finished'
+
+    def _run_round(self, round_index: int, executor: Optional[Executor]) -> List[Optional[int]]:
+        pairs = self._pairings(round_index)
+        winners: List[Optional[int]] = [None] * len(pairs)
+        pending = {}
+        for slot, (index1, index2) in enumerate(pairs):
+            if index1 is None:
+                continue
+            if index2 is None:
+                winners[slot] = self._record(round_index, index1, None, None, False)
+                continue
+            key = self._match_key(index1, index2)
+            row = RESULTS.get(key)
+            if row is not None:
+                self.cache_hits += 1
+                winners[slot] = self._record(round_index, index1, index2, row, True)
+            elif executor is None:
+                row = _play(key)
+                RESULTS.set(key, row)
+                winners[slot] = self._record(round_index, index1, index2, row, False)
+            else:
+                pending[executor.submit(_play, key)] = (slot, index1, index2, key)
+
+        for future in as_completed(pending):
+            slot, index1, index2, key = pending[future]
+            row = future.result()
+            RESULTS.set(key, row)
+            winners[slot] = self._record(round_index, index1, index2, row, False)
+        return winners
+
+    def standings(self) -> List[Dict]:
+        with self._lock:
+            rows = [entrant.to_dict() for entrant in self.entrants]
+        if self.format == 'elimination':
+            return sorted(rows, key=lambda row: -(row['eliminated_in'] or self.total_rounds + 1))
+        return sorted(rows, key=lambda row: (-row['points'], -row['wins']))
+
+    def snapshot(self, since: int = 0) -> Dict:
+        """Status, standings and the match results from index `since` on"""
+        with self._lock:
+            matches = self.matches[since:]
+            next_index = len(self.matches)
+        return {
+            'format': self.format,
+            'status': self.status,
+            'error': self.error,
+            'round': self.current_round,
+            'total_rounds': self.total_rounds,
+            'cache_hits': self.cache_hits,
+            'standings': self.standings(),
+            'matches': matches,
+            'next': next_index,
+        }
+
+
+class TooManyTournaments(Exception):
+    """Raised by TournamentManager.create when max_running tournaments are already running."""
+
+
+class TournamentManager:
+    """Runs tournaments on background threads and keeps the most recent ones."""
+
+    def __init__(self, workers: int = 0, max_tournaments: int = 100, max_running: int = 4):
+        self.workers = workers
+        self.max_tournaments = max_tournaments
+        # One background thread per running tournament
+        self.max_running = max_running
+        self._tournaments: Dict[str, Tuple[Tournament, float]] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        # Created on first use so preforked servers get one pool per worker process
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            return self._executor
+
+    def create(self, tournament: Tournament) -> str:
+        tournament_id = secrets.token_urlsafe(12)
+        with self._lock:
+            running = sum(item.status in ('pending', 'running') for item, _ in self._tournaments.values())
+            if running >= self.max_running:
+                raise TooManyTournaments(f"{running} tournaments are already running")
+            if len(self._tournaments) >= self.max_tournaments:
+                finished = [(created, key) for key, (item, created) in self._tournaments.items()
+                            if item.status in ('finished', 'failed')]
+                if finished:
+                    del self._tournaments[min(finished)[1]]
+            self._tournaments[tournament_id] = (tournament, time.time())
+        executor = self._get_executor()
+        threading.Thread(target=self._run, args=(tournament, executor), daemon=True).start()
+        return tournament_id
+
+    @staticmethod
+    def _run(tournament: Tournament, executor: Optional[Executor]) -> None:
+        try:
+            tournament.run(executor)
+        except Exception:
+            # Recorded in tournament.status / error for pollers
+            pass
+
+    def get(self, tournament_id: str) -> Optional[Tournament]:
+        with self._lock:
+            entry = self._tournaments.get(tournament_id)
+        return entry[0] if entry else None
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,434 @@
+"""
+Agent Battle Simulator - Win Probability
+Exact win chances by dynamic programming over reachable battle states.
+
+A state is (hp, stamina, attack modifier, defense modifier, effect flags) for
+both sides. Each round both sides pick an action from their policy's
+distribution, pay stamina, act in 50/50 order and roll damage uniformly from
+`damage_range`, exactly as Battle.execute_turn does for bots without passive
+abilities. Stamina never regenerates, so every round either spends stamina or
+leaves the state unchanged (both sides broke); the recursion therefore
+terminates and "nobody can act any more" counts as a draw.
+
+Rules come from the battle's catalog (Catalog.action_table), so a battle
+started before a catalog reload is modeled with the actions it is played with.
+Exact values are memoized per (catalog, matchup, policies, state) in a bounded LRU
+cache shared by all calls, so follow-up queries during a battle reuse the
+subtree computed for the previous round. Early in a battle the reachable tree
+is too large to enumerate (it grows with the product of both sides' possible
+action histories), so past a work or time budget the calculator samples
+trajectories through the same transition model and reports a Hoeffding error
+bound.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .actions import EFFECT_BITS, ActionTable
+from .ai import BASE_PROFILE_WEIGHTS, _get_ai_profile, action_weights
+from .battle import Battle
+from .catalog import Catalog, get_catalog
+
+
+class SideView(NamedTuple):
+    """What a policy sees of one side (attack/defense are effective values)."""
+    agent_type: str
+    hp: int
+    max_hp: int
+    stamina: int
+    attack: int
+    defense: int
+    effects: frozenset
+    # The battle's actions
+    actions: ActionTable
+
+
+# policy(me, opponent) -> [(action_id, probability), ...]
+Policy = Callable[[SideView, SideView], Sequence[Tuple[int, float]]]
+
+
+def uniform_policy(me: SideView, opponent: SideView) -> Sequence[Tuple[int, float]]:
+    """Any affordable action with equal probability"""
+    # Stamina beyond the most expensive action does not change what is affordable
+    return _uniform_distribution(me.actions, min(me.stamina, me.actions.max_cost))
+
+
+@lru_cache(maxsize=4096)
+def _uniform_distribution(table: ActionTable, stamina: int) -> Sequence[Tuple[int, float]]:
+    affordable = [action['id'] for action in table.actions if action['stamina_cost'] <= stamina]
+    if not affordable:
+        return ((table.cheapest['id'], 1.0),)
+    return tuple((action_id, 1.0 / len(affordable)) for action_id in affordable)
+
+
+def heuristic_policy(me: SideView, opponent: SideView) -> Sequence[Tuple[int, float]]:
+    """select_ai_action's weights with the random type factors at their mean (1.0)"""
+    return _heuristic_distribution(me.actions, _get_ai_profile(me), min(me.stamina, me.actions.max_cost),
+                                   me.hp < me.max_hp * 0.4, 'Brennend' in opponent.effects, 'Klebrig' in me.effects)
+
+
+@lru_cache(maxsize=16384)
+def _heuristic_distribution(table: ActionTable, profile: str, stamina: int, low_hp: bool, opponent_burning: bool,
+                            agent_sticky: bool) -> Sequence[Tuple[int, float]]:
+    available = [action for action in table.actions if action['stamina_cost'] <= stamina]
+    if not available:
+        return ((table.cheapest['id'], 1.0),)
+    candidates, weights = action_weights(profile, available, dict(BASE_PROFILE_WEIGHTS[profile]),
+                                         low_hp, opponent_burning, agent_sticky)
+    total = sum(weights)
+    return tuple((action['id'], weight / total) for action, weight in zip(candidates, weights))
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# (context, state) -> (p_side1_wins, p_side2_wins), exact values only; ~600 B per entry
+CACHE = LRUCache(50_000)
+
+
+class _Side(NamedTuple):
+    """Static stats of one side"""
+    agent_type: str
+    max_hp: int
+    attack: int
+    defense: int
+
+
+class WinProbability:
+    """Win chances for one matchup and pair of policies under one catalog's actions."""
+
+    def __init__(self, side1: _Side, side2: _Side, policy1: Policy = heuristic_policy,
+                 policy2: Policy = heuristic_policy, cache: Optional[LRUCache] = None,
+                 catalog: Optional[Catalog] = None):
+        catalog = catalog or get_catalog()
+        self.sides = (side1, side2)
+        self.policies = (policy1, policy2)
+        self.actions = catalog.action_table
+        self._compiled = self.actions.compiled
+        self.cache = CACHE if cache is None else cache
+        self._context = (catalog.version, side1, side2, policy1, policy2)
+        self._damage: Dict[Tuple[int, int, int], Tuple[Tuple[int, float], ...]] = {}
+        self._views: Dict[Tuple, SideView] = {}
+        self._budget: Optional[int] = None
+        self._deadline: Optional[float] = None
+        self.states_evaluated = 0
+        self.work = 0
+        self.samples = 0
+
+    def _damage_distribution(self, action_id: int, attack: int, defense: int):
+        key = (action_id, attack, defense)
+        distribution = self._damage.get(key)
+        if distribution is None:
+            low, high = self.actions.by_id[action_id]['damage_range']
+            counts = Counter()
+            for base in range(low, high + 1):
+                # calculate_damage() followed by take_damage()
+                damage = max(1, base + attack // 5 - defense // 10)
+                counts[max(1, damage - defense // 2)] += 1
+            total = high - low + 1
+            distribution = self._damage[key] = tuple((damage, count / total) for damage, count in counts.items())
+        return distribution
+
+    def _view(self, index: int, side: Tuple) -> SideView:
+        key = (index, side)
+        view = self._views.get(key)
+        if view is None:
+            static = self.sides[index]
+            hp, stamina, attack_mod, defense_mod, bits = side
+            view = self._views[key] = SideView(
+                static.agent_type, hp, static.max_hp, stamina,
+                max(1, static.attack + attack_mod), max(1, static.defense + defense_mod),
+                frozenset(name for name, bit in EFFECT_BITS.items() if bits & bit), self.actions)
+        return view
+
+    def _hit(self, state: Tuple, attacker: int, action_id: int, damage: int) -> Optional[Tuple]:
+        """State after an attack dealing `damage` (None when it kills the defender)"""
+        defender = 1 - attacker
+        hp_d, st_d, am_d, dm_d, bits_d = state[defender]
+        if hp_d <= damage:
+            return None
+        hp_a, st_a, am_a, dm_a, bits_a = state[attacker]
+        _, _, _, d_am, d_dm, d_bits, a_am, a_dm, a_bits, heal = self._compiled[action_id]
+        sides = [None, None]
+        sides[defender] = (hp_d - damage, st_d, am_d + d_am, dm_d + d_dm, bits_d | d_bits)
+        sides[attacker] = (min(self.sides[attacker].max_hp, hp_a + heal), st_a,
+                           am_a + a_am, dm_a + a_dm, bits_a | a_bits)
+        return tuple(sides)
+
+    def _damage_for(self, state: Tuple, attacker: int, action_id: int):
+        attack = max(1, self.sides[attacker].attack + state[attacker][2])
+        defense = max(1, self.sides[1 - attacker].defense + state[1 - attacker][3])
+        return self._damage_distribution(action_id, attack, defense)
+
+    def _attack(self, state, attacker: int, action_id: int, prob: float, then, results) -> None:
+        """Resolve one attack and pass every outcome to then(state, prob) or record the win"""
+        for damage, damage_prob in self._damage_for(state, attacker, action_id):
+            next_state = self._hit(state, attacker, action_id, damage)
+            if next_state is None:
+                results[attacker] += prob * damage_prob
+            else:
+                then(next_state, prob * damage_prob)
+
+    def _can_still_win(self, state: Tuple, side: int) -> bool:
+        """False when even maximum rolls on every affordable hit cannot kill the opponent"""
+        actions = self.actions
+        if actions.attack_can_grow or not actions.min_cost:
+            return True
+        hits = state[side][1] // actions.min_cost
+        attack = max(1, self.sides[side].attack + state[side][2])
+        return hits * max(1, actions.max_roll + attack // 5) >= state[1 - side][0]
+
+    def value(self, state: Tuple, max_work: Optional[int] = None,
+              deadline: Optional[float] = None) -> Tuple[float, float]:
+        """Exact (P(side 1 wins), P(side 2 wins)) from a state.
+
+        Raises WorkBudgetExceeded once more than max_work successor states
+        have been enumerated or time.perf_counter() passed deadline; subtrees
+        finished before that stay cached.
+        """
+        self._budget = max_work
+        self._deadline = deadline
+        return self._value(state)
+
+    def _value(self, state: Tuple) -> Tuple[float, float]:
+        key = (self._context, state)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        self.states_evaluated += 1
+
+        if not (self._can_still_win(state, 0) or self._can_still_win(state, 1)):
+            # Neither side can deal enough damage with the stamina left
+            self.cache.set(key, _DRAW)
+            return _DRAW
+
+        results, successors, stuck = self._transitions(state)
+        self.work += len(successors)
+        if ((self._budget is not None and self.work > self._budget)
+                or (self._deadline is not None and time.perf_counter() > self._deadline)):
+            raise WorkBudgetExceeded(self.work)
+        for next_state, prob in successors.items():
+            win1, win2 = self._value(next_state)
+            results[0] += prob * win1
+            results[1] += prob * win2
+
+        if stuck >= 1.0:
+            value = (0.0, 0.0)
+        else:
+            # Rounds where nobody can pay leave the state unchanged; condition them away
+            value = (results[0] / (1.0 - stuck), results[1] / (1.0 - stuck))
+        self.cache.set(key, value)
+        return value
+
+    def _transitions(self, state: Tuple):
+        """Immediate win probabilities, successor distribution and P(nobody can pay)"""
+        dist1 = self.policies[0](self._view(0, state[0]), self._view(1, state[1]))
+        dist2 = self.policies[1](self._view(1, state[1]), self._view(0, state[0]))
+        results = [0.0, 0.0]
+        successors: Dict[Tuple, float] = {}
+        stuck = 0.0
+
+        def add(next_state, prob):
+            successors[next_state] = successors.get(next_state, 0.0) + prob
+
+        for action1, q1 in dist1:
+            cost1 = self._compiled[action1][0]
+            can1 = state[0][1] >= cost1
+            for action2, q2 in dist2:
+                cost2 = self._compiled[action2][0]
+                can2 = state[1][1] >= cost2
+                q = q1 * q2
+                if not can1 and not can2:
+                    stuck += q
+                    continue
+                side1, side2 = state
+                if can1:
+                    side1 = (side1[0], side1[1] - cost1) + side1[2:]
+                if can2:
+                    side2 = (side2[0], side2[1] - cost2) + side2[2:]
+                paid = (side1, side2)
+                chosen = (action1 if can1 else None, action2 if can2 else None)
+
+                for first in (0, 1):
+                    second = 1 - first
+
+                    def after_first(mid_state, prob, second=second):
+                        if chosen[second] is None:
+                            add(mid_state, prob)
+                        else:
+                            self._attack(mid_state, second, chosen[second], prob, add, results)
+
+                    if chosen[first] is None:
+                        after_first(paid, q * 0.5)
+                    else:
+                        self._attack(paid, first, chosen[first], q * 0.5, after_first, results)
+        return results, successors, stuck
+
+    def estimate(self, state: Tuple, samples: int, rng: random.Random,
+                 deadline: Optional[float] = None) -> Tuple[float, float]:
+        """Monte Carlo estimate through the same transition model.
+
+        Trajectories that reach a state with a cached exact value use it
+        instead of playing on, which keeps the estimate unbiased and
+        lowers its variance. Stops early at deadline (after at least one
+        trajectory); self.samples is the number actually played.
+        """
+        totals = [0.0, 0.0]
+        self.samples = 0
+        while self.samples < samples:
+            if self.samples and deadline is not None and time.perf_counter() > deadline:
+                break
+            self.samples += 1
+            current = state
+            while current is not None:
+                cached = self.cache.get((self._context, current))
+                if cached is not None:
+                    totals[0] += cached[0]
+                    totals[1] += cached[1]
+                    break
+                current = self._sample_round(current, rng, totals)
+        return totals[0] / self.samples, totals[1] / self.samples
+
+    def _sample_round(self, state: Tuple, rng: random.Random, totals: List[float]) -> Optional[Tuple]:
+        """Play one random round; returns the next state or None when the trajectory ended"""
+        if not (self._can_still_win(state, 0) or self._can_still_win(state, 1)):
+            return None
+        dist1 = self.policies[0](self._view(0, state[0]), self._view(1, state[1]))
+        dist2 = self.policies[1](self._view(1, state[1]), self._view(0, state[0]))
+        for _ in range(_MAX_STUCK_DRAWS):
+            chosen = [_draw(dist1, rng), _draw(dist2, rng)]
+            can = [state[side][1] >= self._compiled[chosen[side]][0] for side in (0, 1)]
+            if can[0] or can[1]:
+                break
+        else:
+            # Nobody can pay: draw
+            return None
+
+        sides = list(state)
+        for side in (0, 1):
+            if can[side]:
+                hp, stamina = sides[side][:2]
+                sides[side] = (hp, stamina - self._compiled[chosen[side]][0]) + sides[side][2:]
+        current = tuple(sides)
+        first = 0 if rng.random() < 0.5 else 1
+        for attacker in (first, 1 - first):
+            if not can[attacker]:
+                continue
+            damage = _draw(self._damage_for(current, attacker, chosen[attacker]), rng)
+            current = self._hit(current, attacker, chosen[attacker], damage)
+            if current is None:
+                totals[attacker] += 1
+                return None
+        return current
+
+
+def _draw(distribution: Sequence[Tuple[int, float]], rng: random.Random) -> int:
+    point = rng.random()
+    for value, prob in distribution:
+        point -= prob
+        if point < 0:
+            return value
+    return distribution[-1][0]
+
+
+_DRAW = (0.0, 0.0)
+
+# Consecutive "nobody can pay" draws after which a sampled battle counts as a draw
+_MAX_STUCK_DRAWS = 100
+
+
+class WorkBudgetExceeded(Exception):
+    """Exact evaluation needs more work than allowed."""
+
+
+def hoeffding_bound(samples: int, confidence: float = 0.95) -> float:
+    """Half-width that a mean of [0, 1] samples stays within with the given confidence"""
+    return math.sqrt(math.log(2 / (1 - confidence)) / (2 * samples))
+
+
+def _agent_state(agent) -> Tuple:
+    attack_mod = defense_mod = bits = 0
+    for effect in agent.buffs + agent.debuffs:
+        attack_mod += effect.get('attack', 0)
+        defense_mod += effect.get('defense', 0)
+        bits |= EFFECT_BITS.get(effect.get('name'), 0)
+    return (agent.hp, agent.stamina, attack_mod, defense_mod, bits)
+
+
+def battle_win_probability(battle: Battle, policy1: Policy = heuristic_policy,
+                           policy2: Policy = heuristic_policy, max_work: int = 20_000,
+                           samples: int = 1000, seed: Optional[int] = None,
+                           cache: Optional[LRUCache] = None, budget: Optional[float] = None) -> Dict:
+    """Win chances of both agents from the battle's current state.
+
+    Computed exactly when that takes at most max_work successor
+    enumerations, otherwise estimated from up to `samples` trajectories;
+    'error' is then the 95% Hoeffding bound on each chance. With a budget (in
+    seconds) the exact attempt gets half of it and sampling stops when it runs
+    out. 'exact_rules' is False when either bot has passive abilities, which
+    the model ignores.
+    """
+    agent1, agent2 = battle.agent1, battle.agent2
+    if battle.winner is not None:
+        won = battle.winner is agent1
+        return {'agent1': 1.0 if won else 0.0, 'agent2': 0.0 if won else 1.0, 'draw': 0.0,
+                'error': 0.0, 'method': 'exact', 'exact_rules': True, 'states_evaluated': 0}
+
+    calculator = WinProbability(
+        _Side(agent1.agent_type, agent1.max_hp, agent1.attack, agent1.defense),
+        _Side(agent2.agent_type, agent2.max_hp, agent2.attack, agent2.defense),
+        policy1, policy2, cache, battle.catalog)
+    state = (_agent_state(agent1), _agent_state(agent2))
+    started = time.perf_counter()
+    try:
+        win1, win2 = calculator.value(state, max_work, None if budget is None else started + budget / 2)
+        method, error = 'exact', 0.0
+    except WorkBudgetExceeded:
+        win1, win2 = calculator.estimate(state, samples, random.Random(seed),
+                                         None if budget is None else started + budget)
+        method, error = 'sampled', hoeffding_bound(calculator.samples)
+    return {
+        'agent1': win1,
+        'agent2': win2,
+        'draw': max(0.0, 1.0 - win1 - win2),
+        'error': error,
+        'method': method,
+        'exact_rules': not battle.has_passives,
+        'states_evaluated': calculator.states_evaluated,
+    }
@@ -0,0 +1,29 @@
+"""
+Agent Battle Simulator - Gunicorn Configuration
+Preloads the app in the master so catalogs are built once and shared by workers.
+
+Bind address and worker count come from gunicorn's own PORT / WEB_CONCURRENCY
+handling; set GUNICORN_PRELOAD=0 to load the app in each worker instead.
+
+Workers are threaded (gthread): a matchmaking long-poll sleeps for up to
+MATCHMAKING_MAX_WAIT seconds, which would block a sync worker outright. The
+timeout stays above that wait so a full-length poll never gets its worker killed.
+"""
+
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', float(os.environ.get('MATCHMAKING_MAX_WAIT', 30)) + 30))
+
+
+def when_ready(server):
+    if preload_app:
+        import app
+        app.prepare_preload()
+
+
+def post_fork(server, worker):
+    import app
+    app.on_worker_start()
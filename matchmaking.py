@@ -0,0 +1,275 @@
+"""
+Agent Battle Simulator - Matchmaking
+Pairs waiting players by level and latency with windows that widen over time.
+
+Waiting tickets live in buckets keyed by (level, latency // LATENCY_BUCKET_MS),
+each an insertion-ordered dict, so the oldest ticket of a bucket is its first
+entry and removal is O(1). A match attempt only visits the buckets inside the
+ticket's current window, which is bounded by the maximum window and does not
+depend on how many players are waiting. Window widening is driven by a heap of
+(next widen time, ticket id), so each widening step costs O(log n).
+
+Matched pairs are handed to on_match (which creates the battle) and waiters
+blocked in wait() are woken through a per-ticket event (long-poll). The queue
+is per process: with several gunicorn workers only players on the same worker
+are paired, as with BattleStorage.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKET_MS = 50
+# Every WIDEN_INTERVAL seconds of waiting the level window grows by one level and
+# the latency window by one bucket, up to the maxima
+WIDEN_INTERVAL = 5.0
+MAX_LEVEL_WINDOW = 10
+MAX_LATENCY_WINDOW = 4
+TICKET_TTL = 120.0
+# Step value of heap entries that check a ticket for expiry instead of widening it
+_EXPIRY = -1
+
+
+class Ticket:
+    """One player waiting for (or matched to) an opponent."""
+
+    __slots__ = ('ticket_id', 'name', 'bot', 'level', 'latency_ms', 'enqueued_at', 'last_seen',
+                 'step', 'status', 'battle_id', 'side', 'opponent', 'event')
+
+    def __init__(self, ticket_id: str, name: str, bot: str, level: int, latency_ms: int, now: float):
+        self.ticket_id = ticket_id
+        self.name = name
+        self.bot = bot
+        self.level = level
+        self.latency_ms = latency_ms
+        self.enqueued_at = now
+        self.last_seen = now
+        self.step = 0
+        self.status = 'waiting'
+        self.battle_id: Optional[str] = None
+        self.side: Optional[int] = None
+        self.opponent: Optional[Dict] = None
+        self.event = threading.Event()
+
+    @property
+    def bucket(self) -> Tuple[int, int]:
+        return self.level, self.latency_ms // LATENCY_BUCKET_MS
+
+    def public(self) -> Dict:
+        return {'name': self.name, 'bot': self.bot, 'level': self.level}
+
+    def to_dict(self) -> Dict:
+        return {
+            'ticket_id': self.ticket_id,
+            'status': self.status,
+            'battle_id': self.battle_id,
+            'agent': self.side,
+            'opponent': self.opponent,
+            'level_window': min(self.step, MAX_LEVEL_WINDOW),
+            'latency_window_ms': (1 + min(self.step, MAX_LATENCY_WINDOW)) * LATENCY_BUCKET_MS,
+        }
+
+
+class MatchmakingQueue:
+    """Thread-safe matchmaking queue; on_match(first, second) returns the new battle id."""
+
+    def __init__(self, on_match: Callable[[Ticket, Ticket], str], clock: Callable[[], float] = time.monotonic,
+                 interval: float = 0.5, autostart: bool = True):
+        self.on_match = on_match
+        self.clock = clock
+        self.interval = interval
+        self._buckets: Dict[Tuple[int, int], Dict[str, Ticket]] = {}
+        self._tickets: Dict[str, Ticket] = {}
+        # (due, tie-breaker, ticket id, step the entry was scheduled for)
+        self._widen: List[Tuple[float, int, str, int]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self.matched = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        if autostart:
+            self.start()
+
+    def start(self) -> None:
+        """Start the widening thread in this process (threads do not survive fork)."""
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.tick()
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+    # Queue operations
+
+    def enqueue(self, name: str, bot: str, level: int, latency_ms: int = 0) -> Ticket:
+        """Add a player and try to match them at once"""
+        if self._owner_pid != os.getpid():
+            self.start()
+        now = self.clock()
+        ticket = Ticket(secrets.token_urlsafe(12), name, bot, level, max(0, int(latency_ms)), now)
+        with self._lock:
+            self._tickets[ticket.ticket_id] = ticket
+            opponent = self._find_opponent(ticket)
+            if opponent is None:
+                self._insert(ticket)
+            else:
+                ticket.status = 'matching'
+        if opponent is not None:
+            self._match(opponent, ticket)
+        return ticket
+
+    def cancel(self, ticket_id: str) -> bool:
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None or ticket.status != 'waiting':
+                return False
+            self._remove(ticket)
+            ticket.status = 'cancelled'
+            del self._tickets[ticket_id]
+        ticket.event.set()
+        return True
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is not None:
+                ticket.last_seen = self.clock()
+            return ticket
+
+    def wait(self, ticket_id: str, timeout: float) -> Optional[Ticket]:
+        """Block until the ticket is matched or timeout seconds pass (long-poll)"""
+        ticket = self.get(ticket_id)
+        if ticket is not None and ticket.status == 'waiting':
+            ticket.event.wait(timeout)
+            ticket.last_seen = self.clock()
+        return ticket
+
+    def tick(self) -> None:
+        """Widen the windows of tickets that are due and retry them; drop abandoned tickets"""
+        now = self.clock()
+        pairs = []
+        with self._lock:
+            while self._widen and self._widen[0][0] <= now:
+                _, _, ticket_id, step = heapq.heappop(self._widen)
+                ticket = self._tickets.get(ticket_id)
+                if ticket is None:
+                    continue
+                if step == _EXPIRY:
+                    self._expire(ticket, now)
+                    continue
+                if ticket.status != 'waiting' or ticket.step != step:
+                    continue
+                if now - ticket.last_seen > TICKET_TTL:
+                    self._expire(ticket, now)
+                    continue
+                ticket.step += 1
+                self._remove(ticket)
+                opponent = self._find_opponent(ticket)
+                if opponent is None:
+                    self._insert(ticket)
+                else:
+                    ticket.status = 'matching'
+                    pairs.append((opponent, ticket))
+        for opponent, ticket in pairs:
+            try:
+                self._match(opponent, ticket)
+            except Exception:
+                # Both tickets are back in the queue and will be retried
+                logger.exception("Could not create a matched battle")
+
+    # Internals; callers hold the lock
+
+    def _insert(self, ticket: Ticket) -> None:
+        self._buckets.setdefault(ticket.bucket, {})[ticket.ticket_id] = ticket
+        if ticket.step < max(MAX_LEVEL_WINDOW, MAX_LATENCY_WINDOW):
+            due = ticket.enqueued_at + (ticket.step + 1) * WIDEN_INTERVAL
+            heapq.heappush(self._widen, (due, next(self._order), ticket.ticket_id, ticket.step))
+        else:
+            self._schedule_expiry(ticket)
+
+    def _schedule_expiry(self, ticket: Ticket) -> None:
+        heapq.heappush(self._widen, (ticket.last_seen + TICKET_TTL, next(self._order), ticket.ticket_id, _EXPIRY))
+
+    def _expire(self, ticket: Ticket, now: float) -> None:
+        """Drop a fully widened or matched ticket nobody has polled for TICKET_TTL"""
+        if ticket.status not in ('waiting', 'matched'):
+            return
+        if now - ticket.last_seen <= TICKET_TTL:
+            self._schedule_expiry(ticket)
+            return
+        if ticket.status == 'waiting':
+            self._remove(ticket)
+        del self._tickets[ticket.ticket_id]
+
+    def _remove(self, ticket: Ticket) -> None:
+        bucket = self._buckets.get(ticket.bucket)
+        if bucket is not None:
+            bucket.pop(ticket.ticket_id, None)
+            if not bucket:
+                del self._buckets[ticket.bucket]
+
+    def _find_opponent(self, ticket: Ticket) -> Optional[Ticket]:
+        """Oldest waiting ticket in the nearest bucket inside the ticket's windows; removes it"""
+        level_window = min(ticket.step, MAX_LEVEL_WINDOW)
+        latency_window = 1 + min(ticket.step, MAX_LATENCY_WINDOW)
+        level, latency = ticket.bucket
+        for level_offset in _nearest_first(level_window):
+            for latency_offset in _nearest_first(latency_window):
+                bucket = self._buckets.get((level + level_offset, latency + latency_offset))
+                if bucket:
+                    opponent = next(iter(bucket.values()))
+                    self._remove(opponent)
+                    opponent.status = 'matching'
+                    return opponent
+        return None
+
+    def _match(self, first: Ticket, second: Ticket) -> None:
+        """first was already waiting and plays agent1"""
+        try:
+            battle_id = self.on_match(first, second)
+        except Exception:
+            # Could not create the battle; put both back in the queue
+            with self._lock:
+                for ticket in (first, second):
+                    ticket.status = 'waiting'
+                    self._insert(ticket)
+            raise
+        with self._lock:
+            for side, ticket, opponent in ((1, first, second), (2, second, first)):
+                ticket.status = 'matched'
+                ticket.battle_id = battle_id
+                ticket.side = side
+                ticket.opponent = opponent.public()
+                self._schedule_expiry(ticket)
+            self.matched += 1
+        first.event.set()
+        second.event.set()
+
+
+def _nearest_first(window: int) -> List[int]:
+    offsets = [0]
+    for distance in range(1, window + 1):
+        offsets += [-distance, distance]
+    return offsets
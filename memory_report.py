@@ -0,0 +1,167 @@
+"""
+Agent Battle Simulator - Storage Memory Report
+Aggregates battle footprints from BattleStorage and checks them against a budget.
+
+CLI usage:
+    python memory_report.py --url http://localhost:5001 --token $ADMIN_TOKEN
+    python memory_report.py --simulate 1000 --rounds 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from game.footprint import estimate_battle_bytes
+
+logger = logging.getLogger(__name__)
+
+ROUND_BUCKETS = [(0, 0), (1, 5), (6, 10), (11, 20), (21, 50), (51, None)]
+
+
+def _bucket_label(low: int, high: Optional[int]) -> str:
+    if high is None:
+        return f"{low}+"
+    return str(low) if low == high else f"{low}-{high}"
+
+
+def build_report(entries, top_n: int = 10, budget_bytes: Optional[int] = None) -> Dict:
+    """Build a footprint report from (battle_id, battle, created_at) entries."""
+    seen = set()
+    sized = []
+    for battle_id, battle, _ in entries:
+        sized.append((battle_id, battle.current_round, estimate_battle_bytes(battle, seen)))
+
+    distribution = []
+    for low, high in ROUND_BUCKETS:
+        in_bucket = [size for _, rounds, size in sized
+                     if rounds >= low and (high is None or rounds <= high)]
+        distribution.append({
+            'rounds': _bucket_label(low, high),
+            'battles': len(in_bucket),
+            'bytes': sum(in_bucket),
+            'avg_bytes': int(sum(in_bucket) / len(in_bucket)) if in_bucket else 0,
+        })
+
+    total = sum(size for _, _, size in sized)
+    largest = sorted(sized, key=lambda item: item[2], reverse=True)[:top_n]
+    return {
+        'battles': len(sized),
+        'total_bytes': total,
+        'avg_bytes': int(total / len(sized)) if sized else 0,
+        'by_rounds': distribution,
+        'largest': [{'battle_id': battle_id, 'rounds': rounds, 'bytes': size}
+                    for battle_id, rounds, size in largest],
+        'budget_bytes': budget_bytes,
+        'over_budget': bool(budget_bytes) and total > budget_bytes,
+    }
+
+
+class MemoryMonitor:
+    """Caches the storage footprint so metric scrapes stay cheap, and warns over budget."""
+
+    def __init__(self, storage, budget_bytes: Optional[int] = None, max_age: float = 30.0):
+        self.storage = storage
+        self.budget_bytes = budget_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._total = 0
+        self._measured_at = 0.0
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            if time.monotonic() - self._measured_at >= self.max_age:
+                entries = self.storage.items()
+                self._total = build_report(entries, top_n=0)['total_bytes']
+                self._measured_at = time.monotonic()
+                if self.over_budget():
+                    logger.warning("Battle storage uses %d bytes, over the %d byte budget",
+                                   self._total, self.budget_bytes)
+            return self._total
+
+    def over_budget(self) -> bool:
+        return bool(self.budget_bytes) and self._total > self.budget_bytes
+
+    def report(self, top_n: int = 10) -> Dict:
+        return build_report(self.storage.items(), top_n, self.budget_bytes)
+
+
+def budget_from_env() -> Optional[int]:
+    """Read the BATTLE_MEMORY_BUDGET_MB alert threshold."""
+    value = os.environ.get('BATTLE_MEMORY_BUDGET_MB')
+    return int(float(value) * 1024 * 1024) if value else None
+
+
+def _simulate(count: int, rounds: int, seed: int) -> List:
+    from game import Agent, Battle, get_all_battle_bots, get_all_actions
+
+    random.seed(seed)
+    bots = get_all_battle_bots()
+    action_ids = [action['id'] for action in get_all_actions()]
+    entries = []
+    for index in range(count):
+        bot1, bot2 = random.choice(bots), random.choice(bots)
+        battle = Battle(Agent(bot1['name'], bot1['id'], agent_type_data=bot1),
+                        Agent(bot2['name'], bot2['id'], agent_type_data=bot2))
+        for _ in range(random.randint(1, rounds)):
+            if battle.winner:
+                break
+            battle.execute_turn(random.choice(action_ids), random.choice(action_ids))
+        entries.append((f"sim-{index}", battle, 0.0))
+    return entries
+
+
+def _print_report(report: Dict) -> None:
+    print(f"Battles: {report['battles']}  total: {report['total_bytes'] / 1024:.1f} KiB  "
+          f"avg: {report['avg_bytes'] / 1024:.1f} KiB")
+    print(f"{'rounds':>8} {'battles':>8} {'KiB':>10} {'avg KiB':>8}")
+    for row in report['by_rounds']:
+        print(f"{row['rounds']:>8} {row['battles']:>8} {row['bytes'] / 1024:>10.1f} {row['avg_bytes'] / 1024:>8.1f}")
+    if report['largest']:
+        print("Largest battles:")
+        for row in report['largest']:
+            print(f"  {row['battle_id']}  rounds={row['rounds']}  {row['bytes'] / 1024:.1f} KiB")
+    if report.get('budget_bytes'):
+        state = 'OVER BUDGET' if report['over_budget'] else 'within budget'
+        print(f"Budget: {report['budget_bytes'] / 1024 / 1024:.1f} MiB ({state})")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Battle storage memory footprint report")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help="Base URL of a running server (uses /admin/memory)")
+    source.add_argument('--simulate', type=int, metavar='N', help="Estimate N locally simulated battles")
+    parser.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'), help="Admin token for --url")
+    parser.add_argument('--rounds', type=int, default=20, help="Max rounds per simulated battle")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--budget-mb', type=float, help="Alert threshold (default: BATTLE_MEMORY_BUDGET_MB)")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args(argv)
+
+    budget = int(args.budget_mb * 1024 * 1024) if args.budget_mb else budget_from_env()
+    if args.url:
+        req = urllib.request.Request(f"{args.url.rstrip('/')}/admin/memory?top={args.top}",
+                                     headers={'Authorization': f"Bearer {args.token or ''}"})
+        with urllib.request.urlopen(req) as response:
+            report = json.load(response)
+        if budget:
+            report['budget_bytes'] = budget
+            report['over_budget'] = report['total_bytes'] > budget
+    else:
+        report = build_report(_simulate(args.simulate, args.rounds, args.seed), args.top, budget)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 2 if report['over_budget'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,254 @@
+"""
+Agent Battle Simulator - Metrics
+Prometheus-style counters, gauges and histograms without external dependencies
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _ThreadShards:
+    """Per-thread value slots that are only summed when metrics are scraped.
+
+    Writers never take a lock: each thread increments its own list. The lock
+    is only taken once per thread (to register its slot) and at scrape time.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0] * size
+
+    def slot(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self._size
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            self._local.values = values
+            return values
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            # Fold slots of finished threads so short-lived request threads
+            # (e.g. the threaded dev server) do not accumulate forever.
+            alive = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, values))
+                else:
+                    for i, value in enumerate(values):
+                        self._retired[i] += value
+            self._shards = alive
+
+            totals = list(self._retired)
+            for _, values in alive:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Return the child for a label combination, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _format_labels(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        body = ','.join(f'{key}="{_escape(str(value))}"' for key, value in pairs)
+        return '{' + body + '}'
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._collect_child(values, child))
+        return lines
+
+    def _collect_child(self, values: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _ThreadShards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.slot()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _collect_child(self, values, child) -> List[str]:
+        return [f'{self.name}{self._format_labels(values)} {_format_value(child.value())}']
+
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_shards')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # One slot per bucket, one for +Inf, then sum and count
+        self._shards = _ThreadShards(len(buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        slot = self._shards.slot()
+        slot[bisect_left(self._buckets, value)] += 1
+        slot[-2] += value
+        slot[-1] += 1
+
+    def snapshot(self) -> List[float]:
+        return self._shards.totals()
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket boundaries."""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _collect_child(self, values, child) -> List[str]:
+        totals = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), totals):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f'{self.name}_bucket{self._format_labels(values, ("le", le))} {_format_value(cumulative)}')
+        lines.append(f'{self.name}_sum{self._format_labels(values)} {_format_value(totals[-2])}')
+        lines.append(f'{self.name}_count{self._format_labels(values)} {_format_value(totals[-1])}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._callback = callback
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        try:
+            value = self._callback()
+        except Exception:  # A broken gauge must never break the scrape
+            return lines
+        lines.append(f'{self.name} {_format_value(value)}')
+        return lines
+
+
+class CounterFunc(Gauge):
+    """Counter whose value is owned elsewhere (e.g. BattleStorage stats)."""
+
+    metric_type = 'counter'
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, documentation, callback))
+
+    def counter_func(self, name: str, documentation: str, callback: Callable[[], float]) -> CounterFunc:
+        return self.register(CounterFunc(name, documentation, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
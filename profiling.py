@@ -0,0 +1,148 @@
+"""
+Agent Battle Simulator - On-demand Profiling
+Stack sampling and tracemalloc snapshots for live workers. Nothing here runs
+until an admin request starts it, so there is no cost while disabled.
+"""
+
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+MAX_SAMPLE_SECONDS = 60.0
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+class StackSampler:
+    """Samples the stacks of all other threads from a background thread.
+
+    Sampling runs in its own thread so it also works with single-threaded
+    (sync) gunicorn workers: the request that starts it returns immediately
+    and the worker keeps serving traffic while it is being sampled.
+    """
+
+    def __init__(self):
+        # Guards run state and the counts, which result() may read while a run is going
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._counts: Counter = Counter()
+        self._samples = 0
+        self._started_at = 0.0
+        self._seconds = 0.0
+        self._interval = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005) -> bool:
+        """Start a sampling run; return False if one is already in progress."""
+        seconds = min(max(seconds, 0.0), MAX_SAMPLE_SECONDS)
+        interval = max(interval, MIN_SAMPLE_INTERVAL)
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = Counter()
+            self._samples = 0
+            self._started_at = time.time()
+            self._seconds = seconds
+            self._interval = interval
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self._seconds
+        while time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [f"{names.get(thread_id, thread_id)};{_collapse(frame)}"
+                      for thread_id, frame in frames.items() if thread_id != own_id]
+            del frames
+            with self._lock:
+                self._counts.update(stacks)
+                self._samples += 1
+            time.sleep(self._interval)
+
+    def result(self) -> Dict:
+        """Return the collapsed stacks of the current or last run."""
+        with self._lock:
+            counts = dict(self._counts)
+            samples = self._samples
+        lines = [f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+        return {
+            'running': self.running,
+            'started_at': self._started_at,
+            'seconds': self._seconds,
+            'interval': self._interval,
+            'samples': samples,
+            'collapsed': '\n'.join(lines),
+        }
+
+
+def _collapse(frame) -> str:
+    """Render a frame chain root-first in the collapsed-stack format."""
+    parts: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    parts.reverse()
+    return ';'.join(parts)
+
+
+def start_tracemalloc(frames: int = 5) -> bool:
+    """Start tracing allocations; return False if already tracing."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(max(1, frames))
+    return True
+
+
+def stop_tracemalloc() -> bool:
+    """Stop tracing allocations and free the trace data."""
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def top_allocations(limit: int = 20, group_by: str = 'lineno') -> Dict:
+    """Return the top allocation sites of the running trace."""
+    if not tracemalloc.is_tracing():
+        return {'tracing': False, 'allocations': []}
+
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+
+    allocations = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        allocations.append({
+            'site': f"{frame.filename}:{frame.lineno}",
+            'source': linecache.getline(frame.filename, frame.lineno).strip(),
+            'traceback': [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+            'size_bytes': stat.size,
+            'count': stat.count,
+        })
+
+    return {
+        'tracing': True,
+        'traced_bytes': current,
+        'peak_bytes': peak,
+        'allocations': allocations,
+    }
+
+
+sampler = StackSampler()
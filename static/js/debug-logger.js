@@ -1,5 +1,8 @@
 // Debug Logger - Captures all logs visually
 (function() {
+    // Oldest entries are dropped beyond this, so long battles do not grow the DOM forever
+    const MAX_ENTRIES = 200;
+
     // Create log container
     const logContainer = document.createElement('div');
     logContainer.id = 'debug-log-container';
@@ -38,6 +41,9 @@
         
         logEntry.textContent = content;
         logContainer.appendChild(logEntry);
+        while (logContainer.childElementCount > MAX_ENTRIES) {
+            logContainer.firstElementChild.remove();
+        }
         logContainer.scrollTop = logContainer.scrollHeight;
         
         // Also log to console (if it works)
@@ -8,6 +8,7 @@ class GameController {
         this.agent2 = null;
         this.actions = [];
         this.bots = [];
+        this.skins = {};
         this.selectedBot1 = null;
         this.selectedBot2 = null;
         this.currentRound = 0;
@@ -17,9 +18,11 @@ class GameController {
     }
     
     async init() {
-        // Load bots and actions
-        await this.loadBots();
-        await this.loadActions();
+        // Load bots, skins and actions (one catalog request, per-endpoint fallback)
+        if (!await this.loadCatalog()) {
+            await this.loadBots();
+            await this.loadActions();
+        }
         
         // Event listeners
         document.getElementById('confirm-selection-btn').addEventListener('click', () => this.confirmSelection());
@@ -43,6 +46,31 @@ class GameController {
         this.validateSelection();
     }
     
+    async loadCatalog() {
+        const catalogUrl = document.body.dataset.catalogUrl;
+        if (!catalogUrl) {
+            return false;
+        }
+
+        try {
+            const response = await fetch(catalogUrl);
+            const { data } = await this.parseJson(response);
+            if (!response.ok || !data) {
+                return false;
+            }
+
+            this.bots = data.bots;
+            this.skins = data.skins;
+            this.actions = data.actions;
+            console.log('Catalog loaded:', this.bots.length, 'bots,', this.actions.length, 'actions');
+            this.renderBotSelection();
+            return true;
+        } catch (error) {
+            console.error('Error loading catalog:', error);
+            return false;
+        }
+    }
+
     async loadBots() {
         try {
             const response = await fetch('/api/bots');
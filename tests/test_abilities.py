@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from game import Agent, Battle, get_battle_bot
+from game.abilities import NO_HOOKS, compile_passives, get_passive_hooks
+
+
+def _make_agent(bot_id: str) -> Agent:
+    bot_data = get_battle_bot(bot_id)
+    return Agent(bot_data['name'], agent_type=bot_id, level=1, agent_type_data=bot_data)
+
+
+class TestPassiveAbilities(unittest.TestCase):
+    def setUp(self):
+        random.seed(5)
+
+    def test_bots_without_passives_compile_to_no_hooks(self):
+        self.assertIs(get_passive_hooks(_make_agent('connect')), NO_HOOKS)
+        battle = Battle(_make_agent('connect'), _make_agent('mentor'))
+        self.assertFalse(battle.has_passives)
+
+    def test_hooks_are_grouped_by_phase(self):
+        hooks = compile_passives(get_battle_bot('pulse')['passives'])
+        self.assertEqual(len(hooks.pre_damage), 1)
+        self.assertEqual(len(hooks.post_damage), 1)
+        self.assertEqual(hooks.end_of_round, ())
+
+    def test_unknown_passive_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_passives([{'type': 'teleport'}])
+
+    def test_stamina_discount_and_regeneration(self):
+        effi, resource = _make_agent('effi'), _make_agent('resource')
+        battle = Battle(effi, resource, rng=random.Random(1))
+        result = battle.execute_turn(2, 3)  # 20 stamina for Effi, 10 for Resource
+
+        self.assertFalse(result['battle_over'])
+        self.assertEqual(effi.stamina, effi.max_stamina - 17)
+        self.assertEqual(resource.stamina, resource.max_stamina - 10 + 5)
+        self.assertEqual(result['round_effects'], [f"🔋 {resource.name} regeneriert 5 Stamina"])
+
+    def test_hp_regeneration(self):
+        connect, eco = _make_agent('connect'), _make_agent('eco')
+        battle = Battle(connect, eco, rng=random.Random(1))
+        connect.stamina = 0  # Connect cannot act, so Eco takes no damage
+        eco.hp = eco.max_hp - 20
+        result = battle.execute_turn(1, 3)
+
+        self.assertEqual(eco.hp, eco.max_hp - 15)
+        self.assertEqual(result['round_effects'], [f"🌿 {eco.name} regeneriert 5 HP"])
+
+    def test_reflection_damages_the_attacker(self):
+        attacker, regulus = _make_agent('connect'), _make_agent('regulus')
+        battle = Battle(attacker, regulus)
+        battle.execute_turn(2, 8)
+
+        self.assertTrue(any('reflektiert' in message
+                            for action in battle.battle_log[0]['actions']
+                            for message in action['effects']))
+
+    def test_random_buff_replaces_the_previous_one(self):
+        connect, genesis = _make_agent('connect'), _make_agent('genesis')
+        battle = Battle(connect, genesis, rng=random.Random(2))
+        connect.stamina = genesis.stamina = 0  # Nobody acts, only the passives run
+        for _ in range(10):
+            battle.execute_turn(1, 1)
+
+        self.assertEqual([buff['name'] for buff in genesis.buffs], ['Schöpfung'])
+        self.assertEqual(genesis.get_effective_attack() + genesis.get_effective_defense(),
+                         genesis.attack + genesis.defense + 1)
+
+    def test_taunt_expires_after_the_next_round(self):
+        mende, connect = _make_agent('mende'), _make_agent('connect')
+        battle = Battle(mende, connect, rng=random.Random(3))
+        mende.max_hp = mende.hp = connect.max_hp = connect.hp = 10_000
+        connect.stamina = 0
+        battle.execute_turn(8, 1)  # Heal puts no debuff of its own on Connect
+        self.assertEqual([debuff['name'] for debuff in connect.debuffs], ['Verspottet'])
+
+        mende.stamina = 0
+        battle.execute_turn(8, 1)
+        self.assertEqual(connect.debuffs, [])
+        self.assertEqual(connect.get_effective_attack(), connect.attack)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from admission import ConcurrencyLimiter, TokenBucketTable, queue_time
+from app import create_app
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def test_burst_then_refill(self):
+        now = [100.0]
+        table = TokenBucketTable(rate=2, burst=2, slots=64, clock=lambda: now[0])
+        self.assertEqual(table.acquire('a'), 0)
+        self.assertEqual(table.acquire('a'), 0)
+        self.assertAlmostEqual(table.acquire('a'), 0.5)
+        self.assertEqual(table.acquire('b'), 0)
+        now[0] += 0.5
+        self.assertEqual(table.acquire('a'), 0)
+
+    def test_queue_time_units(self):
+        now = 1_700_000_000.0
+        for header in ('t=1699999999.5', '1699999999500', 't=1699999999500000'):
+            self.assertAlmostEqual(queue_time(header, now), 0.5, places=3)
+        self.assertIsNone(queue_time('garbage', now))
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_reserve_is_kept_for_high_priority(self):
+        limiter = ConcurrencyLimiter(limit=2, reserve=1)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        self.assertTrue(limiter.acquire(high_priority=True))
+        self.assertFalse(limiter.acquire(high_priority=True))
+
+    def test_queued_request_gets_released_slot(self):
+        limiter = ConcurrencyLimiter(limit=1, queue_depth=1, timeout=5)
+        self.assertTrue(limiter.acquire())
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        waiter.start()
+        while not limiter.waiting:
+            time.sleep(0.001)
+        # Queue is full: the next request fails fast
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        waiter.join()
+        self.assertEqual(results, [True])
+
+
+class TestAdmissionEndpoints(unittest.TestCase):
+    def test_rate_limit_returns_429_but_health_and_cheap_reads_pass(self):
+        client = create_app({'RATE_LIMIT_PER_SECOND': 0.01, 'RATE_LIMIT_BURST': 2}).test_client()
+        responses = [client.post('/api/battle/start', json={}) for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertGreater(int(responses[-1].headers['Retry-After']), 1)
+        self.assertEqual(client.get('/api/actions').status_code, 200)
+        self.assertEqual(client.get('/health').status_code, 200)
+
+    def test_dropping_the_session_cookie_does_not_reset_the_limit(self):
+        app = create_app({'RATE_LIMIT_PER_SECOND': 0.01, 'RATE_LIMIT_BURST': 2})
+        # A fresh client per request, as if the cookie were thrown away each time
+        statuses = [app.test_client().post('/api/battle/start', json={}).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 429, 429])
+
+    def test_rejected_requests_get_no_client_id(self):
+        app = create_app({'RATE_LIMIT_PER_SECOND': 0.01, 'RATE_LIMIT_BURST': 1})
+        self.assertEqual(app.test_client().post('/api/battle/start', json={}).status_code, 200)
+        client = app.test_client()
+        self.assertEqual(client.post('/api/battle/start', json={}).status_code, 429)
+        with client.session_transaction() as session:
+            self.assertNotIn('client', session)
+
+    def test_rate_limit_is_off_by_default_without_trusted_proxies(self):
+        self.assertIsNone(create_app().extensions['admission'].buckets)
+
+    def test_requests_queued_too_long_are_shed_unless_cheap(self):
+        client = create_app({'MAX_QUEUE_TIME_MS': 1000}).test_client()
+        headers = {'X-Request-Start': f't={time.time() - 5:.3f}'}
+        response = client.post('/api/battle/start', json={}, headers=headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(client.get('/api/actions', headers=headers).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+try:
+    import numpy as np
+    from game.analytics import (ColumnStore, GroupBy, battle_records, balance_report, default_bot_codes,
+                                read_chunks, run_pipeline, simulate_records)
+except ImportError:  # numpy is an optional training dependency
+    np = None
+
+from game.sim import play_battle
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestAnalytics(unittest.TestCase):
+    def test_chunked_store_matches_battle_logs(self):
+        battles = [play_battle('mende', 'regulus', seed=f'analytics:{index}') for index in range(6)]
+        expected = Counter((entry['agent'], entry['action_id']) for battle in battles
+                           for turn in battle.battle_log for entry in turn['actions'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with ColumnStore(tmp) as store:
+                groups = GroupBy(('agent', 'action_id'), ('damage',))
+                counts = run_pipeline(battle_records(battles, default_bot_codes(), batch_size=4),
+                                      [store.sink('events'), groups], [store.sink('battles')], chunk_rows=32)
+            self.assertEqual(counts, {'events': sum(expected.values()), 'battles': 6})
+            self.assertGreater(len(store.tables['events']['files']), 1)
+            self.assertEqual({(row['agent'], row['action_id']): row['count'] for row in groups.rows()}, expected)
+
+            rounds = np.concatenate([chunk['rounds'] for chunk in read_chunks(tmp, 'battles')])
+            self.assertEqual(rounds.tolist(), [battle.current_round for battle in battles])
+
+    def test_simulated_report(self):
+        bot_codes = default_bot_codes()
+        with tempfile.TemporaryDirectory() as tmp:
+            with ColumnStore(tmp, bot_codes=bot_codes) as store:
+                records = simulate_records([('mende', 'regulus'), ('connect', 'mentor')], 5, bot_codes,
+                                           seed=3, shard_size=2)
+                run_pipeline(records, [store.sink('events')], [store.sink('battles')], chunk_rows=100)
+            report = balance_report(tmp)
+
+        self.assertEqual({(row['bot1'], row['bot2'], row['battles']) for row in report['matchups']},
+                         {('mende', 'regulus', 5), ('connect', 'mentor', 5)})
+        for row in report['matchups']:
+            self.assertAlmostEqual(row['bot1_win_rate'] + row['bot2_win_rate'] + row['draw_rate'], 1)
+        self.assertAlmostEqual(sum(report['bots']['mende']['pick_rates'].values()), 1)
+
+    def test_worker_pool_keeps_shard_order(self):
+        pairs = [('mende', 'regulus'), ('connect', 'mentor')]
+        serial = list(simulate_records(pairs, 5, default_bot_codes(), seed=3, shard_size=1))
+        parallel = list(simulate_records(pairs, 5, default_bot_codes(), seed=3, shard_size=1, workers=2))
+        self.assertEqual(parallel, serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from game import Agent, get_battle_bot
+from game.arena import Arena
+from game.catalog import get_catalog
+
+
+def make_agent(name, bot_id):
+    return Agent(name, agent_type=bot_id, agent_type_data=get_battle_bot(bot_id))
+
+
+def make_agents(count):
+    bots = get_catalog().passive_free_bots
+    return [make_agent(f"Agent {index}", bots[index % len(bots)]) for index in range(count)]
+
+
+class TestArena(unittest.TestCase):
+    def test_team_fight_ends_with_one_team_standing(self):
+        for seed in range(5):
+            arena = Arena(make_agents(6), teams=[0, 0, 0, 1, 1, 1], seed=seed)
+            winner = arena.run()
+            survivors = {arena.teams[index] for index in range(6) if arena.hp[index] > 0}
+            if winner is None:
+                # Draw: everyone left standing is out of stamina
+                self.assertTrue(arena.stalled())
+            else:
+                self.assertEqual(survivors, {winner})
+
+    def test_nobody_hits_a_teammate(self):
+        arena = Arena(make_agents(6), teams=[0, 0, 0, 1, 1, 1], targeting='weakest', seed=2)
+        while arena.winner_team is None and not arena.stalled():
+            for event in arena.execute_round()['events']:
+                if event['target'] is not None:
+                    self.assertNotEqual(arena.teams[event['attacker']], arena.teams[event['target']])
+
+    def test_free_for_all_is_deterministic_per_seed(self):
+        first = Arena(make_agents(64), seed=3)
+        second = Arena(make_agents(64), seed=3)
+        self.assertEqual(first.run(), second.run())
+        self.assertEqual(first.to_dict(), second.to_dict())
+
+    def test_player_action_and_target_are_used(self):
+        agents = [make_agent('A', 'connect') for _ in range(3)]
+        arena = Arena(agents, seed=4)
+        result = arena.execute_round({0: (6, 2)})
+        event = next(event for event in result['events'] if event['attacker'] == 0)
+        self.assertEqual((event['action_id'], event['target']), (6, 2))
+        self.assertIn('Fokussiert', arena.effect_names(0))
+
+    def test_bots_with_passives_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Arena([make_agent('A', 'connect'), make_agent('B', 'mende')])
+
+    def test_needs_two_teams(self):
+        with self.assertRaises(ValueError):
+            Arena(make_agents(3), teams=[1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
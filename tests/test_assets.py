@@ -0,0 +1,79 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import assets
+from app import create_app
+
+
+class TestMinifiers(unittest.TestCase):
+    def test_js_keeps_strings_templates_and_regexes(self):
+        source = '''
+            // comment
+            const a = 4 / 2;   /* block */
+            const r = /a\\/b[/]c/g;
+            const t = `x ${ {k: 1}.k } // kept ${`in${a}`}`;
+            const s = 'it\\'s // kept';
+        '''
+        self.assertEqual(assets.minify_js(source),
+                         'const a = 4 / 2;\nconst r = /a\\/b[/]c/g;\n'
+                         'const t = `x ${ {k: 1}.k } // kept ${`in${a}`}`;\nconst s = \'it\\\'s // kept\';\n')
+
+    def test_js_tells_regexes_from_division(self):
+        source = ('if (a) /re\\//.test(s);\n'
+                  'const x = (a + b) / 2 / c;  // half\n'
+                  'return /\\/\\//g.test(p.return / 2 / q);\n')
+        self.assertEqual(assets.minify_js(source),
+                         'if (a) /re\\//.test(s);\nconst x = (a + b) / 2 / c;\n'
+                         'return /\\/\\//g.test(p.return / 2 / q);\n')
+
+    def test_css(self):
+        self.assertEqual(assets.minify_css('/* x */\na > b ,c {\n  color: red;\n  margin: 0 auto;\n}\n'),
+                         'a>b,c{color:red;margin:0 auto}\n')
+
+
+class TestAssetBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = assets.build(output=self.tmp.name)
+        self.app = create_app({'ASSET_DIR': self.tmp.name})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_page_links_fingerprinted_files_without_debug_logger(self):
+        self.assertNotIn('js/debug-logger.js', self.manifest)
+        html = self.client.get('/').get_data(as_text=True)
+        self.assertIn('/static/dist/' + self.manifest['js/game.js'], html)
+        self.assertIn('/static/dist/' + self.manifest['css/style.css'], html)
+        self.assertNotIn('debug-logger', html)
+
+    def test_built_files_are_immutable_and_precompressed(self):
+        url = '/static/dist/' + self.manifest['js/game.js']
+        with open(os.path.join(self.tmp.name, self.manifest['js/game.js']), 'rb') as handle:
+            body = handle.read()
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br;q=0'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], assets.IMMUTABLE)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/javascript'))
+        self.assertEqual(gzip.decompress(response.data), body)
+        response.close()
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, body)
+        response.close()
+        self.assertEqual(self.client.get('/static/dist/manifest.json').status_code, 404)
+
+    def test_sources_are_served_without_manifest(self):
+        client = create_app({'ASSET_DIR': os.path.join(self.tmp.name, 'missing')}).test_client()
+        html = client.get('/').get_data(as_text=True)
+        self.assertIn('/static/js/game.js', html)
+        self.assertIn('/static/js/debug-logger.js', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from app import create_app
+
+
+class TestBatchApi(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app({'BATCH_MAX_ITEMS': 50}).test_client()
+
+    def _start(self, battles):
+        return self.client.post('/api/battles/batch/start', json={'battles': battles}).get_json()['results']
+
+    def test_start_turn_and_get(self):
+        started = self._start([{'agent1_bot': 'mende', 'agent2_bot': 'regulus'},
+                               {'agent1_bot': 'nope'},
+                               {'agent1_bot': 'connect', 'agent2_bot': 'mentor', 'agent2_level': 3}])
+        self.assertEqual(started[1], {'error': 'Unknown bot'})
+        ids = [started[0]['battle_id'], started[2]['battle_id']]
+
+        turns = self.client.post('/api/battles/batch/turn', json={'turns': [
+            {'battle_id': ids[0], 'action1_id': 1, 'action2_id': 2},
+            {'battle_id': ids[1], 'action1_id': 99},
+            {'battle_id': 'missing'},
+        ]}).get_json()['results']
+        self.assertEqual(turns[0]['result']['round'], 1)
+        self.assertEqual(turns[1]['error'], 'Unknown action')
+        self.assertEqual(turns[2]['error'], 'Battle not found')
+
+        states = self.client.post('/api/battles/batch/get',
+                                  json={'battle_ids': ids + ['missing']}).get_json()['results']
+        self.assertEqual([state.get('rounds') for state in states], [1, 0, None])
+        self.assertEqual(states[1]['agent2']['level'], 3)
+        self.assertNotIn('battle_log', states[0])
+
+    def test_malformed_items_fail_alone(self):
+        battle_id = self._start([{'agent1_bot': 'mende', 'agent2_bot': 'regulus'}])[0]['battle_id']
+        response = self.client.post('/api/battles/batch/turn', json={'turns': [
+            {'battle_id': {'id': battle_id}},
+            {'battle_id': [battle_id]},
+            {'battle_id': battle_id, 'action1_id': [1]},
+            {'battle_id': battle_id, 'action2_id': '1'},
+            {'battle_id': battle_id, 'idempotency_key': ['k']},
+            {'battle_id': battle_id, 'action1_id': 1, 'action2_id': 2},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual([result.get('error') for result in results],
+                         ['Battle not found', 'Battle not found', 'Action ids must be integers',
+                          'Action ids must be integers', 'idempotency_key must be a string', None])
+        self.assertEqual(results[5]['result']['round'], 1)
+
+    def test_batch_limits(self):
+        self.assertEqual(self.client.post('/api/battles/batch/get', json={'battle_ids': ['x'] * 51}).status_code, 413)
+        self.assertEqual(self.client.post('/api/battles/batch/turn', json={'turns': 'x'}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import unittest
+
+from battle_storage import BattleStorage
+
+
+class TestBattleStorageFork(unittest.TestCase):
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs fork")
+    def test_forked_child_restarts_cleanup_and_has_usable_locks(self):
+        storage = BattleStorage(cleanup_interval=3600)
+        self.addCleanup(storage.stop)
+        # Held by this (parent) thread across the fork, as a request thread might
+        storage._lock.acquire()
+        pid = os.fork()
+        if pid == 0:
+            ok = (storage._cleanup_thread.is_alive() and storage._owner_pid == os.getpid()
+                  and storage._lock.acquire(timeout=1))
+            os._exit(0 if ok else 1)
+        storage._lock.release()
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        storage.set('a', object())
+        self.assertIsNotNone(storage.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
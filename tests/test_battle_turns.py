@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+from app import create_app, get_battle_storage
+
+
+class TestTurnConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.battle_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+
+    def _turn(self, key=None, **body):
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/api/battle/turn', json={'battle_id': self.battle_id, **body}, headers=headers)
+
+    def test_retry_with_same_key_replays_result(self):
+        first = self._turn('abc', action1_id=2)
+        retry = self._turn('abc', action1_id=2)
+        self.assertEqual(retry.get_json(), first.get_json())
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(get_battle_storage().get(self.battle_id).current_round, 1)
+        self.assertEqual(self._turn('abc', action1_id=3).status_code, 422)
+
+    def test_replay_after_later_turns_returns_the_original_result(self):
+        first = self._turn('k1', action1_id=5, action2_id=4).get_json()
+        self._turn('k2', action1_id=2, action2_id=1)
+        self._turn('k3', action1_id=4, action2_id=6)
+        self.assertEqual(self._turn('k1', action1_id=5, action2_id=4).get_json(), first)
+
+    def test_unhashable_action_id_falls_back_to_the_first_action(self):
+        response = self._turn(action1_id=[1], action2_id={'id': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['round'], 1)
+
+    def test_stale_expected_round_is_rejected(self):
+        self.assertEqual(self._turn(expected_round=0).status_code, 200)
+        self.assertEqual(self._turn(expected_round=0).status_code, 409)
+
+    def test_concurrent_turns_play_distinct_rounds(self):
+        responses = []
+
+        def submit(key):
+            with self.app.test_client() as client:
+                responses.append(client.post('/api/battle/turn', json={'battle_id': self.battle_id},
+                                             headers={'Idempotency-Key': key}))
+
+        threads = [threading.Thread(target=submit, args=(key,)) for key in ['same'] * 4 + ['a', 'b', 'c', 'd']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        played = [response.get_json()['round'] for response in responses if response.status_code == 200]
+        battle = get_battle_storage().get(self.battle_id)
+        # The four 'same' submissions share one round; every other turn got its own
+        self.assertEqual(sorted(set(played)), list(range(1, battle.current_round + 1)))
+        self.assertEqual(len(played) - len(set(played)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
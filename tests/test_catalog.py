@@ -0,0 +1,162 @@
+import contextlib
+import copy
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from app import app, create_app, get_battle_storage
+from game import get_current_skin, get_unlocked_skins
+from game.catalog import (Catalog, CatalogWatcher, build_catalog_data, get_catalog, install_catalog,
+                          load_catalog_file, main, validate_catalog_data)
+
+
+def modified_catalog_data():
+    data = copy.deepcopy(build_catalog_data())
+    data['actions'][0]['name'] = 'Reloaded'
+    data['actions'][0]['damage_range'] = [40, 40]
+    return data
+
+
+class TestSkinUnlockIndex(unittest.TestCase):
+    def test_unlocks_follow_level_boundaries(self):
+        self.assertEqual([skin['id'] for skin in get_unlocked_skins('mende', 4)], [1])
+        self.assertEqual([skin['id'] for skin in get_unlocked_skins('mende', 5)], [1, 2])
+        self.assertEqual(len(get_unlocked_skins('mende', 99)), 5)
+        self.assertEqual(get_unlocked_skins('mende', 0), [])
+
+    def test_current_skin_prefers_requested_unlocked_skin(self):
+        self.assertEqual(get_current_skin('effi', 12)['id'], 3)
+        self.assertEqual(get_current_skin('effi', 12, skin_id=2)['id'], 2)
+        self.assertEqual(get_current_skin('effi', 12, skin_id=5)['id'], 3)
+
+
+class TestCatalogEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_catalog_bundle_is_immutable_and_precompressed(self):
+        location = self.client.get('/api/catalog').headers['Location']
+        response = self.client.get(location, headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        catalog = json.loads(gzip.decompress(response.data))
+        self.assertEqual(len(catalog['bots']), 21)
+        self.assertEqual(len(catalog['actions']), 8)
+        self.assertEqual(len(catalog['skins']['mende']), 5)
+
+    def test_unknown_version_is_not_found(self):
+        self.assertEqual(self.client.get('/api/catalog/deadbeef').status_code, 404)
+
+
+class TestCatalogVersions(unittest.TestCase):
+    def setUp(self):
+        self.original = get_catalog()
+        self.client = create_app({'ADMIN_TOKEN': 'secret'}).test_client()
+
+    def tearDown(self):
+        install_catalog(self.original)
+
+    def test_export_roundtrip_keeps_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.json')
+            self.assertEqual(main(['export', '-o', path]), 0)
+            self.assertEqual(load_catalog_file(path).version, self.original.version)
+
+    def test_invalid_data_is_rejected(self):
+        data = modified_catalog_data()
+        data['actions'][1]['id'] = data['actions'][0]['id']
+        data['actions'][2]['effects'] = ['nope']
+        del data['skins']['mende']
+        errors = validate_catalog_data(data)
+        self.assertEqual(len(errors), 3)
+        with self.assertRaises(ValueError):
+            Catalog(data)
+
+    def test_running_battles_keep_their_catalog(self):
+        old_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+        install_catalog(Catalog(modified_catalog_data()))
+        new_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+        self.assertEqual(self.client.get('/api/actions').get_json()[0]['name'], 'Reloaded')
+
+        old, new = (self.client.post('/api/battle/turn', json={'battle_id': battle_id, 'action1_id': 1})
+                    .get_json()['actions'][0] for battle_id in (old_id, new_id))
+        self.assertNotEqual(old['action'], 'Reloaded')
+        self.assertEqual(new['action'], 'Reloaded')
+
+    def test_running_battles_keep_their_bot_data(self):
+        battle_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+        agent = get_battle_storage().get(battle_id).agent1
+        name = agent.agent_type_data['name']
+        data = modified_catalog_data()
+        data['bots'] = [dict(bot, name='Renamed') for bot in data['bots'] if bot['id'] != agent.agent_type]
+        del data['skins'][agent.agent_type]
+        install_catalog(Catalog(data))
+        self.assertEqual(agent.agent_type_data['name'], name)
+        self.assertEqual(agent.to_dict()['name'], agent.name)
+
+    def test_installed_catalog_unlock_index_is_used(self):
+        data = modified_catalog_data()
+        data['skins']['mende'][1]['unlock_level'] = 2
+        catalog = Catalog(data)
+        install_catalog(catalog)
+        self.assertEqual([skin['id'] for skin in get_unlocked_skins('mende', 2)], [1, 2])
+        self.assertIs(get_unlocked_skins('mende', 2)[0], catalog.unlock_index['mende'][1][0])
+
+    def test_bots_command_lists_engine_support(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(main(['bots']), 0)
+        listing = json.loads(output.getvalue())
+        self.assertEqual(listing['all_engines'], ['connect', 'mentor', 'scholar', 'aura'])
+        self.assertEqual(listing['battle_only']['effi'], ['stamina_discount'])
+        self.assertEqual(self.original.to_dict()['passive_free_bots'], listing['all_engines'])
+
+    def test_win_chance_models_the_battle_catalog(self):
+        old_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+        data = copy.deepcopy(build_catalog_data())
+        for action in data['actions']:
+            action['stamina_cost'] = 1000  # nobody can act: a certain draw
+        install_catalog(Catalog(data))
+        new_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+
+        self.assertEqual(self.client.get(f'/api/battle/win-chance/{new_id}').get_json()['draw'], 1.0)
+        self.assertLess(self.client.get(f'/api/battle/win-chance/{old_id}').get_json()['draw'], 1.0)
+
+    def test_admin_reload(self):
+        url = '/admin/catalog/reload'
+        self.assertEqual(self.client.post(url, json=modified_catalog_data()).status_code, 403)
+        headers = {'Authorization': 'Bearer secret'}
+        self.assertEqual(self.client.post(url, json={'actions': []}, headers=headers).status_code, 400)
+        response = self.client.post(url, json=modified_catalog_data(), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['previous'], self.original.version)
+        self.assertEqual(get_catalog().version, response.get_json()['version'])
+
+    def test_watcher_reloads_changed_file_and_ignores_broken_one(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.json')
+            main(['export', '-o', path])
+            watcher = CatalogWatcher(path)
+            self.assertIsNone(watcher.check())
+
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(modified_catalog_data(), handle)
+            os.utime(path, (1, 1))
+            self.assertEqual(watcher.check().version, get_catalog().version)
+
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write('{')
+            os.utime(path, (2, 2))
+            version = get_catalog().version
+            with self.assertLogs('game.catalog', 'ERROR'):
+                self.assertIsNone(watcher.check())
+            self.assertEqual(get_catalog().version, version)
+
+
+if __name__ == '__main__':
+    unittest.main()
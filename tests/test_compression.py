@@ -0,0 +1,64 @@
+import gzip
+import json
+import unittest
+
+from app import create_app, get_battle_storage
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+class TestResponseCompression(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app({'COMPRESS_STREAM_ROUNDS': 1}).test_client()
+        self.battle_id = self.client.post('/api/battle/start', json={}).get_json()['battle_id']
+
+    def _turn(self, headers=None):
+        return self.client.post('/api/battle/turn', json={'battle_id': self.battle_id, 'action1_id': 4},
+                                headers=headers or {})
+
+    def test_large_json_is_gzipped_when_accepted(self):
+        response = self._turn(GZIP)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.data))['round'], 1)
+
+        plain = self._turn({'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.get_json()['round'], 2)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get('/health', headers=GZIP)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_catalog_responses_use_precompressed_bytes(self):
+        response = self.client.get('/api/actions', headers=GZIP)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        battle = get_battle_storage().get(self.battle_id)
+        self.assertEqual(response.data, battle.catalog.actions_gzip)
+
+    def test_long_summaries_are_streamed_compressed(self):
+        self._turn()
+        expected = self.client.get(f'/api/battle/summary/{self.battle_id}').get_json()
+
+        response = self.client.get(f'/api/battle/summary/{self.battle_id}', headers=GZIP)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), expected)
+        response.close()
+
+    def test_level_zero_disables_compression(self):
+        client = create_app({'COMPRESS_LEVEL': 0}).test_client()
+        battle_id = client.post('/api/battle/start', json={}).get_json()['battle_id']
+        response = client.post('/api/battle/turn', json={'battle_id': battle_id}, headers=GZIP)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        catalog_url = client.get('/api/catalog').headers['Location']
+        for url in ('/api/actions', '/api/bots', catalog_url):
+            with self.subTest(url=url):
+                response = client.get(url, headers=GZIP)
+                self.assertNotIn('Content-Encoding', response.headers)
+                self.assertTrue(response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
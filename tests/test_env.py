@@ -0,0 +1,81 @@
+import unittest
+
+from game import Agent, get_all_actions, get_battle_bot
+from game.actions import apply_effects
+
+try:
+    import numpy as np
+    from game.env import EFFECT_NAMES, OBS_FIELDS, BattleEnv
+except ImportError:  # numpy is an optional training dependency
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestBattleEnv(unittest.TestCase):
+    def test_action_tables_match_apply_effects(self):
+        env = BattleEnv('connect', 'mentor', num_envs=1)
+        tables = env.tables
+        for action in get_all_actions():
+            attacker = Agent('A', 'mende', agent_type_data=get_battle_bot('mende'))
+            defender = Agent('B', 'regulus', agent_type_data=get_battle_bot('regulus'))
+            attacker.hp = 50
+            apply_effects(action, attacker, defender)
+
+            action_id = action['id']
+            self.assertEqual(defender.get_effective_attack() - defender.attack, tables['def_attack'][action_id])
+            self.assertEqual(defender.get_effective_defense() - defender.defense, tables['def_defense'][action_id])
+            self.assertEqual(attacker.get_effective_defense() - attacker.defense, tables['att_defense'][action_id])
+            self.assertEqual(attacker.hp - 50, tables['heal'][action_id])
+            names = [effect['name'] for effect in defender.debuffs + attacker.buffs]
+            expected = sum(tables['def_effects'][action_id]) + sum(tables['att_effects'][action_id])
+            self.assertEqual(len(names), expected)
+            self.assertTrue(set(names) <= set(EFFECT_NAMES))
+
+    def test_step_shapes_stamina_and_damage(self):
+        env = BattleEnv(['connect', 'scholar'], ['mentor', 'aura'], seed=3)
+        obs = env.reset()
+        self.assertEqual(obs.shape, (2, 2, len(OBS_FIELDS)))
+        start_hp = obs[:, :, 0].copy()
+
+        obs, rewards, dones = env.step(np.full((2, 2), 8))
+        self.assertTrue((obs[:, :, 2] == obs[:, :, 3] - 12).all())
+        self.assertTrue((obs[:, :, 0] < start_hp + 15).all())
+        self.assertFalse(dones.any())
+        self.assertTrue((rewards == 0).all())
+
+    def test_finished_battles_reset_automatically(self):
+        env = BattleEnv('connect', 'mentor', num_envs=64, seed=5)
+        env.reset()
+        finished = 0
+        for _ in range(200):
+            obs, rewards, dones = env.step(env.random_actions())
+            if dones.any():
+                finished += int(dones.sum())
+                self.assertTrue((obs[dones, :, -1] == 0).all())
+                self.assertTrue((obs[dones, :, 0] == obs[dones, :, 1]).all())
+                self.assertTrue((rewards[dones].sum(axis=1) == 0).all())
+        self.assertGreater(finished, 64)
+
+    def test_same_seed_same_trajectory(self):
+        runs = []
+        for _ in range(2):
+            env = BattleEnv('scholar', 'aura', num_envs=8, seed=11)
+            env.reset()
+            for _ in range(10):
+                obs, _, _ = env.step(env.random_actions())
+            runs.append(obs.copy())
+        self.assertTrue((runs[0] == runs[1]).all())
+
+    def test_bots_with_passives_are_rejected(self):
+        with self.assertRaises(ValueError):
+            BattleEnv('connect', 'mende', num_envs=1)
+
+    def test_unknown_action_is_rejected(self):
+        env = BattleEnv('connect', 'mentor', num_envs=2)
+        env.reset()
+        with self.assertRaises(ValueError):
+            env.step(np.array([[1, 99], [1, 1]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from game import Agent, Battle, get_battle_bot
+from game.footprint import estimate_agent_bytes, estimate_battle_bytes
+from memory_report import build_report
+
+
+def _make_battle() -> Battle:
+    agent1 = Agent('Alpha', agent_type='mende', agent_type_data=get_battle_bot('mende'))
+    agent2 = Agent('Beta', agent_type='regulus', agent_type_data=get_battle_bot('regulus'))
+    return Battle(agent1, agent2)
+
+
+class TestFootprint(unittest.TestCase):
+    def test_static_bot_data_is_not_billed(self):
+        bot = get_battle_bot('mende')
+        with_bot = Agent('Alpha', agent_type='mende', agent_type_data=bot)
+        without_bot = Agent('Alpha', agent_type='mende', agent_type_data={})
+
+        self.assertLess(abs(estimate_agent_bytes(with_bot) - estimate_agent_bytes(without_bot)), 200)
+
+    def test_battle_grows_with_log_and_report_ranks_largest(self):
+        short, long = _make_battle(), _make_battle()
+        for _ in range(5):
+            long.execute_turn(3, 3)
+
+        self.assertGreater(estimate_battle_bytes(long), estimate_battle_bytes(short))
+
+        report = build_report([('short', short, 0.0), ('long', long, 0.0)], top_n=1, budget_bytes=1)
+        self.assertEqual(report['largest'][0]['battle_id'], 'long')
+        self.assertTrue(report['over_budget'])
+        self.assertEqual(sum(row['battles'] for row in report['by_rounds']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import random
+import tempfile
+import time
+import unittest
+
+import app as app_module
+from app import create_app
+from game import Agent, Battle
+from game.catalog import get_catalog
+from journal import (OPEN_SUFFIX, RECORD_SIZE, JournalRandom, JournalReader, TurnJournal, compact, list_segments,
+                     start_record, turn_record)
+
+
+def play(journal, battle_id, seed, max_rounds=60):
+    catalog = get_catalog()
+    rng = random.Random(seed)
+    agents = [Agent(name, agent_type=bot['id'], agent_type_data=bot)
+              for name, bot in (('Alpha', rng.choice(catalog.bots)), ('Beta', rng.choice(catalog.bots)))]
+    battle = Battle(*agents, catalog=catalog, rng=JournalRandom(seed))
+    journal.append(start_record(battle_id, battle))
+    while battle.winner is None and battle.current_round < max_rounds:
+        action1_id, action2_id = rng.randint(1, 8), rng.randint(1, 8)
+        state = battle.rng.getstate()
+        result = battle.execute_turn(action1_id, action2_id)
+        journal.append(turn_record(battle_id, battle, state, action1_id, action2_id, result))
+    return battle
+
+
+class TestJournalRandom(unittest.TestCase):
+    def test_state_restores_sequence(self):
+        rng = JournalRandom(42)
+        state = rng.getstate()
+        first = [rng.randint(1, 100) for _ in range(20)] + [rng.choice('abc'), rng.random()]
+        rng.setstate(state)
+        self.assertEqual([rng.randint(1, 100) for _ in range(20)] + [rng.choice('abc'), rng.random()], first)
+        self.assertLess(state, 1 << 64)
+
+
+class TestTurnJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rebuild_matches_played_battles(self):
+        journal = TurnJournal(self.directory, segment_bytes=4096)
+        battles = {f'battle-{seed}': play(journal, f'battle-{seed}', seed) for seed in range(12)}
+        journal.close()
+
+        self.assertGreater(len(list_segments(self.directory)), 1)
+        reader = JournalReader(self.directory)
+        for battle_id, battle in battles.items():
+            rebuilt = reader.rebuild(battle_id)
+            self.assertEqual(rebuilt.current_round, battle.current_round)
+            self.assertEqual(rebuilt.get_battle_summary()['battle_log'], battle.battle_log)
+        self.assertEqual(sum(1 for _ in reader.turns()), sum(b.current_round for b in battles.values()))
+        with self.assertRaises(KeyError):
+            reader.rebuild('unknown')
+
+    def test_group_commit_and_torn_tail(self):
+        journal = TurnJournal(self.directory, commit_interval=60)
+        journal.start()
+        battle = play(journal, 'torn', 1)
+        journal.sync()
+        self.assertEqual(journal.commits, 1)
+
+        # A crash mid-write leaves a partial record; readers stop before it
+        path = list_segments(self.directory)[0]
+        self.assertTrue(path.endswith(OPEN_SUFFIX))
+        with open(path, 'ab') as handle:
+            handle.write(b'\x02' * (RECORD_SIZE + 40))
+        start, turns = JournalReader(self.directory).battle_records('torn')
+        self.assertEqual(len(turns), battle.current_round)
+        journal.close()
+
+    def test_compaction_merges_sealed_segments_and_drops_idle_battles(self):
+        journal = TurnJournal(self.directory, segment_bytes=RECORD_SIZE * 4)
+        battle = play(journal, 'sealed', 2)
+        journal.close()
+        journal = TurnJournal(self.directory)
+        play(journal, 'active', 3)
+        journal.commit()
+        sealed = len(list_segments(self.directory, include_open=False))
+        self.assertGreater(sealed, 1)
+
+        stats = compact(self.directory, older_than=3600)
+        self.assertEqual((stats['segments'], stats['dropped']), (sealed, 0))
+        self.assertEqual(len(list_segments(self.directory)), 2)
+        self.assertEqual(JournalReader(self.directory).rebuild('sealed').current_round, battle.current_round)
+
+        journal.close()
+        stats = compact(self.directory, older_than=60, now=time.time() + 3600)
+        self.assertEqual(stats['kept'], 0)
+        self.assertEqual(list_segments(self.directory), [])
+
+
+class TestJournalEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        app_module._journal = TurnJournal(self.tmp.name)
+        self.client = create_app({'ADMIN_TOKEN': 'secret'}).test_client()
+
+    def tearDown(self):
+        app_module._journal.close()
+        app_module._journal = None
+        self.tmp.cleanup()
+
+    def test_turns_are_journaled_and_replayable(self):
+        battle_id = self.client.post('/api/battle/start', json={'agent1_bot': 'spark'}).get_json()['battle_id']
+        states = []
+        for _ in range(5):
+            result = self.client.post('/api/battle/turn', json={'battle_id': battle_id, 'action1_id': 2}).get_json()
+            if 'error' in result:
+                break
+            states.append(result['agent1_state']['hp'])
+        self.assertEqual(app_module._journal.committed, app_module._journal.appended)
+
+        response = self.client.get(f'/admin/journal/{battle_id}', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        summary = response.get_json()
+        self.assertEqual(summary['rounds'], len(states))
+        self.assertEqual([turn['agent1_state']['hp'] for turn in summary['battle_log']], states)
+
+
+if __name__ == '__main__':
+    unittest.main()
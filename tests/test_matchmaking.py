@@ -0,0 +1,111 @@
+import threading
+import unittest
+
+import matchmaking
+from app import MAX_LATENCY_MS, create_app, get_battle_storage, get_matchmaking
+from matchmaking import MatchmakingQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMatchmakingQueue(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.battles = []
+        self.queue = MatchmakingQueue(self._on_match, clock=self.clock, autostart=False)
+        self.queue._owner_pid = matchmaking.os.getpid()  # no widening thread; tests call tick()
+
+    def _on_match(self, first, second):
+        self.battles.append((first.name, second.name))
+        return f'battle-{len(self.battles)}'
+
+    def test_same_level_matches_immediately(self):
+        first = self.queue.enqueue('a', 'mende', 5, 40)
+        second = self.queue.enqueue('b', 'regulus', 5, 60)
+        self.assertEqual(self.battles, [('a', 'b')])
+        self.assertEqual((first.status, first.side, second.side), ('matched', 1, 2))
+        self.assertEqual(first.battle_id, second.battle_id)
+        self.assertEqual(self.queue.waiting(), 0)
+
+    def test_level_window_widens_while_waiting(self):
+        self.queue.enqueue('a', 'mende', 5)
+        self.queue.enqueue('b', 'mende', 7)
+        self.assertEqual(self.battles, [])
+
+        self.clock.now = matchmaking.WIDEN_INTERVAL
+        self.queue.tick()
+        self.assertEqual(self.battles, [])
+        self.clock.now = 2 * matchmaking.WIDEN_INTERVAL
+        self.queue.tick()
+        self.assertEqual(len(self.battles), 1)
+
+    def test_distant_latencies_never_match(self):
+        self.queue.enqueue('a', 'mende', 5, 0)
+        self.queue.enqueue('b', 'mende', 5, 2000)
+        for step in range(1, 12):
+            self.clock.now = step * matchmaking.WIDEN_INTERVAL
+            self.queue.tick()
+        self.assertEqual(self.battles, [])
+
+    def test_abandoned_tickets_expire(self):
+        ticket = self.queue.enqueue('a', 'mende', 5)
+        self.clock.now = matchmaking.TICKET_TTL + 3 * matchmaking.WIDEN_INTERVAL
+        self.queue.tick()
+        self.assertIsNone(self.queue.get(ticket.ticket_id))
+        self.assertEqual(self.queue.waiting(), 0)
+
+    def test_long_poll_wakes_on_match(self):
+        ticket = self.queue.enqueue('a', 'mende', 5)
+        threading.Timer(0.05, self.queue.enqueue, ('b', 'mende', 5)).start()
+        self.assertEqual(self.queue.wait(ticket.ticket_id, 5).status, 'matched')
+
+    def test_cancel(self):
+        ticket = self.queue.enqueue('a', 'mende', 5)
+        self.assertTrue(self.queue.cancel(ticket.ticket_id))
+        self.queue.enqueue('b', 'mende', 5)
+        self.assertEqual(self.battles, [])
+
+
+class TestMatchmakingApi(unittest.TestCase):
+    def test_matched_players_share_a_battle(self):
+        client = create_app().test_client()
+        waiting = client.post('/api/matchmaking/queue', json={'name': 'Ada', 'bot': 'mende', 'level': 42})
+        self.assertEqual(waiting.status_code, 202)
+        matched = client.post('/api/matchmaking/queue', json={'name': 'Bob', 'bot': 'regulus', 'level': 42})
+        self.assertEqual(matched.status_code, 200)
+
+        polled = client.get(f"/api/matchmaking/queue/{waiting.get_json()['ticket_id']}?wait=1").get_json()
+        self.assertEqual(polled['battle_id'], matched.get_json()['battle_id'])
+        self.assertEqual(polled['opponent']['name'], 'Bob')
+        battle = get_battle_storage().get(polled['battle_id'])
+        self.assertEqual((battle.agent1.name, battle.agent1.level), ('Ada', 42))
+
+    def test_validation(self):
+        client = create_app().test_client()
+        self.assertEqual(client.post('/api/matchmaking/queue', json={'bot': 'nope'}).status_code, 400)
+        self.assertEqual(client.post('/api/matchmaking/queue', json={'level': 0}).status_code, 400)
+        self.assertEqual(client.get('/api/matchmaking/queue/missing').status_code, 404)
+        self.assertEqual(client.post('/api/battle/start', json={'agent1_level': 'x'}).status_code, 400)
+
+    def test_latency_must_be_finite_and_is_capped(self):
+        client = create_app().test_client()
+        for latency in ('Infinity', 'NaN', '-1', 'true'):
+            with self.subTest(latency=latency):
+                response = client.post('/api/matchmaking/queue', data=f'{{"latency_ms": {latency}}}',
+                                       content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+        response = client.post('/api/matchmaking/queue', json={'bot': 'mende', 'level': 97, 'latency_ms': 1e300})
+        ticket_id = response.get_json()['ticket_id']
+        self.assertEqual(get_matchmaking()._tickets[ticket_id].latency_ms, MAX_LATENCY_MS)
+        get_matchmaking().cancel(ticket_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
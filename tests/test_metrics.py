@@ -0,0 +1,38 @@
+import threading
+import unittest
+
+from metrics import Registry
+
+
+class TestMetricsRendering(unittest.TestCase):
+    def test_counter_sums_across_threads(self):
+        registry = Registry()
+        counter = registry.counter('jobs_total', 'Jobs done', ('kind',))
+
+        def work():
+            for _ in range(1000):
+                counter.labels('turn').inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn('jobs_total{kind="turn"} 4000', registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 2.0):
+            histogram.observe(value)
+
+        output = registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', output)
+        self.assertIn('latency_seconds_count 3', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
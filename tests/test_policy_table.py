@@ -0,0 +1,97 @@
+import copy
+import os
+import random
+import tempfile
+import unittest
+
+from app import create_app, get_battle_storage
+from game import Agent, Battle, get_battle_bot
+from game.catalog import Catalog, build_catalog_data
+from game.policy_table import PolicyTable, TableLayout, compile_from_simulation, compile_from_strategy, write_table
+
+
+def cheapest_affordable(agent, opponent, rng=None):
+    from game import get_all_actions
+
+    affordable = [action for action in get_all_actions() if action['stamina_cost'] <= agent.stamina]
+    return min(affordable or get_all_actions(), key=lambda action: (action['stamina_cost'], action['id']))
+
+
+def make_agent(bot_id):
+    return Agent(get_battle_bot(bot_id)['name'], agent_type=bot_id, agent_type_data=get_battle_bot(bot_id))
+
+
+class TestPolicyTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, 'policy.bin')
+        layout = TableLayout(['mende', 'regulus'], hp_buckets=2, stamina_buckets=15, stamina_step=10,
+                             opponent_hp_buckets=2)
+        layout, cells = compile_from_strategy(cheapest_affordable, layout, samples=1)
+        write_table(cls.path, layout, cells, {'source': 'test'})
+        cls.table = PolicyTable(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table.close()
+        cls.tmpdir.cleanup()
+
+    def test_lookup_returns_compiled_choice(self):
+        agent, opponent = make_agent('mende'), make_agent('regulus')
+        agent.stamina = 10
+        self.assertEqual(self.table.lookup(agent, opponent), cheapest_affordable(agent, opponent)['id'])
+        agent.stamina = 15
+        self.assertLessEqual(self.table.select(agent, opponent)['stamina_cost'], 15)
+        self.assertEqual(self.table.header['source'], 'test')
+
+    def test_unknown_bot_and_empty_cells_fall_back(self):
+        agent, opponent = make_agent('volt'), make_agent('regulus')
+        self.assertIsNone(self.table.select(agent, opponent))
+        agent = make_agent('mende')
+        agent.stamina = 0
+        self.assertIsNone(self.table.select(agent, opponent))
+
+    def test_actions_missing_from_the_battle_catalog_fall_back(self):
+        agent, opponent = make_agent('mende'), make_agent('regulus')
+        agent.stamina = 10
+        stored = self.table.lookup(agent, opponent)
+        data = copy.deepcopy(build_catalog_data())
+        data['actions'] = [action for action in data['actions'] if action['id'] != stored]
+        self.assertIsNone(self.table.select(agent, opponent, Catalog(data)))
+
+    def test_compiling_leaves_module_random_alone(self):
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        layout = TableLayout(['mende'], hp_buckets=1, stamina_buckets=2, stamina_step=50, opponent_hp_buckets=1)
+        first = compile_from_simulation(3, layout, seed=5, max_rounds=20)[1]
+        self.assertEqual(random.random(), expected)
+        self.assertEqual(compile_from_simulation(3, layout, seed=5, max_rounds=20)[1], first)
+
+    def test_truncated_file_is_rejected(self):
+        broken = os.path.join(self.tmpdir.name, 'broken.bin')
+        with open(self.path, 'rb') as source, open(broken, 'wb') as target:
+            target.write(source.read()[:-1])
+        with self.assertRaises(ValueError):
+            PolicyTable(broken)
+
+    def test_table_policy_needs_a_table_file(self):
+        for config in ({'AI_POLICY': 'table'}, {'AI_POLICY': 'table', 'AI_POLICY_TABLE': self.path + '.missing'},
+                       {'AI_POLICY': 'tabel'}):
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                create_app(config)
+
+    def test_ai_action_endpoint_uses_configured_table(self):
+        client = create_app({'AI_POLICY': 'table', 'AI_POLICY_TABLE': self.path}).test_client()
+        agent, opponent = make_agent('regulus'), make_agent('mende')
+        battle = Battle(opponent, agent)
+        agent.stamina = 20
+        get_battle_storage().set('policy-test', battle)
+
+        response = client.post('/api/battle/ai-action', json={'battle_id': 'policy-test'})
+        self.assertEqual(response.get_json()['action_id'], cheapest_affordable(agent, opponent)['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import random
+import time
+import unittest
+
+from app import create_app, get_battle_storage
+from game import Agent, Battle, get_battle_bot
+from game.ai import select_ai_action
+from game.preview import preview_actions
+
+
+def make_battle(bot1='mende', bot2='regulus'):
+    agent1 = Agent('A', bot1, agent_type_data=get_battle_bot(bot1))
+    agent2 = Agent('B', bot2, agent_type_data=get_battle_bot(bot2))
+    return Battle(agent1, agent2)
+
+
+def play(battle, rounds):
+    for _ in range(rounds):
+        if battle.winner is not None:
+            break
+        battle.execute_turn(select_ai_action(battle.agent1, battle.agent2)['id'],
+                            select_ai_action(battle.agent2, battle.agent1)['id'])
+
+
+class TestBattleFork(unittest.TestCase):
+    def test_fork_is_independent(self):
+        battle = make_battle()
+        play(battle, 2)
+        before = (battle.current_round, battle.agent1.to_dict().copy(), battle.agent2.to_dict().copy(),
+                  len(battle.agent1.debuffs), len(battle.agent2.debuffs))
+
+        fork = battle.fork()
+        self.assertEqual(fork.battle_log, [])
+        self.assertEqual(fork.agent1.to_dict(), battle.agent1.to_dict())
+        play(fork, 100)
+
+        self.assertIsNotNone(fork.winner)
+        self.assertIn(fork.winner, (fork.agent1, fork.agent2))
+        self.assertIsNone(battle.winner)
+        self.assertEqual((battle.current_round, battle.agent1.to_dict(), battle.agent2.to_dict(),
+                          len(battle.agent1.debuffs), len(battle.agent2.debuffs)), before)
+
+    def test_fork_keeps_passive_state(self):
+        battle = make_battle('connect', 'mentor')
+        play(battle, 3)
+        fork = battle.fork()
+        self.assertEqual(fork.ability_state, battle.ability_state)
+        fork.ability_state[0]['round'] = 99
+        self.assertNotEqual(battle.ability_state[0]['round'], 99)
+
+
+class TestPreview(unittest.TestCase):
+    def test_every_action_gets_the_same_rollouts(self):
+        battle = make_battle()
+        preview = preview_actions(battle, rollouts=5, budget=10, seed=1)
+        self.assertEqual(preview['rollouts'], 5)
+        self.assertEqual(len(preview['actions']), 8)
+        for action in preview['actions']:
+            self.assertGreaterEqual(action['expected_damage_dealt'], 0)
+            self.assertLessEqual(action['win_chance'] + action['loss_chance'], 1)
+        self.assertEqual(battle.current_round, 0)
+
+    def test_seeded_preview_leaves_module_random_alone(self):
+        battle = make_battle()
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        first = preview_actions(battle, rollouts=3, budget=10, seed=7)
+        self.assertEqual(random.random(), expected)
+        second = preview_actions(battle, rollouts=3, budget=10, seed=7)
+        self.assertEqual(first['actions'], second['actions'])
+
+    def test_time_budget_caps_rollouts(self):
+        battle = make_battle()
+        play(battle, 1)
+        started = time.perf_counter()
+        preview = preview_actions(battle, rollouts=100000, budget=0.05)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreaterEqual(preview['rollouts'], 1)
+        self.assertLess(preview['rollouts'], 100000)
+
+    def test_endpoint(self):
+        get_battle_storage().set('preview-test', make_battle())
+        client = create_app({'PREVIEW_BUDGET_MS': 20}).test_client()
+
+        response = client.post('/api/battle/preview', json={'battle_id': 'preview-test', 'rollouts': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(response.get_json()['rollouts'], 3)
+        self.assertEqual(client.post('/api/battle/preview', json={'battle_id': 'preview-test', 'agent': 3}).status_code, 400)
+        self.assertEqual(client.post('/api/battle/preview', json={'battle_id': 'missing'}).status_code, 404)
+
+    def test_endpoint_rejects_bad_limits(self):
+        get_battle_storage().set('preview-limits', make_battle())
+        client = create_app({'PREVIEW_BUDGET_MS': 20}).test_client()
+
+        for body in ({'budget_ms': 'fast'}, {'budget_ms': None}, {'budget_ms': 0}, {'budget_ms': True},
+                     {'rollouts': 'many'}, {'rollouts': None}, {'rollouts': 2.5}, {'rollouts': 0}):
+            with self.subTest(body=body):
+                response = client.post('/api/battle/preview', json={'battle_id': 'preview-limits', **body})
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
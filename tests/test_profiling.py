@@ -0,0 +1,54 @@
+import threading
+import time
+import unittest
+
+from app import create_app
+from profiling import StackSampler
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+class TestStackSampler(unittest.TestCase):
+    def test_result_can_be_read_while_running(self):
+        stop = threading.Event()
+        workers = [threading.Thread(target=_spin, args=(stop,), name=f'spin-{index}') for index in range(4)]
+        for worker in workers:
+            worker.start()
+        self.addCleanup(stop.set)
+
+        sampler = StackSampler()
+        self.assertTrue(sampler.start(0.3, interval=0.001))
+        self.assertFalse(sampler.start(0.3))
+        reads = 0
+        # Read throughout the run while the sampler thread keeps adding stacks
+        while sampler.running:
+            result = sampler.result()
+            reads += 1
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        result = sampler.result()
+        self.assertGreater(reads, 0)
+        self.assertFalse(result['running'])
+        self.assertGreater(result['samples'], 0)
+        self.assertIn('spin-0;', result['collapsed'])
+        counts = [int(line.rsplit(' ', 1)[1]) for line in result['collapsed'].splitlines()]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_endpoint_requires_token_and_reports_run(self):
+        client = create_app({'ADMIN_TOKEN': 'secret'}).test_client()
+        headers = {'Authorization': 'Bearer secret'}
+        self.assertEqual(client.post('/admin/profile/cpu?seconds=0.05').status_code, 403)
+        response = client.post('/admin/profile/cpu?seconds=0.05&interval=0.001', headers=headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('running', client.get('/admin/profile/cpu', headers=headers).get_json())
+        time.sleep(0.1)
+        self.assertGreater(client.get('/admin/profile/cpu', headers=headers).get_json()['samples'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from game.sim import parse_pairs, run_battle, run_campaign
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def _rows(self, path):
+        with open(path, encoding='utf-8') as handle:
+            return sorted(handle.read().splitlines())
+
+    def test_battle_is_deterministic_per_seed(self):
+        self.assertEqual(run_battle('mende', 'regulus', seed='7'), run_battle('mende', 'regulus', seed='7'))
+
+    def test_seeded_battle_leaves_module_random_alone(self):
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        run_battle('mende', 'regulus', seed='7')
+        self.assertEqual(random.random(), expected)
+
+    def test_round_cap_ends_in_draw(self):
+        result = run_battle('mende', 'regulus', seed='7', max_rounds=1)
+        self.assertEqual(result['rounds'], 1)
+        self.assertIsNone(result['winner'])
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        pairs = parse_pairs('mende:regulus,connect:mentor')
+        run_campaign(pairs, 6, self._path('full.jsonl'), seed=3, shard_size=2)
+
+        partial = self._path('partial.jsonl')
+        first = run_campaign(pairs, 6, partial, seed=3, shard_size=2, max_shards=2)
+        self.assertFalse(first['complete'])
+        # Rows written after the last checkpoint are discarded on resume
+        with open(partial, 'ab') as handle:
+            handle.write(b'{"partial": tru')
+        second = run_campaign(pairs, 6, partial, seed=3, shard_size=2, resume=True)
+
+        self.assertTrue(second['complete'])
+        self.assertEqual(second['shards_run'], 4)
+        self.assertEqual(self._rows(partial), self._rows(self._path('full.jsonl')))
+        self.assertEqual(len(self._rows(partial)), 12)
+        json.loads(self._rows(partial)[0])
+
+    def test_resume_rejects_changed_settings(self):
+        output = self._path('out.jsonl')
+        run_campaign(parse_pairs('mende:regulus'), 2, output, shard_size=1, max_shards=1)
+        with self.assertRaises(ValueError):
+            run_campaign(parse_pairs('mende:regulus'), 2, output, seed=9, shard_size=1, resume=True)
+
+    def test_unknown_bot_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_pairs('mende:nobody')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import time
+import unittest
+
+from app import create_app
+from game.tournament import (MAX_MATCH_ROUNDS, RESULTS, TooManyTournaments, Tournament, TournamentManager,
+                             bracket_order, entrants_from_spec, round_robin_rounds)
+
+
+class TestScheduling(unittest.TestCase):
+    def test_round_robin_pairs_everyone_once(self):
+        for count in (4, 5):
+            pairs = [tuple(sorted(pair, key=str)) for round_pairs in round_robin_rounds(count)
+                     for pair in round_pairs if None not in pair]
+            self.assertEqual(len(pairs), count * (count - 1) // 2)
+            self.assertEqual(len(set(pairs)), len(pairs))
+
+    def test_bracket_keeps_top_seeds_apart(self):
+        order = bracket_order(8)
+        self.assertEqual(sorted(order), list(range(8)))
+        self.assertEqual(order[:2], [0, 7])
+        self.assertIn(1, order[4:])
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        RESULTS.clear()
+
+    def test_round_robin_carries_xp_and_levels(self):
+        tournament = Tournament(entrants_from_spec('all'), 'round_robin', seed=1)
+        tournament.run()
+        standings = tournament.standings()
+
+        self.assertEqual(tournament.status, 'finished')
+        self.assertEqual(len(tournament.matches), 21 * 20 // 2 + 21)  # matches + one bye each
+        self.assertEqual(sum(row['wins'] + row['losses'] + row['draws'] for row in standings), 21 * 20)
+        self.assertGreater(standings[0]['level'], 1)
+
+    def test_identical_matchups_come_from_the_cache(self):
+        first = Tournament(entrants_from_spec('all'), 'swiss', seed=2)
+        first.run()
+        second = Tournament(entrants_from_spec('all'), 'swiss', seed=2)
+        second.run()
+        self.assertEqual(second.standings(), first.standings())
+        self.assertEqual(second.cache_hits, sum(not match['bye'] for match in second.matches))
+
+    def test_elimination_has_one_champion(self):
+        entrants = entrants_from_spec([{'bot': 'mende'}, {'bot': 'regulus'}, {'bot': 'connect'},
+                                       {'bot': 'mentor', 'name': 'Boss', 'level': 3}, {'bot': 'mende', 'name': 'Twin'}])
+        tournament = Tournament(entrants, 'elimination', seed=3)
+        tournament.run()
+        self.assertEqual(tournament.total_rounds, 3)
+        self.assertEqual([row['eliminated_in'] for row in tournament.standings()].count(None), 1)
+
+    def test_snapshot_returns_new_matches_only(self):
+        tournament = Tournament(entrants_from_spec('all'), 'elimination', seed=4)
+        tournament.run()
+        snapshot = tournament.snapshot()
+        self.assertEqual(tournament.snapshot(since=snapshot['next'])['matches'], [])
+
+
+class TestTournamentApi(unittest.TestCase):
+    def test_start_and_poll(self):
+        client = create_app().test_client()
+        response = client.post('/api/tournaments', json={'format': 'swiss', 'seed': 5, 'rounds': 2})
+        self.assertEqual(response.status_code, 202)
+        tournament_id = response.get_json()['tournament_id']
+
+        for _ in range(200):
+            snapshot = client.get(f'/api/tournaments/{tournament_id}').get_json()
+            if snapshot['status'] == 'finished':
+                break
+            time.sleep(0.01)
+        self.assertEqual(snapshot['status'], 'finished')
+        self.assertEqual(snapshot['round'], 2)
+        self.assertEqual(client.post('/api/tournaments', json={'format': 'league'}).status_code, 400)
+        self.assertEqual(client.post('/api/tournaments', json={'entrants': [{'bot': 'nope'}]}).status_code, 400)
+        self.assertEqual(client.get('/api/tournaments/missing').status_code, 404)
+
+    def test_bad_input_is_rejected(self):
+        client = create_app().test_client()
+        for body in ({'entrants': [{'bot': 'mende', 'level': 5000}, {'bot': 'regulus'}]},
+                     {'entrants': ['mende', 'regulus']},
+                     {'format': 'swiss', 'rounds': -3},
+                     {'max_rounds': 0}):
+            with self.subTest(body=body):
+                response = client.post('/api/tournaments', json=body)
+                self.assertEqual(response.status_code, 400)
+                self.assertNotIn('indices', response.get_json()['error'])
+
+    def test_limits_are_clamped(self):
+        entrants = entrants_from_spec([{'bot': 'mende'}, {'bot': 'regulus'}, {'bot': 'connect'}])
+        self.assertEqual(Tournament(entrants, 'swiss', rounds=50).total_rounds, 3)
+        with self.assertRaises(ValueError):
+            Tournament(entrants, max_rounds=MAX_MATCH_ROUNDS + 1)
+
+    def test_running_tournaments_are_capped(self):
+        manager = TournamentManager(max_running=1)
+        entrants = entrants_from_spec([{'bot': 'mende'}, {'bot': 'regulus'}])
+        busy = Tournament(entrants)
+        busy.status = 'running'
+        manager._tournaments['busy'] = (busy, time.time())
+        with self.assertRaises(TooManyTournaments):
+            manager.create(Tournament(entrants))
+        busy.status = 'finished'
+        self.assertIsNotNone(manager.create(Tournament(entrants)))
+
+
+if __name__ == '__main__':
+    unittest.main()
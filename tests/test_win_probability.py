@@ -0,0 +1,90 @@
+import time
+import unittest
+
+from app import create_app, get_battle_storage
+from game import Agent, Battle, get_battle_bot
+from game.win_probability import LRUCache, battle_win_probability, uniform_policy
+
+
+def make_battle(bot1='connect', bot2='mentor'):
+    agent1 = Agent('A', bot1, agent_type_data=get_battle_bot(bot1))
+    agent2 = Agent('B', bot2, agent_type_data=get_battle_bot(bot2))
+    return Battle(agent1, agent2)
+
+
+# Enough to solve make_endgame() exactly
+ENDGAME_WORK = 50_000
+
+
+def make_endgame():
+    """A few rounds left: small enough to solve exactly in a test"""
+    battle = make_battle()
+    battle.agent1.hp = battle.agent2.hp = 10
+    battle.agent1.stamina, battle.agent2.stamina = 25, 22
+    return battle
+
+
+class TestWinProbability(unittest.TestCase):
+    def test_single_round_endgame_is_exact(self):
+        battle = make_battle()
+        battle.agent1.hp, battle.agent1.stamina = 1, 10
+        battle.agent2.hp, battle.agent2.stamina = 1, 10
+
+        result = battle_win_probability(battle, uniform_policy, uniform_policy, cache=LRUCache(1000))
+        # Only the cheapest action is affordable, both hits kill: whoever acts first wins
+        self.assertEqual(result['method'], 'exact')
+        self.assertAlmostEqual(result['agent1'], 0.5)
+        self.assertAlmostEqual(result['agent2'], 0.5)
+        self.assertAlmostEqual(result['draw'], 0.0)
+
+    def test_exhausted_agents_draw(self):
+        battle = make_battle()
+        battle.agent1.stamina = battle.agent2.stamina = 5
+        result = battle_win_probability(battle, cache=LRUCache(1000))
+        self.assertEqual((result['agent1'], result['agent2'], result['draw']), (0.0, 0.0, 1.0))
+
+    def test_repeated_queries_hit_the_cache(self):
+        cache = LRUCache(100000)
+        battle = make_endgame()
+        first = battle_win_probability(battle, max_work=ENDGAME_WORK, cache=cache)
+        self.assertEqual(first['method'], 'exact')
+        second = battle_win_probability(battle, max_work=ENDGAME_WORK, cache=cache)
+        self.assertGreater(first['states_evaluated'], 0)
+        self.assertEqual(second['states_evaluated'], 0)
+        self.assertEqual(first['agent1'], second['agent1'])
+
+    def test_sampling_fallback_agrees_with_exact_value(self):
+        battle = make_endgame()
+        exact = battle_win_probability(battle, max_work=ENDGAME_WORK, cache=LRUCache(100000))
+        self.assertEqual(exact['method'], 'exact')
+        sampled = battle_win_probability(battle, max_work=1, samples=4000, seed=1, cache=LRUCache(10))
+
+        self.assertEqual(sampled['method'], 'sampled')
+        self.assertLess(abs(sampled['agent1'] - exact['agent1']), sampled['error'])
+        self.assertLess(abs(sampled['agent2'] - exact['agent2']), sampled['error'])
+
+    def test_budget_bounds_early_states(self):
+        started = time.perf_counter()
+        result = battle_win_probability(make_battle('mende', 'mende'), budget=0.05, cache=LRUCache(100000))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(result['method'], 'sampled')
+        self.assertLessEqual(result['agent1'] + result['agent2'], 1.0)
+
+    def test_cache_is_bounded(self):
+        cache = LRUCache(10)
+        battle = make_endgame()
+        battle_win_probability(battle, cache=cache)
+        self.assertEqual(len(cache), 10)
+
+    def test_endpoint(self):
+        battle = make_battle()
+        battle.agent1.stamina = battle.agent2.stamina = 5
+        get_battle_storage().set('win-chance-test', battle)
+        client = create_app().test_client()
+
+        self.assertEqual(client.get('/api/battle/win-chance/win-chance-test').get_json()['draw'], 1.0)
+        self.assertEqual(client.get('/api/battle/win-chance/missing').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()